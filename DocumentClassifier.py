@@ -1,23 +1,44 @@
 import csv
 import os
+import traceback
+from collections import deque, namedtuple
+from collections.abc import Mapping
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 from pyConTextNLP.utils import get_document_markups
 
 from itemData import get_item_data
 from nlp_pneumonia_utils import markup_context_document
-from visual import convertMarkups2DF
+from visual import ANNOTATION_COLUMNS, RELATION_COLUMNS, df2columns
 
 
 class DocumentClassifier(object):
     def __init__(self, targets=None, modifiers=None, feature_inference_rule=None, document_inference_rule=None,
-                 expected_values=None, save_markups=True):
+                 expected_values=None, save_markups=True, markup_backend=None, sentence_splitter=None,
+                 markup_store=None, use_artifacts=False):
+        """
+        markup_store: the mapping the ConTextDocuments of the classified documents are
+        saved to when save_markups is on, e.g. a bounded
+        pyConTextNLP.markupStore.lruMarkupStore; a dict by default
+        use_artifacts: load lexicon files through their compiled artifacts (see
+        itemData.load_item_data), which are written next to the lexicon files
+        """
+        self.markup_backend = markup_backend
+        self.sentence_splitter = sentence_splitter
+        self.use_artifacts = use_artifacts
+        self.feature_inference_rule = feature_inference_rule
+        self.document_inference_rule = document_inference_rule
         self.document_inferencer = DocumentInferencer(document_inference_rule)
         self.feature_inferencer = FeatureInferencer(feature_inference_rule)
         self.conclusions = []
         self.modifiers = modifiers
         self.targets = targets
+        self.modifiers_file = None
+        self.targets_file = None
         self.save_markups = save_markups
         self.expected_values = [value.lower() for value in expected_values]
-        self.saved_markups_map = dict()
+        self.saved_markups_map = dict() if markup_store is None else markup_store
         self.last_doc_name = ''
 
         if modifiers is not None and targets is not None:
@@ -33,13 +54,17 @@ class DocumentClassifier(object):
     def setModifiersTargets(self, modifiers, targets):
         self.modifiers = modifiers
         self.targets = targets
+        self.modifiers_file = None
+        self.targets_file = None
 
     def setModifiersTargetsFromFiles(self, modifiers_file, targets_file):
-        self.targets = get_item_data(targets_file)
-        self.modifiers = get_item_data(modifiers_file)
+        self.targets = get_item_data(targets_file, use_artifact=self.use_artifacts)
+        self.modifiers = get_item_data(modifiers_file, use_artifact=self.use_artifacts)
+        self.modifiers_file = modifiers_file
+        self.targets_file = targets_file
 
     def reset_saved_predictions(self):
-        self.saved_markups_map = {}
+        self.saved_markups_map.clear()
         self.save_markups = True
         self.expected_value = None
 
@@ -50,18 +75,112 @@ class DocumentClassifier(object):
             return 1
         return 0
 
-    def eval(self, gold_docs):
+    def predict_batch(self, docs, workers=None, chunksize=16, expected_values=None):
+        """
+        Predict a batch of documents with a pool of worker processes. Each worker
+        builds its own classifier (loading the targets, modifiers and inference
+        rules) once, when it starts.
+
+        docs: a dict of doc_name -> document or an iterable of documents or
+        (doc_name, document) pairs, where a document is a text or an object with a
+        text attribute (e.g. AnnotatedDocument). Documents without a name are
+        named by their position.
+        workers: number of worker processes (default: os.cpu_count()). With
+        workers=1 the documents are predicted in this process.
+        chunksize: number of documents sent to a worker at a time
+        expected_values: if given, predict against these conclusions instead of
+        the expected_values of the classifier (see predict_against)
+
+        Generates (doc_name, prediction, error) in the order of docs. If predicting
+        a document fails, prediction is None and error is the formatted traceback;
+        the other documents are not affected.
+        """
+        docs = _iter_named_docs(docs)
+        if expected_values is not None:
+            expected_values = [value.lower() for value in expected_values]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1:
+            for doc_name, doc in docs:
+                yield _predict_document(self, doc_name, doc, expected_values)
+            return
+        chunks = iter(lambda: list(islice(docs, chunksize)), [])
+        if self.use_artifacts and self.targets_file is not None and self.modifiers_file is not None:
+            # workers load the lexicon files from their compiled artifacts
+            targets, modifiers = self.targets_file, self.modifiers_file
+        else:
+            targets, modifiers = self.targets, self.modifiers
+        worker_args = dict(targets=targets, modifiers=modifiers,
+                           # the compiled rules rather than the rule files: workers do not parse them again
+                           feature_inference_rule=self.feature_inferencer.rules,
+                           document_inference_rule=self.document_inferencer.rules,
+                           expected_values=self.expected_values, save_markups=False,
+                           markup_backend=self.markup_backend,
+                           sentence_splitter=self.sentence_splitter, use_artifacts=self.use_artifacts)
+        # keep a bounded number of chunks in flight so that results stream back
+        # in order without reading all of docs ahead
+        window = 2 * workers
+        pending = deque()
+
+        def new_pool():
+            return ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(worker_args,))
+
+        executor = new_pool()
+        try:
+            while True:
+                while len(pending) < window:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.append([chunk, _submit_chunk(executor, chunk, expected_values)])
+                if not pending:
+                    break
+                chunk, future = pending.popleft()
+                try:
+                    results = future.result()
+                except BrokenProcessPool:
+                    # a worker died, not necessarily on this chunk: every chunk in flight
+                    # fails with it. Predict this chunk again on its own, then resubmit
+                    # the pending chunks that did not finish before the pool broke
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    results, executor = _predict_isolated(new_pool(), new_pool, chunk, expected_values)
+                    for p in pending:
+                        if not _succeeded(p[1]):
+                            p[1] = _submit_chunk(executor, p[0], expected_values)
+                except Exception:
+                    error = traceback.format_exc()
+                    results = [(doc_name, None, error) for doc_name, _ in chunk]
+                for result in results:
+                    yield result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def eval(self, gold_docs, workers=1, chunksize=16):
+        """
+        evaluate against gold_docs, a dict of doc_name -> AnnotatedDocument.
+        With workers > 1 (or None for all cores) the documents are predicted in
+        parallel with predict_batch. Documents that fail to be predicted are
+        reported and left out of the metrics.
+        """
         import sklearn
         import pandas as pd
         fn_docs = []
         fp_docs = []
         prediction_metrics = []
-        gold_labels = [x.positive_label for x in gold_docs.values()]
+        gold_labels = []
         pred_labels = []
         print('Start to evaluate against reference standards...')
-        for doc_name, gold_doc in gold_docs.items():
-            gold_label = gold_doc.positive_label
-            pred_label = self.predict(gold_doc.text, doc_name)
+        if workers == 1:
+            predictions = ((doc_name, self.predict(gold_doc.text, doc_name), None)
+                           for doc_name, gold_doc in gold_docs.items())
+        else:
+            predictions = self.predict_batch(gold_docs, workers=workers, chunksize=chunksize)
+        for doc_name, pred_label, error in predictions:
+            if error is not None:
+                print('Failed to predict {0}:\n{1}'.format(doc_name, error))
+                continue
+            gold_label = gold_docs[doc_name].positive_label
+            gold_labels.append(gold_label)
             pred_labels.append(pred_label)
             #       Differentiate false positive and false negative error
             if gold_label == 0 and pred_label == 1:
@@ -79,7 +198,7 @@ class DocumentClassifier(object):
         prediction_metrics.append('Recall :    {0:.3f}'.format(recall))
         prediction_metrics.append('F1:         {0:.3f}'.format(f1))
 
-        return fn_docs, fp_docs, '\n'.join(prediction_metrics), confusion_matrix_df)
+        return fn_docs, fp_docs, '\n'.join(prediction_metrics), confusion_matrix_df
 
     def predict_against(self, doc, expected_values, doc_name='t_m_p.txt'):
         doc_conclusion = self.classify_doc(doc, doc_name)
@@ -92,12 +211,12 @@ class DocumentClassifier(object):
         if self.modifiers is None or self.targets is None:
             print('DocumentClassifier\'s "modifiers" and/or "targets" has not been set yet.\n' +
                   'Use function: setModifiersTargets(modifiers, targets) or setModifiersTargetsFromFiles(modifiers_file,' + 'targets_file) to set them up.')
-        context_doc = markup_context_document(doc, self.modifiers, self.targets)
+        context_doc = markup_context_document(doc, self.modifiers, self.targets, self.markup_backend,
+                                              self.sentence_splitter)
         if doc_name is not None and self.save_markups and len(context_doc.getDocumentGraph().nodes()) > 0:
             self.saved_markups_map[doc_name] = context_doc
         markups = get_document_markups(context_doc)
-        annotations, relations, doc_txt = convertMarkups2DF(markups)
-        matched_conclusion_types = self.feature_inferencer.process(annotations, relations)
+        matched_conclusion_types = self.feature_inferencer.process_markups(markups)
         doc_conclusion = self.document_inferencer.process(matched_conclusion_types)
         return doc_conclusion
 
@@ -108,107 +227,250 @@ class DocumentClassifier(object):
             return None
 
 
+_worker_classifier = None
+
+
+def _init_worker(classifier_args):
+    """build the classifier of a predict_batch worker process"""
+    global _worker_classifier
+    _worker_classifier = DocumentClassifier(**classifier_args)
+
+
+def _predict_chunk(chunk, expected_values=None):
+    return [_predict_document(_worker_classifier, doc_name, doc, expected_values) for doc_name, doc in chunk]
+
+
+def _predict_isolated(executor, new_pool, chunk, expected_values=None):
+    """
+    predict chunk alone in executor and, if a worker dies again, one document at a
+    time in a new pool each time one breaks it, so that only the documents that
+    crash a worker are reported as failed. Returns the results and the executor
+    to go on with.
+    """
+    try:
+        return executor.submit(_predict_chunk, chunk, expected_values).result(), executor
+    except BrokenProcessPool:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = new_pool()
+    results = []
+    for doc_name, doc in chunk:
+        try:
+            results.extend(executor.submit(_predict_chunk, [(doc_name, doc)], expected_values).result())
+        except BrokenProcessPool:
+            results.append((doc_name, None, traceback.format_exc()))
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = new_pool()
+    return results, executor
+
+
+def _submit_chunk(executor, chunk, expected_values=None):
+    """
+    submit chunk to executor. If a worker died since the last result was read,
+    the pool refuses new work: return a future failed like the ones in flight,
+    so that chunk is predicted again when its turn comes
+    """
+    try:
+        return executor.submit(_predict_chunk, chunk, expected_values)
+    except BrokenProcessPool as e:
+        future = Future()
+        future.set_exception(e)
+        return future
+
+
+def _succeeded(future):
+    return future.done() and not future.cancelled() and future.exception() is None
+
+
+def _predict_document(classifier, doc_name, doc, expected_values=None):
+    """return (doc_name, prediction, error), catching any failure of the prediction"""
+    try:
+        if expected_values is None:
+            prediction = classifier.predict(doc, doc_name)
+        else:
+            prediction = classifier.predict_against(doc, expected_values, doc_name)
+        return doc_name, prediction, None
+    except Exception:
+        return doc_name, None, traceback.format_exc()
+
+
+def _iter_named_docs(docs):
+    """generate (doc_name, text) pairs from the docs argument of predict_batch"""
+    if isinstance(docs, Mapping):
+        docs = docs.items()
+    for index, doc in enumerate(docs):
+        if isinstance(doc, tuple):
+            doc_name, doc = doc
+        else:
+            doc_name = index
+        yield doc_name, getattr(doc, 'text', doc)
+
+
+def _as_columns(table, names):
+    """return table as columns (a dict of lists), converting a DataFrame"""
+    if isinstance(table, Mapping):
+        return table
+    return df2columns(table, names)
+
+
 class FeatureInferencer(object):
-    match_checker = dict()
-    inference_map = dict()
-    rule_conclusion_types = []
-    rule_source_types = []
+    """
+    infer the conclusion types of the marked targets of a document. The rules are
+    compiled once (see compile_feature_rules) into an immutable FeatureRules,
+    which can be shared by several inferencers and shipped to worker processes.
+    """
 
     def __init__(self, ruleFile, header_lines=0, delimiter=','):
-        rules = read_csv_rules(ruleFile, lower=True, header_lines=header_lines, delimiter=delimiter)
-        self.match_checker.clear()
-        self.inference_map.clear()
-        inference_map = self.inference_map
-        match_checker = self.match_checker
-        rule_id = 0
-        for rule in rules:
-            conclusion_type = rule[0]
-            source_type = rule[1]
-            self.rule_conclusion_types.append(conclusion_type)
-            self.rule_source_types.append(source_type)
-            condition_values = rule[2:]
-            if source_type not in match_checker:
-                match_checker[source_type] = dict()
-                inference_map[source_type] = dict()
-            match_checker[source_type][rule_id] = set(condition_values)
-            inference_map[source_type][rule_id] = conclusion_type
-            rule_id += 1
-        pass
+        """ruleFile: a rule file name or rule string, or the FeatureRules compiled from one"""
+        if not isinstance(ruleFile, FeatureRules):
+            ruleFile = compile_feature_rules(ruleFile, header_lines, delimiter)
+        self.rules = ruleFile
+
+    @property
+    def match_checker(self):
+        return self.rules.match_checker
+
+    @property
+    def inference_map(self):
+        return self.rules.inference_map
+
+    @property
+    def rule_conclusion_types(self):
+        return self.rules.conclusion_types
+
+    @property
+    def rule_source_types(self):
+        return self.rules.source_types
 
     def process(self, annotations, relations):
+        """
+        annotations, relations: the DataFrames of visual.convertMarkups2DF or the
+        columns of visual.convertMarkups2Columns
+        """
+        annotations = _as_columns(annotations, ANNOTATION_COLUMNS)
+        relations = _as_columns(relations, RELATION_COLUMNS)
+        annotation_types = dict()
+        for markup_id, type in zip(annotations['markup_id'], annotations['type']):
+            annotation_types.setdefault(markup_id, type)
+        targets = [markup_id for markup_id, category in zip(annotations['markup_id'], annotations['vis_category'])
+                   if category == 'Target']
+        # the modifier values of each target; termination relations are skipped
+        target_modifiers = dict()
+        for relation_type, modifier_type, target_id in zip(relations['type'], relations['arg1_cate'],
+                                                           relations['arg2_id']):
+            if modifier_type == 'Modifier':
+                target_modifiers.setdefault(target_id, set()).add(relation_type)
+        return self.infer(list(zip(annotations['markup_id'], annotations['type'])),
+                          targets, annotation_types, target_modifiers)
+
+    def process_markups(self, markups):
+        """
+        infer the conclusions of the sentence markups of a document directly from
+        their graphs; the same as process on convertMarkups2Columns(markups)
+        """
+        nodes = []
+        targets = []
+        node_types = dict()
+        target_modifiers = dict()
+        terminated = set()
+        for markup in markups:
+            for node in markup.nodes():
+                if node not in node_types:
+                    node_types[node] = node.getCategory()[-1]
+                    nodes.append(node)
+            for modifier, target in markup.edges():
+                if target.getConTextCategory().title() == 'Modifier':
+                    terminated.add(modifier)
+                elif modifier.getConTextCategory().title() == 'Modifier':
+                    target_modifiers.setdefault(target, set()).add(modifier.getCategory()[0])
+        for node in nodes:
+            if node.getConTextCategory().title() == 'Target' and node not in terminated:
+                targets.append(node)
+        return self.infer([(node, node_types[node]) for node in nodes], targets, node_types, target_modifiers)
+
+    def infer(self, nodes, targets, node_types, target_modifiers):
+        """
+        nodes: (node, type) pairs of the marked items; targets: the target nodes;
+        node_types: the type of each node; target_modifiers: the set of modifier
+        values of each modified target. Returns the list of matched conclusion types:
+        those of the rules matched by each modified target (a rule is matched if its
+        modifier values are a subset of the target's), those of the unconditional
+        rules for each node of their source type, and the type of each target not
+        concluded by any rule
+        """
         matched_conclusion_types = []
-        inference_map = self.inference_map
-        match_checker = self.match_checker
-        sorted_modifiers = dict()
-        annotations_idx = annotations.set_index('markup_id')
-        target_markups = annotations[annotations['vis_category'] == 'Target']
-        targets = set(target_markups['markup_id'].tolist())
-        # match the source target type and modifier value pairs (relations)
-        # get a dictionary of matched rule_ids with corresponding total number of matched condition modifier values
-        for relation_id, relation in relations.iterrows():
-            relation_type = relation['type']
-            # not using relation['arg1_cate'] here, because for visualization purpose,
-            # the relation['arg1_cate'] (modifier_type) has been unified to 'Modifier'
-            target_id = relation['arg2_id']
-            if relation['arg1_cate'] != 'Modifier':
-                # if this is a termination relation, skip
+        rule_conclusions = self.rules.conclusion_types
+        unconditional_rules = self.rules.unconditional_rules
+        concluded = set()
+        for target_id, modifiers in target_modifiers.items():
+            source_type = node_types[target_id]
+            index = self.rules.rule_index.get(source_type)
+            if index is None:
                 continue
-            if target_id not in sorted_modifiers:
-                sorted_modifiers[target_id] = set()
-            sorted_modifiers[target_id].add(relation_type)
-
-        for target_id, modifiers in sorted_modifiers.items():
-            source_type = annotations_idx.loc[target_id, 'type']
-            for rule_id, modifiers_in_rule in match_checker[source_type].items():
-
-                if modifiers_in_rule < modifiers or modifiers_in_rule == modifiers or '' in modifiers_in_rule:
-                    matched_conclusion_types.append(inference_map[source_type][rule_id])
-                    if target_id in targets:
-                        targets.remove(target_id)
-
-        for source_type, matcher in match_checker.items():
-            for rule_id, condition_values in matcher.items():
-                if len(condition_values) == 0 or '' in condition_values:
-                    for index, anno in annotations.iterrows():
-                        if anno['type'] == source_type:
-                            matched_conclusion_types.append(inference_map[source_type][rule_id])
-                            if anno['markup_id'] in targets:
-                                targets.remove(anno['markup_id'])
+            rule_ids = list(unconditional_rules[source_type])
+            if len(index) < 2 ** len(modifiers):
+                for condition_values, ids in index.items():
+                    if condition_values <= modifiers:
+                        rule_ids.extend(ids)
+            else:
+                # look up every subset of the few modifier values of the target
+                modifiers = list(modifiers)
+                for mask in range(1, 2 ** len(modifiers)):
+                    subset = frozenset(m for i, m in enumerate(modifiers) if mask >> i & 1)
+                    rule_ids.extend(index.get(subset, ()))
+            if rule_ids:
+                matched_conclusion_types.extend(rule_conclusions[rule_id] for rule_id in sorted(rule_ids))
+                concluded.add(target_id)
+
+        type_counts = dict()
+        for node, type in nodes:
+            type_counts[type] = type_counts.get(type, 0) + 1
+        for source_type, rule_ids in unconditional_rules.items():
+            if rule_ids and source_type in type_counts:
+                for rule_id in rule_ids:
+                    matched_conclusion_types.extend([rule_conclusions[rule_id]] * type_counts[source_type])
 
         for target_id in targets:
-            type = annotations.loc[annotations['markup_id'] == target_id, 'type'].iloc[0]
-            matched_conclusion_types.append(type)
+            source_type = node_types[target_id]
+            if target_id not in concluded and not unconditional_rules.get(source_type):
+                matched_conclusion_types.append(source_type)
         return matched_conclusion_types
 
 
 class DocumentInferencer(object):
-    rule_matchers = dict()
-    doc_conclusions = []
-    expected_evidence_types = set()
-    default_conclusion = 'NEG_DOC'
+    """
+    infer the conclusion of a document from the conclusion types of its targets.
+    The rules are compiled once (see compile_document_rules) into an immutable
+    DocumentRules.
+    """
 
     def __init__(self, ruleFile, header_lines=0, delimiter=','):
-        rules = read_csv_rules(ruleFile, lower=True, header_lines=header_lines, delimiter=delimiter)
-        rule_id = 0
-        for rule in rules:
-            doc_type = rule[0]
-            # if no evidence type required, this is the default document conclusion type
-            if len(rules) == 1:
-                self.default_conclusion = doc_type
-                continue
-            self.doc_conclusions.append(doc_type)
-            matcher = set(rule[1:])
-            # save this for optimizing FeatureInferencer processing
-            self.expected_evidence_types.update(rule[1:])
-            self.rule_matchers[rule_id] = matcher
-            rule_id += 1
-        pass
+        """ruleFile: a rule file name or rule string, or the DocumentRules compiled from one"""
+        if not isinstance(ruleFile, DocumentRules):
+            ruleFile = compile_document_rules(ruleFile, header_lines, delimiter)
+        self.rules = ruleFile
+
+    @property
+    def rule_matchers(self):
+        return dict(enumerate(self.rules.rule_matchers))
+
+    @property
+    def doc_conclusions(self):
+        return self.rules.doc_conclusions
+
+    @property
+    def expected_evidence_types(self):
+        return self.rules.expected_evidence_types
+
+    @property
+    def default_conclusion(self):
+        return self.rules.default_conclusion
 
     def process(self, matched_conclusion_types):
-        for rule_id, matcher in self.rule_matchers.items():
+        matched_conclusion_types = set(matched_conclusion_types)
+        for matcher, doc_conclusion in zip(self.rules.rule_matchers, self.rules.doc_conclusions):
             if matcher.issubset(matched_conclusion_types):
-                return self.doc_conclusions[rule_id]
-        return self.default_conclusion
+                return doc_conclusion
+        return self.rules.default_conclusion
 
 
 def read_csv_rules(file_str, lower=True, header_lines=0, delimiter=','):
@@ -241,6 +503,107 @@ def read_csv_rules(file_str, lower=True, header_lines=0, delimiter=','):
     return rows
 
 
+# compiled rules, built once per rule file and never modified: they are shared by the
+# inferencers built from them and pickled as is to predict_batch workers
+FeatureRules = namedtuple('FeatureRules', ['conclusion_types', 'source_types', 'match_checker', 'inference_map',
+                                           'rule_index', 'unconditional_rules'])
+FeatureRules2 = namedtuple('FeatureRules2', ['conclusion_types', 'source_types', 'match_checker', 'inference_map'])
+DocumentRules = namedtuple('DocumentRules', ['doc_conclusions', 'rule_matchers', 'expected_evidence_types',
+                                             'default_conclusion'])
+
+
+def compile_feature_rules(ruleFile, header_lines=0, delimiter=','):
+    """
+    compile the rules of FeatureInferencer. Each rule is a conclusion type, a source
+    (target) type and the modifier values the target must have. The rules with
+    modifier values are indexed by (source type, modifier values); rules without
+    (or with an empty value) apply to every target of their source type
+    """
+    rules = read_csv_rules(ruleFile, lower=True, header_lines=header_lines, delimiter=delimiter)
+    match_checker = dict()
+    inference_map = dict()
+    rule_index = dict()
+    unconditional_rules = dict()
+    for rule_id, rule in enumerate(rules):
+        conclusion_type = rule[0]
+        source_type = rule[1]
+        condition_values = frozenset(rule[2:])
+        if source_type not in match_checker:
+            match_checker[source_type] = dict()
+            inference_map[source_type] = dict()
+            rule_index[source_type] = dict()
+            unconditional_rules[source_type] = []
+        match_checker[source_type][rule_id] = condition_values
+        inference_map[source_type][rule_id] = conclusion_type
+        if len(condition_values) == 0 or '' in condition_values:
+            unconditional_rules[source_type].append(rule_id)
+        else:
+            rule_index[source_type].setdefault(condition_values, []).append(rule_id)
+    return FeatureRules(conclusion_types=tuple(rule[0] for rule in rules),
+                        source_types=tuple(rule[1] for rule in rules),
+                        match_checker=match_checker,
+                        inference_map=inference_map,
+                        rule_index={source_type: {values: tuple(ids) for values, ids in index.items()}
+                                    for source_type, index in rule_index.items()},
+                        unconditional_rules={source_type: tuple(ids)
+                                             for source_type, ids in unconditional_rules.items()})
+
+
+def compile_feature_rules2(ruleFile, header_lines=0, delimiter=','):
+    """
+    compile the rules of FeatureInferencer2: the rule ids of each (source type,
+    modifier value) pair and the number of modifier values of each rule
+    """
+    rules = read_csv_rules(ruleFile, header_lines=header_lines, delimiter=delimiter)
+    match_checker = dict()
+    inference_map = dict()
+    for rule_id, rule in enumerate(rules):
+        source_type = rule[1]
+        condition_values = rule[2:]
+        if source_type not in inference_map:
+            inference_map[source_type] = dict()
+        for value in condition_values:
+            if value not in inference_map[source_type]:
+                inference_map[source_type][value] = set()
+            inference_map[source_type][value].add(rule_id)
+            if rule_id not in match_checker:
+                match_checker[rule_id] = 1
+            else:
+                match_checker[rule_id] += 1
+    # tuples in the iteration order of the sets, which decides between rules with as many matched values
+    return FeatureRules2(conclusion_types=tuple(rule[0] for rule in rules),
+                         source_types=tuple(rule[1] for rule in rules),
+                         match_checker=match_checker,
+                         inference_map={source_type: {value: tuple(rule_ids) for value, rule_ids in values.items()}
+                                        for source_type, values in inference_map.items()})
+
+
+def compile_document_rules(ruleFile, header_lines=0, delimiter=','):
+    """
+    compile the rules of DocumentInferencer: a document conclusion and the
+    conclusion types of its targets that imply it, tried in order
+    """
+    rules = read_csv_rules(ruleFile, lower=True, header_lines=header_lines, delimiter=delimiter)
+    default_conclusion = 'NEG_DOC'
+    doc_conclusions = []
+    rule_matchers = []
+    expected_evidence_types = set()
+    for rule in rules:
+        doc_type = rule[0]
+        # if no evidence type required, this is the default document conclusion type
+        if len(rules) == 1:
+            default_conclusion = doc_type
+            continue
+        doc_conclusions.append(doc_type)
+        rule_matchers.append(frozenset(rule[1:]))
+        # save this for optimizing FeatureInferencer processing
+        expected_evidence_types.update(rule[1:])
+    return DocumentRules(doc_conclusions=tuple(doc_conclusions),
+                         rule_matchers=tuple(rule_matchers),
+                         expected_evidence_types=frozenset(expected_evidence_types),
+                         default_conclusion=default_conclusion)
+
+
 # All the rule will be processed no matter in which order saved in this file
 # Rules with more modifier values (conditions) have higher priority
 
@@ -249,51 +612,65 @@ def read_csv_rules(file_str, lower=True, header_lines=0, delimiter=','):
 # the rule definition is different from the other implemention, where this need to list all the
 # possible combinations of modifiers that including the evidence modifier.
 class FeatureInferencer2(object):
-    match_checker = dict()
-    inference_map = dict()
-    rule_conclusion_types = []
-    rule_source_types = []
+    """FeatureInferencer for rules compiled with compile_feature_rules2"""
 
     def __init__(self, ruleFile, header_lines=0, delimiter=','):
-        rules = read_csv_rules(ruleFile, header_lines=header_lines, delimiter=delimiter)
-        self.match_checker.clear()
-        self.inference_map.clear()
-        inference_map = self.inference_map
-        match_checker = self.match_checker
-        rule_id = 0
-        for rule in rules:
-            conclusion_type = rule[0]
-            source_type = rule[1]
-            self.rule_conclusion_types.append(conclusion_type)
-            self.rule_source_types.append(source_type)
-            condition_values = rule[2:]
-            if source_type not in inference_map:
-                inference_map[source_type] = dict()
-            for value in condition_values:
-                if value not in inference_map[source_type]:
-                    inference_map[source_type][value] = set()
-                inference_map[source_type][value].add(rule_id)
-                if rule_id not in match_checker:
-                    match_checker[rule_id] = 1
-                else:
-                    match_checker[rule_id] += 1
-            rule_id += 1
-        pass
+        """ruleFile: a rule file name or rule string, or the FeatureRules2 compiled from one"""
+        if not isinstance(ruleFile, FeatureRules2):
+            ruleFile = compile_feature_rules2(ruleFile, header_lines, delimiter)
+        self.rules = ruleFile
+
+    @property
+    def match_checker(self):
+        return self.rules.match_checker
+
+    @property
+    def inference_map(self):
+        return self.rules.inference_map
+
+    @property
+    def rule_conclusion_types(self):
+        return self.rules.conclusion_types
+
+    @property
+    def rule_source_types(self):
+        return self.rules.source_types
 
     def process(self, annotations, relations):
+        """
+        annotations, relations: the DataFrames of visual.convertMarkups2DF or the
+        columns of visual.convertMarkups2Columns
+        """
+        annotations = _as_columns(annotations, ANNOTATION_COLUMNS)
+        relations = _as_columns(relations, RELATION_COLUMNS)
+        annotation_types = dict()
+        for markup_id, type in zip(annotations['markup_id'], annotations['type']):
+            annotation_types.setdefault(markup_id, type)
+        # not using modifier_type, because for visualizaiton purpose, the modifier_type has been unified to 'Modifier'
+        # modifier_type = relation['arg1_cate']
+        return self.infer((relation_type, target_id, annotation_types[target_id])
+                          for relation_type, target_id in zip(relations['type'], relations['arg2_id']))
+
+    def process_markups(self, markups):
+        """
+        infer the conclusions of the sentence markups of a document directly from
+        their graphs; the same as process on convertMarkups2Columns(markups)
+        """
+        return self.infer((modifier.getCategory()[0], target, target.getCategory()[-1])
+                          for markup in markups for modifier, target in markup.edges())
+
+    def infer(self, relations):
+        """
+        relations: (relation type, target, target type) triples in relation order.
+        Returns the set of matched conclusion types
+        """
         matched_conclusion_types = set()
-        inference_map = self.inference_map
-        match_checker = self.match_checker
+        inference_map = self.rules.inference_map
+        match_checker = self.rules.match_checker
         match_counters = dict()
-        annotations_idx = annotations.set_index('markup_id')
         # match the source target type and modifier value pairs (relations)
         # get a dictionary of matched rule_ids with corresponding total number of matched condition modifier values
-        for relation_id, relation in relations.iterrows():
-            relation_type = relation['type']
-            # not using modifier_type, because for visualizaiton purpose, the modifier_type has been unified to 'Modifier'
-            # modifier_type = relation['arg1_cate']
-            target_id = relation['arg2_id']
-            target_type = annotations_idx.loc[target_id, 'type']
+        for relation_type, target_id, target_type in relations:
             if target_type in inference_map and relation_type in inference_map[target_type]:
                 for rule_id in inference_map[target_type][relation_type]:
                     # if you know what you are expecting, and this conclusion type is not in your expectation list, ignore it
@@ -311,12 +688,12 @@ class FeatureInferencer2(object):
         for match_counter in match_counters.values():
             for rule_id in match_counter.keys():
                 if match_counter[rule_id] == match_checker[rule_id]:
-                    source_type = self.rule_source_types[rule_id]
+                    source_type = self.rules.source_types[rule_id]
                     if previous_matched_rule_id == -1 or match_counter[previous_matched_rule_id] <= match_checker[
                         rule_id]:
                         # if multiple rules are matched for the same source target type,
                         # prioritize the longer matches-- more detailed modifier values
                         previous_matched_rule_id = rule_id
             if previous_matched_rule_id > -1:
-                matched_conclusion_types.add(self.rule_conclusion_types[previous_matched_rule_id])
+                matched_conclusion_types.add(self.rules.conclusion_types[previous_matched_rule_id])
         return matched_conclusion_types
@@ -0,0 +1,92 @@
+"""
+Measure compare_utils.load_brat_project, which parses the files of a brat
+project in a pool of threads and can cache them in a directory of the caller,
+against the serial reading of docs_reader before it.
+
+The .txt and .ann files of data/training_v2.zip are copied into a temporary
+project until it has the requested number of documents. The project is loaded
+without the cache, with an empty cache, with a warm cache, and again after 1%
+of the .ann files were changed. Every result is checked against the serial one.
+
+usage: python benchmarks/bench_brat_loading.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import compare_utils
+from common import DATA
+
+SIZES = (1000, 10000)
+
+
+def make_project(project_dir, n):
+    with zipfile.ZipFile(DATA) as zf:
+        documents = [(zf.read(name[:-4] + ".txt"), zf.read(name))
+                     for name in sorted(zf.namelist()) if name.endswith(".ann")]
+    for i in range(n):
+        txt, ann = documents[i % len(documents)]
+        with open(os.path.join(project_dir, "doc{0:06d}.txt".format(i)), "wb") as f1:
+            f1.write(txt)
+        with open(os.path.join(project_dir, "doc{0:06d}.ann".format(i)), "wb") as f1:
+            f1.write(ann)
+
+
+def read_serially(project_dir):
+    """docs_reader before load_brat_project"""
+    annotation_map = {}
+    doc_map = {}
+    for basename, text, annotations in compare_utils.iter_project_docs(project_dir):
+        if text is not None:
+            doc_map[basename] = text
+        if annotations is not None:
+            annotation_map[basename] = annotations
+    return doc_map, annotation_map
+
+
+def results(doc_map, annotation_map):
+    return doc_map, {doc_name: {type_name: [(a.start_index, a.end_index, a.spanned_text) for a in annos]
+                                for type_name, annos in grouped.items()}
+                     for doc_name, grouped in annotation_map.items()}
+
+
+def measure(function, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    print("{0:>10} {1:>10} {2:>10} {3:>10} {4:>10} {5:>10}".format(
+        "documents", "serial(s)", "threads(s)", "cold(s)", "warm(s)", "1% new(s)"))
+    for n in SIZES:
+        project_dir = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp()
+        try:
+            make_project(project_dir, n)
+            expected, serial_time = measure(read_serially, project_dir)
+            expected = results(*expected)
+            timings = [serial_time]
+            for cache in (None, cache_dir, cache_dir):
+                loaded, elapsed = measure(compare_utils.load_brat_project, project_dir, cache_dir=cache)
+                assert results(*loaded) == expected
+                timings.append(elapsed)
+            for i in range(0, n, 100):
+                with open(os.path.join(project_dir, "doc{0:06d}.ann".format(i)), "a", newline="") as f1:
+                    f1.write("T999\tPNEUMONIA_DOC_NO 0 4\tDATE\n")
+            loaded, elapsed = measure(compare_utils.load_brat_project, project_dir, cache_dir=cache_dir)
+            assert results(*loaded) == results(*read_serially(project_dir))
+            timings.append(elapsed)
+            print("{0:10d} {1:10.3f} {2:10.3f} {3:10.3f} {4:10.3f} {5:10.3f}".format(n, *timings))
+        finally:
+            shutil.rmtree(project_dir)
+            shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Measure compare_utils.compare_corpus, which matches the annotations of every
+document at once with NumPy sorts and searchsorted, against the loop over the
+documents with strict_compare_one_doc and relax_compare_one_doc that compare
+ran before.
+
+The annotations of data/training_v2.zip are repeated until there are the
+requested number of documents; the second annotator is a copy in which some
+annotations are dropped and some spans moved. The Evaluators of both are
+checked to be identical, false positives and negatives included.
+
+usage: python benchmarks/bench_compare.py
+"""
+import copy
+import gc
+import os
+import random
+import sys
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import compare_utils
+from common import DATA
+
+SIZES = (1000, 10000, 50000)
+
+
+def read_annotations():
+    annotations = []
+    with zipfile.ZipFile(DATA) as zf:
+        for name in sorted(zf.namelist()):
+            if name.endswith(".ann"):
+                annotations.append(compare_utils.group_brat_annotations(zf.read(name).decode("utf-8").splitlines()))
+    return annotations
+
+
+def make_maps(corpus, n, rng):
+    annotation_map1 = {}
+    annotation_map2 = {}
+    for i in range(n):
+        doc_name = "doc{0:d}".format(i)
+        annotation_map1[doc_name] = corpus[i % len(corpus)]
+        grouped_annotations2 = {}
+        for type_name, annos in corpus[i % len(corpus)].items():
+            annos2 = []
+            for anno in annos:
+                if rng.random() < 0.1:
+                    continue
+                anno = copy.copy(anno)
+                if rng.random() < 0.2:
+                    anno.start_index += rng.randint(-5, 5)
+                    anno.end_index += rng.randint(-5, 5)
+                annos2.append(anno)
+            grouped_annotations2[type_name] = annos2
+        annotation_map2[doc_name] = grouped_annotations2
+    return annotation_map1, annotation_map2
+
+
+def compare_per_doc(annotation_map1, annotation_map2, compare_method):
+    """compare before compare_corpus"""
+    evaluators = {}
+    types = set()
+    for grouped_annotations in annotation_map1.values():
+        types.update(grouped_annotations.keys())
+    for grouped_annotations in annotation_map2.values():
+        types.update(grouped_annotations.keys())
+    for doc_name, grouped_annotations in annotation_map1.items():
+        if compare_method[0].lower().startswith('s'):
+            compare_utils.strict_compare_one_doc(evaluators, doc_name, grouped_annotations,
+                                                 annotation_map2[doc_name], sorted(types))
+        else:
+            compare_utils.relax_compare_one_doc(evaluators, doc_name, grouped_annotations,
+                                                annotation_map2[doc_name], sorted(types))
+    return evaluators
+
+
+def results(evaluators):
+    return [(type_name, e.get_values(), [(k, [id(a) for a in v]) for k, v in e.get_fps().items()],
+             [(k, [id(a) for a in v]) for k, v in e.get_fns().items()]) for type_name, e in evaluators.items()]
+
+
+def measure(function, *args):
+    gc.collect()
+    t0 = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    corpus = read_annotations()
+    rng = random.Random(0)
+    print("{0:>10} {1:>12} {2:>8} {3:>12} {4:>12}".format("documents", "annotations", "method", "per doc(s)",
+                                                             "corpus(s)"))
+    for n in SIZES:
+        annotation_map1, annotation_map2 = make_maps(corpus, n, rng)
+        count = sum(len(annos) for grouped in annotation_map1.values() for annos in grouped.values())
+        for compare_method in ("strict", "relax"):
+            expected, per_doc_time = measure(compare_per_doc, annotation_map1, annotation_map2, compare_method)
+            evaluators, corpus_time = measure(compare_utils.compare_corpus, annotation_map1, annotation_map2,
+                                              compare_method)
+            assert results(evaluators) == results(expected)
+            print("{0:10d} {1:12d} {2:>8} {3:12.3f} {4:12.3f}".format(n, count, compare_method, per_doc_time,
+                                                                      corpus_time))
+
+
+if __name__ == '__main__':
+    main()
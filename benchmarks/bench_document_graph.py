@@ -0,0 +1,47 @@
+"""
+Measure ConTextDocument.getDocumentGraph on long documents against folding
+the sentence markups with nx.union, which copied the accumulated graph for
+every sentence.
+
+Documents are built by repeating the sentences of a radiology report from
+data/training_v2.zip until they have the requested number of sentences.
+
+usage: python benchmarks/bench_document_graph.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import networkx as nx
+from common import load_lexicon, make_document, read_sentences
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+
+SIZES = (100, 300, 1000)
+
+
+def union_graph(context):
+    graph = ConTextMarkup()
+    for _, m in context.getSectionMarkups():
+        graph = nx.union(m, graph)
+    return graph
+
+
+def main():
+    modifiers, targets = load_lexicon()
+    corpus = read_sentences()
+    print("{0:>10} {1:>8} {2:>10} {3:>12} {4:>8}".format("sentences", "nodes", "union(s)", "document(s)", "speedup"))
+    for n in SIZES:
+        context = make_document((corpus * (n // len(corpus) + 1))[:n], modifiers, targets)
+        t0 = time.perf_counter()
+        union_graph(context)
+        t1 = time.perf_counter()
+        graph = context.getDocumentGraph()
+        t2 = time.perf_counter()
+        print("{0:10d} {1:8d} {2:10.3f} {3:12.4f} {4:7.1f}x".format(
+            n, len(graph), t1 - t0, t2 - t1, (t1 - t0) / (t2 - t1)))
+
+
+if __name__ == '__main__':
+    main()
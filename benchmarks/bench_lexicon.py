@@ -0,0 +1,45 @@
+"""
+Benchmark parsing the KB lexicons against loading their compiled artifacts.
+
+usage: python benchmarks/bench_lexicon.py [lexicon files...]
+"""
+import os
+import sys
+import tempfile
+import shutil
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import KB
+from pyConTextNLP import itemData
+
+DEFAULT_FILES = ["pneumonia_modifiers.tsv", "pneumonia_modifiers.yml",
+                 "pneumonia_targets.tsv", "pneumonia_targets.yml"]
+REPEATS = 50
+
+
+def timeit(func, *args):
+    t0 = time.perf_counter()
+    for _ in range(REPEATS):
+        func(*args)
+    return (time.perf_counter() - t0) / REPEATS * 1000
+
+
+def main(files):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print("{0:<28} {1:>6} {2:>10} {3:>12}".format("lexicon", "items", "parse(ms)", "artifact(ms)"))
+        for name in files:
+            fname = os.path.join(tmp_dir, os.path.basename(name))
+            shutil.copy(name if os.path.exists(name) else os.path.join(KB, name), fname)
+            items = itemData.compile_item_data(fname)
+            parse = timeit(itemData.get_item_data, fname)
+            load = timeit(itemData.load_item_data, fname)
+            print("{0:<28} {1:>6d} {2:>10.2f} {3:>12.2f}".format(os.path.basename(name), len(items), parse, load))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or DEFAULT_FILES)
@@ -0,0 +1,88 @@
+"""
+Compare the networkx and lite markup backends on the sentences of the
+radiology reports in data/training_v2.zip, marked with the pneumonia lexicon.
+
+For each backend the script reports the memory retained per sentence markup
+(tracemalloc growth while all markups are kept alive), the number of memory
+blocks allocated per sentence, and the markup time. Most report sentences mark
+nothing, so the same figures are also given for a dense problem-list sentence.
+
+usage: python benchmarks/bench_markup_backend.py
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import load_lexicon, read_sentences
+from pyConTextNLP.ConTextMarkup import get_markup_class
+from pyConTextNLP.tagIdAllocator import counterTagIdAllocator
+
+DENSE = ("No pneumonia, no effusion, no consolidation, possible infiltrate, "
+         "history of pneumonia, likely atelectasis, no opacity, ? consolidation, "
+         "cannot exclude pneumonia, patchy opacity, infiltrates are unchanged.")
+DENSE_COPIES = 200
+
+
+def markup_sentences(markupClass, sentences, modifiers, targets):
+    allocator = counterTagIdAllocator()
+    markups = []
+    for sentence in sentences:
+        markup = markupClass(tagIdAllocator=allocator)
+        markup.setRawText(sentence)
+        markup.cleanText()
+        markup.markItems(targets, mode="target")
+        markup.markItems(modifiers, mode="modifier")
+        markup.pruneMarks()
+        markup.dropMarks('Exclusion')
+        markup.applyModifiers()
+        markup.pruneSelfModifyingRelationships()
+        markup.dropInactiveModifiers()
+        markups.append(markup)
+    return markups
+
+
+def count_allocations(markupClass, sentences, modifiers, targets):
+    """count the memory blocks allocated (and not yet freed) while marking up"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    markups = markup_sentences(markupClass, sentences, modifiers, targets)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(s.size_diff for s in stats)
+    blocks = sum(s.count_diff for s in stats)
+    return markups, size, blocks
+
+
+def report(sentences, modifiers, targets):
+    print("{0:>10} {1:>14} {2:>16} {3:>10}".format("backend", "bytes/sentence", "blocks/sentence", "time(s)"))
+    for backend in ("networkx", "lite"):
+        markupClass = get_markup_class(backend)
+        markups, size, blocks = count_allocations(markupClass, sentences, modifiers, targets)
+        nodes = sum(len(m) for m in markups)
+        del markups
+        t0 = time.perf_counter()
+        markup_sentences(markupClass, sentences, modifiers, targets)
+        t1 = time.perf_counter()
+        print("{0:>10} {1:14.0f} {2:16.1f} {3:10.3f}".format(
+            backend, size / len(sentences), blocks / len(sentences), t1 - t0))
+    print("{0:.2f} marked items per sentence".format(nodes / len(sentences)))
+
+
+def main():
+    modifiers, targets = load_lexicon()
+    sentences = read_sentences()
+    print("{0:d} report sentences".format(len(sentences)))
+    report(sentences, modifiers, targets)
+    print()
+    print("{0:d} dense sentences".format(DENSE_COPIES))
+    report([DENSE] * DENSE_COPIES, modifiers, targets)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark per-item markItems against the single-pass itemMatcher.
+
+Lexicons of 10, 1k and 10k items are generated from the vocabulary of
+data/mtsamples_documents (mostly plain literals, with a few regular
+expression items) and both engines mark the first MAX_SENTENCES sentences of
+the corpus.
+
+usage: python benchmarks/bench_matcher.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import MTSAMPLES, read_sentences
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.itemData import itemData
+from pyConTextNLP.matcher import itemMatcher
+
+MAX_SENTENCES = 300
+
+
+def make_lexicon(size, vocabulary, rng):
+    items = itemData()
+    for i in range(size):
+        if i % 20 == 0:
+            word = rng.choice(vocabulary)
+            items.append([word, "CATEGORY_%d" % (i % 7), r"\b%ss?\b" % word, "forward"])
+        else:
+            literal = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 3)))
+            items.append([literal, "CATEGORY_%d" % (i % 7), "", "forward"])
+    return items
+
+
+def mark(sentences, items):
+    marks = []
+    for sentence in sentences:
+        markup = ConTextMarkup()
+        markup.setRawText(sentence)
+        markup.cleanText()
+        markup.markItems(items, mode="target")
+        marks.append([(n.getLiteral(), n.getSpan()) for n in markup.nodes()])
+    return marks
+
+
+def main():
+    rng = random.Random(0)
+    sentences = read_sentences(MTSAMPLES)[:MAX_SENTENCES]
+    vocabulary = sorted({w.lower() for s in sentences for w in s.rstrip(".").split() if w.isalpha()})
+    print("{0:d} sentences, {1:d} vocabulary words".format(len(sentences), len(vocabulary)))
+    print("{0:>8} {1:>12} {2:>12} {3:>8}".format("items", "per-item(s)", "matcher(s)", "speedup"))
+    for size in (10, 1000, 10000):
+        items = make_lexicon(size, vocabulary, rng)
+        items.compileREs()
+        t0 = time.perf_counter()
+        expected = mark(sentences, items)
+        t1 = time.perf_counter()
+        matcher = itemMatcher(items)
+        found = mark(sentences, matcher)
+        t2 = time.perf_counter()
+        assert expected == found, "matcher marks differ from per-item marks"
+        print("{0:>8d} {1:>12.3f} {2:>12.3f} {3:>7.1f}x".format(size, t1 - t0, t2 - t1, (t1 - t0) / (t2 - t1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Measure ConTextMarkup.pruneMarks on sentences with many overlapping marks.
+
+The pairwise comparison pruneMarks used before compared every mark with every
+later mark; the sweep only compares marks sharing a span start.
+
+usage: python benchmarks/bench_prunemarks.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.itemData import contextItem
+from pyConTextNLP.tagObject import tagObject
+
+SIZES = (100, 500, 2000)
+
+
+def pairwise_prune(marks):
+    marks = sorted(marks, key=lambda m: m[0].getSpan()[0])
+    nodes_to_remove = []
+    for i in range(len(marks)-1):
+        mark1 = marks[i]
+        if mark1[0] not in nodes_to_remove:
+            for j in range(i+1, len(marks)):
+                mark2 = marks[j]
+                if mark1[0].encompasses(mark2[0]) and \
+                   mark1[1]['category'] == mark2[1]['category']:
+                    nodes_to_remove.append(mark2[0])
+                elif mark2[0].encompasses(mark1[0]) and \
+                     mark2[1]['category'] == mark1[1]['category']:
+                    nodes_to_remove.append(mark1[0])
+                    break
+    return nodes_to_remove
+
+
+def make_markup(n, rng):
+    item = contextItem(["pneumonia", "EVIDENCE_OF_PNEUMONIA", "", ""])
+    context = ConTextMarkup()
+    for i in range(n):
+        start = rng.randrange(n * 5)
+        tag = tagObject(item, "target", tagid=i + 1)
+        tag.setSpan((start, start + rng.randrange(1, 30)))
+        context.add_node(tag, category=rng.choice(["target", "modifier"]))
+    return context
+
+
+def main():
+    rng = random.Random(0)
+    print("{0:>8} {1:>12} {2:>12} {3:>8}".format("marks", "pairwise(s)", "sweep(s)", "speedup"))
+    for n in SIZES:
+        context = make_markup(n, rng)
+        t0 = time.perf_counter()
+        pairwise_prune(list(context.nodes(data=True)))
+        t1 = time.perf_counter()
+        context.pruneMarks()
+        t2 = time.perf_counter()
+        print("{0:8d} {1:12.4f} {2:12.4f} {3:7.1f}x".format(n, t1 - t0, t2 - t1, (t1 - t0) / (t2 - t1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure ConTextMarkup.updateScopes and applyModifiers on dense sentences such
+as problem lists, against the pairwise comparisons they replaced.
+
+usage: python benchmarks/bench_scopes.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.itemData import contextItem
+from pyConTextNLP.tagObject import tagObject
+
+SIZES = (50, 200, 1000)
+CATEGORIES = ["definite_negated_existence", "probable_existence", "indication", "historical", "conj"]
+RULES = ["forward", "forward", "backward", "bidirectional", "terminate"]
+
+
+def pairwise(context):
+    modifiers = context.getConTextModeNodes("modifier")
+    for modifier in modifiers:
+        modifier.setScope()
+    for i in range(len(modifiers)-1):
+        modifier = modifiers[i]
+        for j in range(i+1, len(modifiers)):
+            modifier2 = modifiers[j]
+            if modifier.limitScope(modifier2) and \
+               modifier2.getRule().lower() == 'terminate':
+                context.add_edge(modifier2, modifier)
+            if modifier2.limitScope(modifier) and \
+               modifier.getRule().lower() == 'terminate':
+                context.add_edge(modifier, modifier2)
+    for target in context.getConTextModeNodes("target"):
+        for modifier in context.getConTextModeNodes("modifier"):
+            if modifier.applyRule(target):
+                context.add_edge(modifier, target)
+
+
+def make_markup(n, seed):
+    rng = random.Random(seed)
+    width = n * 12
+    context = ConTextMarkup()
+    for i in range(n):
+        start = rng.randrange(width)
+        if i % 2:
+            item = contextItem(["m", rng.choice(CATEGORIES), "", rng.choice(RULES)])
+            mode = "modifier"
+        else:
+            item = contextItem(["t", "pneumonia", "", ""])
+            mode = "target"
+        tag = tagObject(item, mode, scope=(0, width), tagid=i + 1)
+        tag.setSpan((start, start + rng.randrange(3, 15)))
+        context.add_node(tag, category=mode)
+    return context
+
+
+def main():
+    print("{0:>8} {1:>12} {2:>12} {3:>8}".format("marks", "pairwise(s)", "sorted(s)", "speedup"))
+    for n in SIZES:
+        c1 = make_markup(n, n)
+        c2 = make_markup(n, n)
+        t0 = time.perf_counter()
+        pairwise(c1)
+        t1 = time.perf_counter()
+        c2.applyModifiers()
+        t2 = time.perf_counter()
+        print("{0:8d} {1:12.4f} {2:12.4f} {3:7.1f}x".format(n, t1 - t0, t2 - t1, (t1 - t0) / (t2 - t1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare the sentence splitters of pyConTextNLP.helpers on the clinical notes in
+data/mtsamples_documents.
+
+The script reports the time each splitter takes to split the whole corpus and,
+when TextBlob and the NLTK punkt data are available, a boundary-agreement
+report of the clinical splitter against TextBlob: the sentence end offsets
+found by both, by only one of them, and the precision and recall of the
+clinical boundaries taking TextBlob as the reference. Disagreements of
+whitespace only (e.g. TextBlob keeping a trailing newline) are not counted.
+
+usage: python benchmarks/bench_sentence_splitter.py [number of disagreements to show]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import MTSAMPLES, read_texts
+from pyConTextNLP.helpers import get_sentence_splitter
+
+REPEATS = 20
+
+
+def time_splitter(name, documents, repeats):
+    splitter = get_sentence_splitter(name)
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        spans = [splitter.spanSentences(txt) for _, txt in documents]
+    t1 = time.perf_counter()
+    return spans, (t1 - t0) / repeats
+
+
+def boundaries(txt, spans):
+    """the sentence end offsets of spans, ignoring trailing white space"""
+    return set(len(txt[:end].rstrip()) for _, end in spans[:-1])
+
+
+def agreement(documents, clinical, reference, show):
+    both = only_clinical = only_reference = 0
+    examples = []
+    for (name, txt), spans, ref_spans in zip(documents, clinical, reference):
+        found = boundaries(txt, spans)
+        expected = boundaries(txt, ref_spans)
+        both += len(found & expected)
+        only_clinical += len(found - expected)
+        only_reference += len(expected - found)
+        for label, offsets in (("clinical only", found - expected), ("textblob only", expected - found)):
+            examples.extend((name, label, txt[max(0, i - 40):i + 40].replace("\n", "\\n"))
+                            for i in sorted(offsets))
+    precision = both / float(both + only_clinical) if both + only_clinical else 1.0
+    recall = both / float(both + only_reference) if both + only_reference else 1.0
+    print("boundaries found by both: {0:d}, clinical only: {1:d}, textblob only: {2:d}".format(
+        both, only_clinical, only_reference))
+    print("precision {0:.3f} recall {1:.3f} (textblob as reference)".format(precision, recall))
+    for name, label, context in examples[:show]:
+        print("{0:>14}  {1}: ...{2}...".format(label, name, context))
+
+
+def main():
+    show = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    documents = read_texts(MTSAMPLES)
+    print("{0:d} documents, {1:d} characters".format(len(documents), sum(len(txt) for _, txt in documents)))
+    print("{0:>10} {1:>10} {2:>12}".format("splitter", "sentences", "time(ms)"))
+    results = {}
+    for name, repeats in (("clinical", REPEATS), ("simple", REPEATS), ("textblob", 1)):
+        try:
+            spans, elapsed = time_splitter(name, documents, repeats)
+        except Exception as e:
+            # textblob is optional, and needs the NLTK punkt data
+            if name != "textblob":
+                raise
+            print("{0:>10} unavailable: {1}".format(name, str(e).strip().splitlines()[0]))
+            continue
+        results[name] = spans
+        print("{0:>10} {1:10d} {2:12.2f}".format(name, sum(len(s) for s in spans), 1000 * elapsed))
+    if "textblob" in results:
+        print()
+        agreement(documents, results["clinical"], results["textblob"], show)
+
+
+if __name__ == '__main__':
+    main()
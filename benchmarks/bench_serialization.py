@@ -0,0 +1,56 @@
+"""
+Compare the serializations of marked up documents: the binary format of
+pyConTextNLP.io.binary (which can be read back), pickle and getXML (which
+cannot), on the clinical notes in data/mtsamples_documents.
+
+The script reports the size of the serialized corpus and the time taken to
+write it and, for the formats that can be read back, to read it.
+
+usage: python benchmarks/bench_serialization.py [markup backend]
+"""
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import nlp_pneumonia_utils as npu
+from common import KB, MTSAMPLES, read_texts
+from pyConTextNLP.io import binary
+from pyConTextNLP.itemData import get_item_data
+
+REPEATS = 5
+
+
+def read_documents(backend):
+    modifiers = get_item_data(os.path.join(KB, "pneumonia_modifiers.yml"))
+    targets = get_item_data(os.path.join(KB, "pneumonia_targets.yml"))
+    return [npu.markup_context_document(txt, modifiers, targets, markup_backend=backend)
+            for _, txt in read_texts(MTSAMPLES)]
+
+
+def measure(function, values):
+    t0 = time.perf_counter()
+    for _ in range(REPEATS):
+        results = [function(v) for v in values]
+    return results, (time.perf_counter() - t0) / REPEATS
+
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else None
+    documents = read_documents(backend)
+    print("{0:d} documents, {1:d} sentences".format(
+        len(documents), sum(len(d.getDocumentMarkups()) for d in documents)))
+    print("{0:>8} {1:>10} {2:>10} {3:>10}".format("format", "size(KB)", "write(ms)", "read(ms)"))
+    formats = (("binary", binary.dumps, binary.loads),
+               ("pickle", lambda d: pickle.dumps(d, pickle.HIGHEST_PROTOCOL), pickle.loads),
+               ("xml", lambda d: d.getXML().encode("utf-8"), None))
+    for name, dumps, loads in formats:
+        data, write = measure(dumps, documents)
+        read = "{0:10.2f}".format(1000 * measure(loads, data)[1]) if loads is not None else "{0:>10}".format("-")
+        print("{0:>8} {1:10.1f} {2:10.2f} {3}".format(name, sum(len(d) for d in data) / 1000.0, 1000 * write, read))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Measure per-node memory and hashing cost of tagObject.
+
+Memory is the tracemalloc growth per tagObject created by ConTextMarkup for a
+match. Hashing compares the id-based tagObject.__hash__ with the previous
+hash(repr(tag)), which built an XML description of the tag on every call.
+
+usage: python benchmarks/bench_tagobject.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import networkx as nx
+from pyConTextNLP.itemData import contextItem
+from pyConTextNLP.tagObject import tagObject
+
+N = 100000
+
+
+def make_tags(item, n):
+    tags = []
+    for i in range(n):
+        tag = tagObject(item, "target", scope=(0, 100), tagid=i + 1)
+        tag.setSpan((i, i + 9))
+        tag.setPhrase("pneumonia")
+        tag.setMatchedGroupDictionary({})
+        tags.append(tag)
+    return tags
+
+
+def main():
+    item = contextItem(["pneumonia", "EVIDENCE_OF_PNEUMONIA", "", ""])
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tags = make_tags(item, N)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("memory per tagObject: {0:.0f} bytes".format((after - before - sys.getsizeof(tags)) / N))
+
+    t0 = time.perf_counter()
+    for tag in tags:
+        hash(tag)
+    t1 = time.perf_counter()
+    for tag in tags:
+        hash(repr(tag))
+    t2 = time.perf_counter()
+    print("hash(tag):       {0:.0f} ns".format((t1 - t0) / N * 1e9))
+    print("hash(repr(tag)): {0:.0f} ns".format((t2 - t1) / N * 1e9))
+
+    t0 = time.perf_counter()
+    graph = nx.DiGraph()
+    graph.add_nodes_from(tags, category="target")
+    for i in range(0, N - 1, 2):
+        graph.add_edge(tags[i], tags[i + 1])
+    graph.remove_nodes_from(tags[::3])
+    t1 = time.perf_counter()
+    print("networkx add/link/remove {0:d} nodes: {1:.3f} s".format(N, t1 - t0))
+
+
+if __name__ == '__main__':
+    main()
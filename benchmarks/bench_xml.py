@@ -0,0 +1,123 @@
+"""
+Measure ConTextDocument.writeXML, which streams the XML of a document to a
+file, against the getXML it replaced, which built the XML of every markup and
+of the document by repeated string concatenation before it was written.
+
+Documents are built by repeating the sentences of a radiology report from
+data/training_v2.zip until they have the requested number of sentences. The
+two outputs are checked to be identical; the peak memory allocated while
+writing is measured in a second pass with tracemalloc.
+
+usage: python benchmarks/bench_xml.py
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import load_lexicon, make_document, read_sentences
+from pyConTextNLP.ConTextMarkup import CONTEXT_MARKUP_XML_SKEL, EDGE_XML_SKEL, NODE_XML_SKEL
+from pyConTextNLP.io.xml import xmlScrub
+from pyConTextNLP.pyConText import ConTextDocumentXMLSkel
+
+SIZES = (100, 1000, 10000)
+
+
+def concatenated_markup_xml(markup):
+    """ConTextMarkup.getXML before writeXML"""
+    nodes = list(markup.nodes(data=True))
+    nodes.sort()
+    node_string = ''
+    for n in nodes:
+        attribute_string = ''
+        keys = list(n[1].keys())
+        keys.sort()
+        for k in keys:
+            attribute_string += """<{0}> {1} </{2}>\n""".format(k, n[1][k], k)
+        modification_string = ''
+        for mod in markup.predecessors(n[0]):
+            modification_string += """<modified_by>\n"""
+            modification_string += """<modifyingNode> %s </modifyingNode>\n""" % mod.getTagID()
+            modification_string += """<modifyingCategory> %s </modifyingCategory>\n""" % mod.getCategory()
+            modification_string += """</modified_by>\n"""
+        for modified in markup.successors(n[0]):
+            modification_string += """<modifies>\n"""
+            modification_string += """<modifiedNode> {0} </modifiedNode>\n""".format(modified.getTagID())
+            modification_string += """</modifies>\n"""
+        node_string += NODE_XML_SKEL.format(attribute_string + "{0}".format(n[0].getXML()) + modification_string)
+    edges = list(markup.edges(data=True))
+    edges.sort()
+    edge_string = ''
+    for edge in edges:
+        keys = list(edge[2].keys())
+        keys.sort()
+        attribute_string = ''
+        for key in keys:
+            attribute_string += """<{0}> {1} </{2}>\n""".format(key, edge[2][key], key)
+        edge_string += "{0}".format(EDGE_XML_SKEL.format(edge[0].getTagID(), edge[1].getTagID(), attribute_string))
+    return CONTEXT_MARKUP_XML_SKEL.format(xmlScrub(markup.getRawText()), xmlScrub(markup.getText()),
+                                          node_string, edge_string)
+
+
+def concatenated_document_xml(context):
+    """ConTextDocument.getXML before writeXML"""
+    txt = ""
+    documentString = ""
+    sentenceOffsets = {}
+    sections = context.getDocumentSections()
+    for s in sections:
+        for m in context.getSectionMarkups(s):
+            sentenceOffsets[m[0]] = len(documentString)
+            documentString = documentString + m[1].getText() + " "
+    txt += xmlScrub(documentString)
+    for s in sections:
+        txt += """<section>\n<sectionLabel> {0} </sectionLabel>\n""".format(s)
+        for m in context.getSectionMarkups(s):
+            txt += "<sentence>\n<sentenceNumber> %d </sentenceNumber>\n<sentenceOffset> %d </sentenceOffset></sentence>\n%s" % (
+                (m[0], sentenceOffsets[m[0]], concatenated_markup_xml(m[1])))
+        txt += """</section>\n"""
+    return ConTextDocumentXMLSkel.format(txt)
+
+
+def write_concatenated(context, f1):
+    f1.write(concatenated_document_xml(context))
+
+
+def write_streamed(context, f1):
+    context.writeXML(f1)
+
+
+def measure(write, context):
+    with open(os.devnull, "w") as f1:
+        t0 = time.perf_counter()
+        write(context, f1)
+        elapsed = time.perf_counter() - t0
+    with open(os.devnull, "w") as f1:
+        tracemalloc.start()
+        write(context, f1)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    modifiers, targets = load_lexicon()
+    corpus = read_sentences()
+    print("{0:>10} {1:>10} {2:>12} {3:>12} {4:>12} {5:>12}".format(
+        "sentences", "xml(MB)", "concat(s)", "stream(s)", "concat(MB)", "stream(MB)"))
+    for n in SIZES:
+        context = make_document((corpus * (n // len(corpus) + 1))[:n], modifiers, targets)
+        streamed = io.StringIO()
+        context.writeXML(streamed)
+        assert streamed.getvalue() == concatenated_document_xml(context)
+        concat_time, concat_peak = measure(write_concatenated, context)
+        stream_time, stream_peak = measure(write_streamed, context)
+        print("{0:10d} {1:10.1f} {2:12.3f} {3:12.3f} {4:12.1f} {5:12.1f}".format(
+            n, len(streamed.getvalue()) / 1e6, concat_time, stream_time, concat_peak / 1e6, stream_peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
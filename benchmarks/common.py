@@ -0,0 +1,62 @@
+"""
+Paths and data shared by the benchmarks.
+
+The benchmarks run as scripts (python benchmarks/bench_*.py), so this module
+is imported as common, after the script has put the repository root on
+sys.path.
+"""
+import glob
+import os
+import zipfile
+
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.itemData import get_item_data
+from pyConTextNLP.matcher import itemMatcher
+from pyConTextNLP.pyConText import ConTextDocument
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+KB = os.path.join(ROOT, "KB")
+# the annotated radiology reports
+DATA = os.path.join(ROOT, "data", "training_v2.zip")
+# longer clinical notes, as plain .txt files
+MTSAMPLES = os.path.join(ROOT, "data", "mtsamples_documents")
+
+
+def read_texts(path=DATA):
+    """return the (name, text) of the .txt documents of a zip archive or a directory, sorted by name"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            return [(name, zf.read(name).decode("utf-8")) for name in sorted(zf.namelist()) if name.endswith(".txt")]
+    texts = []
+    for name in sorted(glob.glob(os.path.join(path, "*.txt"))):
+        with open(name, encoding="utf-8", newline="") as f1:
+            texts.append((os.path.basename(name), f1.read()))
+    return texts
+
+
+def read_sentences(path=DATA):
+    """split the documents of read_texts into sentences at every period"""
+    return [s.strip() + "." for _, txt in read_texts(path) for s in txt.split(".") if s.strip()]
+
+
+def load_lexicon():
+    """return itemMatchers of the pneumonia modifiers and targets of KB"""
+    modifiers = itemMatcher(get_item_data(os.path.join(KB, "pneumonia_modifiers.yml")))
+    targets = itemMatcher(get_item_data(os.path.join(KB, "pneumonia_targets.yml")))
+    return modifiers, targets
+
+
+def make_document(sentences, modifiers, targets):
+    """mark up every sentence into a ConTextDocument"""
+    context = ConTextDocument()
+    for sentence in sentences:
+        markup = ConTextMarkup(tagIdAllocator=context.getTagIdAllocator())
+        markup.setRawText(sentence)
+        markup.cleanText()
+        markup.markItems(targets, mode="target")
+        markup.markItems(modifiers, mode="modifier")
+        markup.pruneMarks()
+        markup.applyModifiers()
+        markup.dropInactiveModifiers()
+        context.addMarkup(markup)
+    return context
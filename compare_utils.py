@@ -1,13 +1,23 @@
+import gc
+import hashlib
+import json
 import os
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from IPython.core.display import display
 from ipywidgets import HTML
 
 from nlp_pneumonia_utils import AnnotatedDocument, Annotation
 from intervaltree import IntervalTree
+import numpy as np
 import pandas as pd
 
+# the version of the JSON caches of parsed brat projects written by load_brat_project
+ANNOTATIONS_CACHE_VERSION = 2
+PROJECT_FILES_PER_TASK = 64
+
 
 class Evaluator:
 
@@ -86,43 +96,175 @@ def group_brat_annotations(lines):
     annotations = {}
     # BRAT FORMAT is:
     # NUMBER[TAB]TYPE[SPACE]START_INDEX[SPACE]END_INDEX[SPACE]SPANNED_TEXT
+    # a discontinuous annotation has several START_INDEX[SPACE]END_INDEX fragments separated by ';', and is compared
+    #  by the extent of its fragments. Lines of relations, events, attributes and notes are skipped.
     for line in lines:
         line = str(line)
-        if len(line.strip()) == 0:
+        if len(line.strip()) == 0 or not line.startswith('T'):
             continue
         tab_tokens = line.split('\t')
         space_tokens = tab_tokens[1].split()
+        fragments = [fragment.split() for fragment in ' '.join(space_tokens[1:]).split(';')]
         anno = Annotation()
         anno.spanned_text = tab_tokens[-1]
         anno.type = space_tokens[0]
-        anno.start_index = int(space_tokens[1])
-        anno.end_index = int(space_tokens[-1])
+        anno.start_index = min(int(fragment[0]) for fragment in fragments)
+        anno.end_index = max(int(fragment[1]) for fragment in fragments)
         if anno.type not in annotations:
             annotations[anno.type] = []
         annotations[anno.type].append(anno)
     return annotations
 
 
-def docs_reader(project_dir):
+def iter_project_docs(project_dir):
+    """
+    generate (basename, text, grouped annotations) for the documents of a brat
+    project directory in file name order, reading one document at a time. text
+    or the annotations are None if the document has no .txt or .ann file.
+    """
+    groups = OrderedDict()
+    for name in sorted(os.listdir(project_dir)):
+        if name.endswith('.txt') or name.endswith('.ann'):
+            groups.setdefault(name.split('.')[0], []).append(name)
+    for basename, names in groups.items():
+        text = None
+        annotations = None
+        for name in names:
+            # keep line endings as they are, since annotation offsets count them
+            if name.endswith('.txt'):
+                with open(os.path.join(project_dir, name), encoding='utf8', newline='') as f1:
+                    text = f1.read()
+            else:
+                with open(os.path.join(project_dir, name), encoding='utf8', newline='') as f2:
+                    annotations = group_brat_annotations(f2)
+        yield basename, text, annotations
+
+
+def read_project_file(path: str):
+    """
+    :return: the text of a .txt file, or the grouped annotations of a .ann file
+    """
+    # keep line endings as they are, since annotation offsets count them
+    with open(path, encoding='utf8', newline='') as f1:
+        if path.endswith('.txt'):
+            return f1.read()
+        return group_brat_annotations(f1)
+
+
+def read_project_files(paths: []) -> []:
+    return [read_project_file(path) for path in paths]
+
+
+def annotation_rows(grouped_annotations: dict) -> []:
+    return [[anno.type, anno.start_index, anno.end_index, anno.spanned_text]
+            for annos in grouped_annotations.values() for anno in annos]
+
+
+def group_annotation_rows(rows: []) -> dict:
+    annotations = {}
+    for type_name, start_index, end_index, spanned_text in rows:
+        anno = Annotation()
+        anno.type = type_name
+        anno.start_index = start_index
+        anno.end_index = end_index
+        anno.spanned_text = spanned_text
+        if type_name not in annotations:
+            annotations[type_name] = []
+        annotations[type_name].append(anno)
+    return annotations
+
+
+def project_cache_path(cache_dir: str, project_dir: str) -> str:
+    # one cache file per project directory
+    key = hashlib.sha1(os.path.abspath(project_dir).encode('utf8')).hexdigest()
+    return os.path.join(cache_dir, 'brat_project_{0}.json'.format(key))
+
+
+def load_project_cache(cache_path: str, project_dir: str) -> dict:
+    """
+    :return: a dictionary with a file name as the key, (modification time and size, parsed content) as the value.
+     It is empty when the cache is missing, unreadable, was written by another cache version or for another project.
+    """
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, encoding='utf8') as f0, gc_paused():
+            content = json.load(f0)
+            if content['version'] != ANNOTATIONS_CACHE_VERSION or \
+                    content['project_dir'] != os.path.abspath(project_dir):
+                return {}
+            return {name: ((mtime, size), parsed if name.endswith('.txt') else group_annotation_rows(parsed))
+                    for name, (mtime, size, parsed) in content['files'].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+def save_project_cache(cache_path: str, project_dir: str, files: dict):
+    content = {'version': ANNOTATIONS_CACHE_VERSION,
+               'project_dir': os.path.abspath(project_dir),
+               'files': {name: [mtime, size, parsed if name.endswith('.txt') else annotation_rows(parsed)]
+                         for name, ((mtime, size), parsed) in files.items()}}
+    # write to a temporary file first so a concurrent reader never reads a partial cache. A cache directory that
+    #  is not writable is simply not used
+    tmp_path = "{0}.{1:d}.tmp".format(cache_path, os.getpid())
+    try:
+        with open(tmp_path, 'w', encoding='utf8') as f0:
+            json.dump(content, f0)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_brat_project(project_dir: str, workers=None, cache_dir=None):
+    """
+    read the documents of a brat project directory, parsing the .txt and .ann files in a pool of threads. With a
+    cache_dir, the parsed files are cached there as JSON with their modification time and size, so that the next
+    call only parses the files that were added or changed since. Nothing is written to the project directory.
+    :param project_dir: the brat project directory
+    :param workers: the number of threads (default: ThreadPoolExecutor's default)
+    :param cache_dir: a directory of the caller to keep the cache in, or None not to use a cache
+    :return: a dictionary with the basename as the key, the text as the value, and a dictionary with the basename as
+     the key, the grouped annotations as the value (the same as docs_reader)
+    """
+    stamps = {}
+    with os.scandir(project_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.txt') or entry.name.endswith('.ann'):
+                stat = entry.stat()
+                stamps[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    names = sorted(stamps)
+    cache_path = None if cache_dir is None else project_cache_path(cache_dir, project_dir)
+    cached = {} if cache_path is None else load_project_cache(cache_path, project_dir)
+    stale = [name for name in names if name not in cached or cached[name][0] != stamps[name]]
+    if len(stale) > 0:
+        paths = [os.path.join(project_dir, name) for name in stale]
+        # a task per chunk of files: a task per file costs more than reading a small file from a local disk
+        chunks = [paths[i:i + PROJECT_FILES_PER_TASK] for i in range(0, len(paths), PROJECT_FILES_PER_TASK)]
+        with ThreadPoolExecutor(workers) as executor, gc_paused():
+            parsed = [content for contents in executor.map(read_project_files, chunks) for content in contents]
+        for name, content in zip(stale, parsed):
+            cached[name] = (stamps[name], content)
+    files = {name: cached[name] for name in names}
+    if cache_path is not None and (len(stale) > 0 or len(files) != len(cached)):
+        save_project_cache(cache_path, project_dir, files)
     annotation_map = {}
     doc_map = {}
-    for name in sorted(os.listdir(project_dir)):
-        basename = name.split('.')[0]
+    for name in names:
         if name.endswith('.txt'):
-            with open(os.path.join(project_dir, name)) as f1:
-                doc_map[basename] = f1.read()
-            f1.close()
-        elif name.endswith('.ann'):
-            annotation_map[basename] = {}
-            with open(os.path.join(project_dir, name)) as f2:
-                annotation_map[basename] = group_brat_annotations(f2.readlines())
-            f2.close()
+            doc_map[name.split('.')[0]] = files[name][1]
+        else:
+            annotation_map[name.split('.')[0]] = files[name][1]
     return doc_map, annotation_map
 
 
-def compare_projects(dir1: str, dir2: str, compare_method: str, types=set()) -> dict:
-    doc_map1, annotation_map1 = docs_reader(dir1)
-    doc_map2, annotation_map2 = docs_reader(dir2)
+def docs_reader(project_dir, workers=None, cache_dir=None):
+    return load_brat_project(project_dir, workers, cache_dir)
+
+
+def compare_projects(dir1: str, dir2: str, compare_method: str, types=set(), workers=None, cache_dir=None) -> dict:
+    doc_map1, annotation_map1 = docs_reader(dir1, workers, cache_dir)
+    doc_map2, annotation_map2 = docs_reader(dir2, workers, cache_dir)
     return doc_map1, compare(annotation_map1, annotation_map2, compare_method, types)
 
 
@@ -133,26 +275,188 @@ def compare(annotation_map1: dict, annotation_map2: dict, compare_method='relax'
     :param compare_method: "strict" or "relax"
     :return: a dictionary of Evaluators (each Evaluator stores the compared results of one annotation type)
     """
+    return compare_corpus(annotation_map1, annotation_map2, compare_method, types)
+
+
+def compare_corpus(annotation_map1: dict, annotation_map2: dict, compare_method='relax', types=set()) -> dict:
+    """
+    compare all the documents at once: the annotations of both maps are put in NumPy arrays of (group, start, end),
+    where a group is one type in one document, and matched with sorts and searchsorted instead of a loop (and an
+    IntervalTree) per document and type. The Evaluators are the same as the ones strict_compare_one_doc and
+    relax_compare_one_doc fill in, down to the order of their false positives and false negatives.
+    :param annotation_map1: a dictionary with doc_name as the key, grouped annotations as the value
+    :param annotation_map2: a dictionary with doc_name as the key, grouped annotations as the value (of reference annotator)
+    :param compare_method: "strict" or "relax"
+    :param types: the annotation types to compare, all the types of both maps if empty
+    :return: a dictionary of Evaluators (each Evaluator stores the compared results of one annotation type)
+    """
     if len(annotation_map1) != len(annotation_map2):
         raise ValueError("The two input datasets don't have a equal amount of documents.")
-        return None
-    evaluators = {}
+    if len(annotation_map1) == 0:
+        return {}
     # if you know the list of types that you will compare, you can set it up. Otherwise, it will go over all
     #  the annotations to find all the types
     if len(types) == 0:
+        types = set()
         for grouped_annotations in annotation_map1.values():
             types.update(grouped_annotations.keys())
         for grouped_annotations in annotation_map2.values():
             types.update(grouped_annotations.keys())
-    for doc_name, grouped_annotations in annotation_map1.items():
-        if compare_method[0].lower().startswith('s'):
-            strict_compare_one_doc(evaluators, doc_name, grouped_annotations, annotation_map2[doc_name], sorted(types))
-        else:
-            relax_compare_one_doc(evaluators, doc_name, grouped_annotations, annotation_map2[doc_name], sorted(types))
+    # the comparison creates no reference cycles, but collecting while it allocates the lists of a large corpus
+    #  takes as long as the matching
+    with gc_paused():
+        return compare_groups(annotation_map1, annotation_map2, compare_method, sorted(types))
 
+
+def compare_groups(annotation_map1: dict, annotation_map2: dict, compare_method: str, types: []) -> dict:
+    """
+    the matching of compare_corpus, for a list of sorted types
+    """
+    evaluators = {type_name: Evaluator() for type_name in types}
+    # (doc_name, type_name, annotations1, annotations2) in the order the documents and types are compared. When one
+    #  side has no annotations of the type they are all false positives (or negatives) and the other side is None
+    pairs = []
+    for doc_name, grouped_annotations1 in annotation_map1.items():
+        grouped_annotations2 = annotation_map2[doc_name]
+        for type_name in types:
+            if type_name not in grouped_annotations1:
+                if type_name in grouped_annotations2:
+                    pairs.append((doc_name, type_name, None, grouped_annotations2[type_name]))
+            elif type_name not in grouped_annotations2 or len(grouped_annotations2[type_name]) == 0:
+                pairs.append((doc_name, type_name, grouped_annotations1[type_name], None))
+            else:
+                pairs.append((doc_name, type_name, grouped_annotations1[type_name], grouped_annotations2[type_name]))
+    groups = [(annos1, annos2) for _, _, annos1, annos2 in pairs if annos1 is not None and annos2 is not None]
+    group1, starts1, ends1, annos1 = annotation_arrays([annos1 for annos1, _ in groups])
+    group2, starts2, ends2, annos2 = annotation_arrays([annos2 for _, annos2 in groups])
+    if compare_method[0].lower().startswith('s'):
+        fp_ids, fn_ids, tp_ids = strict_match_arrays(group1, starts1, ends1, group2, starts2, ends2)
+    else:
+        fp_ids, fn_ids, tp_ids = relax_match_arrays(group1, starts1, ends1, group2, starts2, ends2)
+    # where the false positives (false negatives, true positives) of each group start
+    group_ids = np.arange(len(groups) + 1)
+    fp_bounds = np.searchsorted(group1[fp_ids], group_ids).tolist()
+    fn_bounds = np.searchsorted(group2[fn_ids], group_ids).tolist()
+    tp_bounds = np.searchsorted(group2[tp_ids], group_ids).tolist()
+    fps = [annos1[i] for i in fp_ids.tolist()]
+    fns = [annos2[i] for i in fn_ids.tolist()]
+    g = 0
+    for doc_name, type_name, annos_list1, annos_list2 in pairs:
+        evaluator = evaluators[type_name]
+        if annos_list1 is None:
+            evaluator.add_fn(len(annos_list2))
+            evaluator.append_fns(doc_name, annos_list2)
+        elif annos_list2 is None:
+            evaluator.add_fp(len(annos_list1))
+            evaluator.append_fps(doc_name, annos_list1)
+        else:
+            evaluator.add_tp(tp_bounds[g + 1] - tp_bounds[g])
+            if fp_bounds[g + 1] > fp_bounds[g]:
+                evaluator.add_fp(fp_bounds[g + 1] - fp_bounds[g])
+                evaluator.append_fps(doc_name, fps[fp_bounds[g]:fp_bounds[g + 1]])
+            if fn_bounds[g + 1] > fn_bounds[g]:
+                evaluator.add_fn(fn_bounds[g + 1] - fn_bounds[g])
+                evaluator.append_fns(doc_name, fns[fn_bounds[g]:fn_bounds[g + 1]])
+            g += 1
     return evaluators
 
 
+@contextmanager
+def gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def annotation_arrays(annotation_lists: []):
+    """
+    :param annotation_lists: a list of annotation lists, one per group
+    :return: the group, start and end of every annotation as int64 arrays, and the annotations in the same order
+    """
+    annos = [anno for annos_list in annotation_lists for anno in annos_list]
+    groups = np.repeat(np.arange(len(annotation_lists), dtype=np.int64),
+                       [len(annos_list) for annos_list in annotation_lists])
+    starts = np.fromiter((anno.start_index for anno in annos), np.int64, len(annos))
+    ends = np.fromiter((anno.end_index for anno in annos), np.int64, len(annos))
+    return groups, starts, ends, annos
+
+
+def span_keys(groups, positions, low: int, width: int):
+    # a position within its group, as one number that sorts by group first
+    return groups * width + (positions - low)
+
+
+def span_key_range(*positions):
+    # the lowest position and a width wider than any span, so that the keys of two groups never overlap
+    positions = np.concatenate(positions + (np.zeros(1, dtype=np.int64),))
+    return int(positions.min()), int(positions.max() - positions.min()) + 2
+
+
+def strict_match_arrays(group1, starts1, ends1, group2, starts2, ends2):
+    """
+    match the spans of two sets the way strict_compare_one_doc does: both are sorted by start (stable, so ties keep
+    their order), the k-th annotation of set 1 that starts at a position is paired with the k-th annotation of set 2
+    that starts there, and a pair is a true positive when the ends are equal too. Unpaired annotations of set 1 are
+    false positives; unpaired annotations of set 2, and those paired with a different end, are false negatives.
+    :return: the ids of the false positives in set 1, of the false negatives and the true positives in set 2, each
+     in order of group, then start
+    """
+    low, width = span_key_range(starts1, ends1, starts2, ends2)
+    keys1 = span_keys(group1, starts1, low, width)
+    keys2 = span_keys(group2, starts2, low, width)
+    order1 = np.argsort(keys1, kind='stable')
+    order2 = np.argsort(keys2, kind='stable')
+    keys1 = keys1[order1]
+    keys2 = keys2[order2]
+    # the rank of each annotation among those of its own set starting at the same position, and where those of the
+    #  other set starting there are
+    rank1 = np.arange(len(keys1)) - np.searchsorted(keys1, keys1, 'left')
+    rank2 = np.arange(len(keys2)) - np.searchsorted(keys2, keys2, 'left')
+    paired1 = rank1 < np.searchsorted(keys2, keys1, 'right') - np.searchsorted(keys2, keys1, 'left')
+    first1 = np.searchsorted(keys1, keys2, 'left')
+    exact2 = rank2 < np.searchsorted(keys1, keys2, 'right') - first1
+    exact2[exact2] = ends1[order1[first1[exact2] + rank2[exact2]]] == ends2[order2[exact2]]
+    return order1[~paired1], order2[~exact2], order2[exact2]
+
+
+def overlapping(groups, starts, ends, other_groups, other_starts, other_ends):
+    """
+    :return: whether each span overlaps any span of the other set in the same group. Like the IntervalTree queries of
+     relax_compare_one_doc, spans are half open, so spans that only touch do not overlap, and an empty span overlaps
+     nothing.
+    """
+    low, width = span_key_range(starts, ends, other_starts, other_ends)
+    others = np.flatnonzero(other_starts < other_ends)
+    begins = span_keys(other_groups[others], other_starts[others], low, width)
+    order = np.argsort(begins, kind='stable')
+    begins = begins[order]
+    # the furthest the other spans up to each one in begin order reach. Those of the previous groups never reach
+    #  the keys of the next group
+    reach = np.maximum.accumulate(span_keys(other_groups[others], other_ends[others], low, width)[order])
+    # the other spans of the group that begin before each span ends
+    before_end = np.searchsorted(begins, span_keys(groups, ends, low, width), 'left')
+    overlaps = (before_end > 0) & (starts < ends)
+    overlaps[overlaps] = reach[before_end[overlaps] - 1] > span_keys(groups[overlaps], starts[overlaps], low, width)
+    return overlaps
+
+
+def relax_match_arrays(group1, starts1, ends1, group2, starts2, ends2):
+    """
+    match the spans of two sets the way relax_compare_one_doc does: an annotation of set 2 is a true positive when it
+    overlaps any annotation of set 1 and a false negative otherwise, and the annotations of set 1 that overlap none
+    of set 2 are false positives.
+    :return: the ids of the false positives in set 1, of the false negatives and the true positives in set 2, each
+     in their original order
+    """
+    covered1 = overlapping(group1, starts1, ends1, group2, starts2, ends2)
+    covered2 = overlapping(group2, starts2, ends2, group1, starts1, ends1)
+    return np.flatnonzero(~covered1), np.flatnonzero(~covered2), np.flatnonzero(covered2)
+
+
 #  consider a match only when the annotations' spans exactly match (both start and end are equal)
 #  evaluator, annotations to be compared, reference annotations
 def strict_compare_one_doc(evaluators: Evaluator, doc_name: str, grouped_annotations1: [], grouped_annotations2: [],
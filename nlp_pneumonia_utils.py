@@ -1,12 +1,14 @@
 import os
+import json
 import urllib
 import zipfile
 import codecs
+from collections import OrderedDict
 import sklearn.metrics
 import pandas as pd
 import pyConTextNLP
-from pyConTextNLP import pyConText
-from textblob import TextBlob
+from pyConTextNLP import pyConText, helpers
+from pyConTextNLP.regexCache import REGEX_CACHE
 from radnlp.data import classrslts
 import radnlp.view as rview
 from IPython.display import display, HTML, Image
@@ -78,45 +80,178 @@ def read_doc_annotations(archive_file, force_redownload=False, pos_type='PNEUMON
     else:
         filename = archive_file
 
-    annotated_doc_map = {}
-
     print('Opening local file : ' + filename)
-    z = zipfile.ZipFile(filename, "r")
-    zinfo = z.namelist()
-    for name in zinfo:
+    annotated_doc_map = dict(iter_zip_documents(filename, pos_type))
+
+    return annotated_doc_map
+
+
+def set_positive_label(anno_doc, pos_type='PNEUMONIA_DOC_YES'):
+    """assign 1 to anno_doc.positive_label if it has an annotation of type pos_type, 0 otherwise"""
+    anno_doc.positive_label = 0
+    for anno in anno_doc.annotations:
+        # NOTE : This "positive_label" relates to positive/possible cases of pneumonia
+        if anno.type == pos_type:
+            anno_doc.positive_label = 1
+    return anno_doc
+
+
+def __group_members(names, basename):
+    """group file names by document basename, keeping the order of first appearance"""
+    groups = OrderedDict()
+    for name in names:
         if name.endswith('.txt') or name.endswith('.ann'):
-            basename = name.split('.')[0].split('/')[-1]
-            if basename not in annotated_doc_map:
-                annotated_doc_map[basename] = AnnotatedDocument()
-            anno_doc = annotated_doc_map[basename]
-            # handle text and BRAT annotation files (.ann) differently
-            if name.endswith('.txt'):
+            groups.setdefault(basename(name), []).append(name)
+    return groups
+
+
+def iter_zip_documents(archive_file, pos_type='PNEUMONIA_DOC_YES'):
+    """
+    generate (doc_name, AnnotatedDocument) pairs for the .txt and .ann members of a
+    zip archive. Only the member names are read up front; each document is read
+    when it is generated.
+    """
+    with zipfile.ZipFile(archive_file, "r") as z:
+        groups = __group_members(z.namelist(), lambda name: name.split('.')[0].split('/')[-1])
+        for basename, names in groups.items():
+            anno_doc = AnnotatedDocument()
+            for name in names:
+                # handle text and BRAT annotation files (.ann) differently
                 with z.open(name) as f1:
-                    anno_doc.text = f1.read().decode('utf8')
+                    if name.endswith('.txt'):
+                        anno_doc.text = f1.read().decode('utf8')
+                    else:
+                        # handle this as utf8 or we get back byte arrays
+                        anno_doc.annotations = read_brat_annotations(codecs.iterdecode(f1, 'utf8'))
+            yield basename, set_positive_label(anno_doc, pos_type)
+
+
+def iter_dir_documents(directory, pos_type='PNEUMONIA_DOC_YES'):
+    """
+    generate (doc_name, AnnotatedDocument) pairs for the .txt and .ann files of a
+    directory, in file name order
+    """
+    groups = __group_members(sorted(os.listdir(directory)), lambda name: name.split('.')[0])
+    for basename, names in groups.items():
+        anno_doc = AnnotatedDocument()
+        for name in names:
+            # keep line endings as they are, since annotation offsets count them
+            with open(os.path.join(directory, name), encoding='utf8', newline='') as f1:
+                if name.endswith('.txt'):
+                    anno_doc.text = f1.read()
+                else:
+                    anno_doc.annotations = read_brat_annotations(f1)
+        yield basename, set_positive_label(anno_doc, pos_type)
+
+
+def iter_jsonl_documents(jsonl_file, pos_type='PNEUMONIA_DOC_YES', name_field='doc_name', text_field='text'):
+    """
+    generate (doc_name, AnnotatedDocument) pairs from a JSON lines file with one
+    document object per line, e.g.
+    {"doc_name": "report1", "text": "...",
+     "annotations": [{"type": "PNEUMONIA_DOC_YES", "start": 0, "end": 9, "text": "pneumonia"}],
+     "positive_label": 1}
+    annotations and positive_label are optional; without positive_label the label
+    is set from the annotations. Documents without a name are named by line number.
+    """
+    with open(jsonl_file, encoding='utf8') as f1:
+        for line_number, line in enumerate(f1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            anno_doc = AnnotatedDocument()
+            anno_doc.text = record.get(text_field, '')
+            for a in record.get('annotations', ()):
+                anno = Annotation()
+                anno.type = a['type']
+                anno.start_index = a['start']
+                anno.end_index = a['end']
+                anno.spanned_text = a.get('text', anno_doc.text[anno.start_index:anno.end_index])
+                anno_doc.annotations.append(anno)
+            if 'positive_label' in record:
+                anno_doc.positive_label = record['positive_label']
             else:
-                with z.open(name) as f1:
-                    # handle this as utf8 or we get back byte arrays
-                    # print(name)
-                    anno_doc.annotations = read_brat_annotations(codecs.iterdecode(f1, 'utf8'))
-
-    # now let's finally assign a 0 or 1 to each document based on whether we see our expected type for the pneumonia label
-    for key, anno_doc in annotated_doc_map.items():
-        annos = anno_doc.annotations
-        anno_doc.positive_label = 0
-        for anno in annos:
-            # NOTE : This "positive_label" relates to positive/possible cases of pneumonia
-            if anno.type == pos_type:
-                anno_doc.positive_label = 1
+                set_positive_label(anno_doc, pos_type)
+            yield record.get(name_field, line_number), anno_doc
 
-    return annotated_doc_map
 
+def iter_documents(source, pos_type='PNEUMONIA_DOC_YES', **kwargs):
+    """
+    generate (doc_name, AnnotatedDocument) pairs from source, a zip archive, a
+    directory of .txt/.ann files or a JSON lines file (.jsonl, .ndjson).
+    Documents are read one at a time, so corpora larger than memory can be
+    processed, e.g.
+
+    write_jsonl_predictions(classify_documents(iter_documents('reports.zip'), classifier, workers=8),
+                            'predictions.jsonl')
+    """
+    if os.path.isdir(source):
+        return iter_dir_documents(source, pos_type)
+    if source.endswith('.zip'):
+        return iter_zip_documents(source, pos_type)
+    if source.endswith('.jsonl') or source.endswith('.ndjson'):
+        return iter_jsonl_documents(source, pos_type, **kwargs)
+    raise ValueError('Cannot read documents from {0}: expected a directory, a .zip or a .jsonl file'.format(source))
 
-def calculate_prediction_metrics(gold_docs, prediction_function):
-    gold_labels = [x.positive_label for x in gold_docs]
-    pred_labels = []
-    for gold_doc in gold_docs:
-        pred_label = prediction_function(gold_doc.text)
-        pred_labels.append(pred_label)
+
+def markup_documents(documents, modifiers, targets, markup_backend=None, sentence_splitter=None):
+    """
+    generate (doc_name, document, ConTextDocument) for the (doc_name, document)
+    pairs of documents, e.g. from iter_documents
+    """
+    splitter = helpers.get_sentence_splitter(sentence_splitter)
+    for doc_name, doc in documents:
+        yield doc_name, doc, markup_context_document(doc.text, modifiers, targets, markup_backend, splitter)
+
+
+def classify_documents(documents, classifier, workers=1, chunksize=16):
+    """
+    generate (doc_name, prediction, error) for the (doc_name, document) pairs of
+    documents, in order, with DocumentClassifier.predict_batch
+    """
+    return classifier.predict_batch(documents, workers=workers, chunksize=chunksize)
+
+
+def write_jsonl_predictions(predictions, output_file):
+    """
+    write (doc_name, prediction, error) triples, e.g. from classify_documents, to
+    output_file (a path or a text file object) as JSON lines. Returns the number
+    of predictions written.
+    """
+    if isinstance(output_file, str):
+        with open(output_file, 'w', encoding='utf8') as f1:
+            return write_jsonl_predictions(predictions, f1)
+    count = 0
+    for doc_name, prediction, error in predictions:
+        output_file.write(json.dumps({'doc_name': doc_name, 'prediction': prediction, 'error': error}))
+        output_file.write('\n')
+        count += 1
+    return count
+
+
+def calculate_prediction_metrics(gold_docs, prediction_function, workers=1, chunksize=16):
+    """
+    prediction_function: a function taking a document text, or a classifier with a
+    predict_batch method (DocumentClassifier.DocumentClassifier), in which case the
+    documents are predicted with predict_batch: in this process by default, by
+    worker processes with workers > 1 (or None for all cores)
+    """
+    if hasattr(prediction_function, 'predict_batch'):
+        gold_labels = []
+        pred_labels = []
+        for index, pred_label, error in prediction_function.predict_batch(gold_docs, workers=workers,
+                                                                          chunksize=chunksize):
+            if error is not None:
+                print('Failed to predict document {0}:\n{1}'.format(index, error))
+                continue
+            gold_labels.append(gold_docs[index].positive_label)
+            pred_labels.append(pred_label)
+    else:
+        gold_labels = [x.positive_label for x in gold_docs]
+        pred_labels = []
+        for gold_doc in gold_docs:
+            pred_label = prediction_function(gold_doc.text)
+            pred_labels.append(pred_label)
 
     # now let's use scikit-learn to compute some metrics
     precision = sklearn.metrics.precision_score(gold_labels, pred_labels)
@@ -135,14 +270,30 @@ def calculate_prediction_metrics(gold_docs, prediction_function):
 
 
 def list_errors(gold_docs, prediction_function, pos_values={'PNEUMONIA_DOC_YES'},
-                print_prediction_metrics=False):
+                print_prediction_metrics=False, workers=1, chunksize=16):
+    """
+    prediction_function: a function taking a document text, pos_values and the
+    document name, or a classifier with a predict_batch method
+    (DocumentClassifier.DocumentClassifier), in which case the documents are
+    predicted against pos_values with predict_batch: in this process by default,
+    by worker processes with workers > 1 (or None for all cores)
+    """
     fn_docs = []
     fp_docs = []
-    gold_labels = [x.positive_label for x in gold_docs.values()]
+    gold_labels = []
     pred_labels = []
-    for doc_name, gold_doc in gold_docs.items():
-        gold_label = gold_doc.positive_label;
-        pred_label = prediction_function(gold_doc.text, pos_values, doc_name)
+    if hasattr(prediction_function, 'predict_batch'):
+        predictions = prediction_function.predict_batch(gold_docs, workers=workers, chunksize=chunksize,
+                                                        expected_values=pos_values)
+    else:
+        predictions = ((doc_name, prediction_function(gold_doc.text, pos_values, doc_name), None)
+                       for doc_name, gold_doc in gold_docs.items())
+    for doc_name, pred_label, error in predictions:
+        if error is not None:
+            print('Failed to predict {0}:\n{1}'.format(doc_name, error))
+            continue
+        gold_label = gold_docs[doc_name].positive_label
+        gold_labels.append(gold_label)
         pred_labels.append(pred_label)
         #       Differentiate false positive and false negative error
         if gold_label == 0 and pred_label == 1:
@@ -168,53 +319,21 @@ def list_errors(gold_docs, prediction_function, pos_values={'PNEUMONIA_DOC_YES'}
     return fn_docs, fp_docs
 
 
-def __insert_color_custom(txt, s, c):
-    """insert HTML span style into txt. The span will change the color of the
-    text located between s[0] and s[1]:
-    txt: txt to be modified
-    s: span of where to insert tag
-    c: color to set the span to"""
-    return txt[:s[0]] + '<span style="font-weight: bold;color: {0};">'.format(c) + \
-           txt[s[0]:s[1]] + '</span>' + txt[s[1]:]
-
-
 # helper functions to highlight annotations from BRAT
 def mark_text(txt, nodes, colors={"name": "red", "pet": "blue"}, default_color="black"):
-    # this function had to be copied and modified from pyConTextNLP.display.html.mark_text
-    # so that the default_color could be passed through
-    if not nodes:
-        return txt
-    else:
-        n = nodes.pop(-1)
-        from pyConTextNLP.display.html import __insert_color
-        return mark_text(__insert_color(txt,
-                                        n.getSpan(),
-                                        colors.get(n.getCategory()[0], default_color)),
-                         nodes,
-                         colors=colors,
-                         # this was not being passed through
-                         default_color=default_color)
+    from pyConTextNLP.display.html import mark_text as html_mark_text
+    return html_mark_text(txt, nodes, colors=colors, default_color=default_color)
 
 
 # helper functions to highlight annotations from BRAT
 def mark_text_custom(txt, nodes, colors={"name": "red", "pet": "blue"}, default_color="black"):
-    # this function had to be copied and modified from pyConTextNLP.display.html.mark_text
-    # so that the default_color could be passed through
-    if not nodes:
-        return txt
-    else:
-        n = nodes.pop(-1)
-        return mark_text_custom(__insert_color_custom(txt,
-                                                      n.getSpan(),
-                                                      colors.get(n.getCategory()[0], default_color)),
-                                nodes,
-                                colors=colors,
-                                # this was not being passed through
-                                default_color=default_color)
+    # as mark_text, in bold
+    from pyConTextNLP.display.html import mark_text as html_mark_text
+    return html_mark_text(txt, nodes, colors=colors, default_color=default_color,
+                          span_template='<span style="font-weight: bold;color: {0};">')
 
 
 def pneumonia_annotation_html_markup(anno_doc):
-    from pyConTextNLP.display.html import __sort_by_span
     # this bit mimics 'mark_document_with_html' from pyConTextNLP.display.html
     colors = {}
     colors['PNEUMONIA_DOC_YES'] = 'red'
@@ -222,7 +341,7 @@ def pneumonia_annotation_html_markup(anno_doc):
     colors['EVIDENCE_OF_PNEUMONIA'] = 'blue'
     default_color = 'red'
     html = """<p> {0} </p>""".format(" ".join([mark_text_custom(anno_doc.text,
-                                                                __sort_by_span(anno_doc.annotations),
+                                                                anno_doc.annotations,
                                                                 colors=colors,
                                                                 default_color=default_color)]))
     return html
@@ -236,19 +355,18 @@ def mark_document_with_html(doc, colors={"name": "red", "pet": "blue"}, default_
     colors: dictionary keyed by ConText category with values valid HTML colors
 
     """
-    from pyConTextNLP.display.html import __sort_by_span
     from pyConTextNLP.utils import get_document_markups
     return """<p> {0} </p>""".format(" ".join([mark_text_custom(m.graph['__txt'],
-                                                                __sort_by_span(m.nodes()),
+                                                                m.nodes(),
                                                                 colors=colors,
                                                                 default_color=default_color) for m in
                                                get_document_markups(doc)]))
 
 
 def clearPyConTextRegularExpressions():
-    if len(pyConText.compiledRegExprs) > 0:
+    if len(REGEX_CACHE) > 0:
         print('Clearing pyConText compiled regular expressions')
-        pyConText.compiledRegExprs = {}
+        REGEX_CACHE.clear()
 
 
 def view_single_sentence_graph(sentence, modifiers, targets):
@@ -261,14 +379,25 @@ def view_single_sentence_graph(sentence, modifiers, targets):
 
 
 class DocumentClassifier(object):
-    def __init__(self, ruleFile, debug=False, modifiers=None, targets=None, expected_value=None):
+    def __init__(self, ruleFile, debug=False, modifiers=None, targets=None, expected_value=None,
+                 markup_backend=None, sentence_splitter=None, markup_store=None, use_artifacts=False):
+        """
+        markup_store: the mapping the ConTextDocuments of the classified documents are
+        saved to, e.g. a bounded pyConTextNLP.markupStore.lruMarkupStore; a dict by default
+        use_artifacts: load lexicon files through their compiled artifacts (see
+        itemData.load_item_data), which are written next to the lexicon files
+        """
         self.rules = {}
+        self.markup_backend = markup_backend
+        self.sentence_splitter = sentence_splitter
+        self.use_artifacts = use_artifacts
         self.rules_ele_list = {}
         self.conclusions = []
         self.debug = debug
         self.modifiers = modifiers
         self.targets = targets
         self.save_markups = False
+        self.saved_markups_map = dict() if markup_store is None else markup_store
         self.expected_value = expected_value
         if ruleFile is not None:
             if ruleFile.endswith('.csv') or ruleFile.endswith('.tsv') or ruleFile.endswith('.txt'):
@@ -316,8 +445,8 @@ class DocumentClassifier(object):
         self.targets = targets
 
     def setModifiersTargetsFromFiles(self, modifiers_file, targets_file):
-        self.targets = get_item_data(targets_file)
-        self.modifiers = get_item_data(modifiers_file)
+        self.targets = get_item_data(targets_file, use_artifact=self.use_artifacts)
+        self.modifiers = get_item_data(modifiers_file, use_artifact=self.use_artifacts)
 
     def checkMatch(self, annotation_type, modifiers, current_conclusions):
         if annotation_type not in self.rules:
@@ -339,7 +468,7 @@ class DocumentClassifier(object):
         return False
 
     def reset_saved_predictions(self):
-        self.saved_markups_map = {}
+        self.saved_markups_map.clear()
         self.save_markups = True
         self.expected_value = None
 
@@ -357,7 +486,8 @@ class DocumentClassifier(object):
         if self.modifiers is None or self.targets is None:
             print('DocumentClassifier\'s "modifiers" and/or "targets" has not been set yet.\n' +
                   'Use function: setModifiersTargets(modifiers, targets) or setModifiersTargetsFromFiles(modifiers_file,' + 'targets_file) to set them up.')
-        markups = markup_context_document(doc, self.modifiers, self.targets)
+        markups = markup_context_document(doc, self.modifiers, self.targets, self.markup_backend,
+                                          self.sentence_splitter)
         if doc_name is not None and self.save_markups and len(markups.getDocumentGraph().nodes()) > 0:
             self.saved_markups_map[doc_name] = markups
         return self.classify_markups(markups, debug, doc_name)
@@ -418,10 +548,12 @@ class DocumentClassifier(object):
         return conclusion
 
 
-def markup_sentence(s, modifiers, targets, prune_inactive=True, verbose=False):
+def markup_sentence(s, modifiers, targets, prune_inactive=True, verbose=False, tag_id_allocator=None,
+                    markup_backend=None):
     """
+    markup_backend: "networkx" (default), "lite" or a markup class
     """
-    markup = pyConText.ConTextMarkup()
+    markup = pyConText.get_markup_class(markup_backend)(tagIdAllocator=tag_id_allocator)
     markup.setRawText(s)
     markup.cleanText()
     markup.markItems(targets, mode="target")
@@ -436,14 +568,21 @@ def markup_sentence(s, modifiers, targets, prune_inactive=True, verbose=False):
     return markup
 
 
-def markup_context_document(report_text, modifiers, targets):
-    context = pyConText.ConTextDocument()
-
-    # we will use TextBlob for breaking up sentences
-    sentences = [s.raw for s in TextBlob(report_text).sentences]
-    for sentence in sentences:
-        m = markup_sentence(sentence, modifiers=modifiers, targets=targets)
+def markup_context_document(report_text, modifiers, targets, markup_backend=None, sentence_splitter=None):
+    """
+    sentence_splitter: "clinical" (default), "textblob", "simple" or a splitter
+    object (see pyConTextNLP.helpers). The offset of each sentence in report_text
+    is kept as the document offset of its markup
+    """
+    context = pyConText.ConTextDocument(markupBackend=markup_backend)
+    context.setRawText(report_text)
+
+    splitter = helpers.get_sentence_splitter(sentence_splitter)
+    for start, end in splitter.spanSentences(report_text):
+        m = markup_sentence(report_text[start:end], modifiers=modifiers, targets=targets,
+                            tag_id_allocator=context.getTagIdAllocator(),
+                            markup_backend=context.getMarkupClass())
+        m.setDocumentOffset(start)
         context.addMarkup(m)
-        context.getSectionMarkups()
 
     return context
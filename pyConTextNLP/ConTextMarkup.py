@@ -1,10 +1,14 @@
 """
 Module defining ConTextMarkup class
 """
+import io
 import re
-import uuid
+from bisect import bisect_left, bisect_right
 from . io.xml import xmlScrub
 from . tagObject import tagObject
+from . matcher import itemMatcher
+from . tagIdAllocator import create_tag_id
+from . markupGraph import markupGraph
 
 import networkx as nx
 
@@ -12,6 +16,66 @@ REG_CLEAN1 = re.compile(r"""\W""", re.UNICODE)
 REG_CLEAN2 = re.compile(r"""\s+""", re.UNICODE)
 REG_CLEAN3 = re.compile(r"""\d""", re.UNICODE)
 
+
+
+def map_offset(offsets, position):
+    """
+    map a position in a cleaned text to the raw text it was derived from.
+    offsets is an offset map as returned by sub_with_offsets
+    """
+    clean, raw = offsets
+    i = bisect_right(clean, position) - 1
+    return raw[i] + position - clean[i]
+
+
+def sub_with_offsets(regex, repl, txt, offsets=None):
+    """
+    return regex.sub(repl, txt) and its offset map: a pair of lists (positions in
+    the result, positions in the raw text) recording each point where the
+    difference between the two changes. offsets is the offset map of txt when
+    txt is itself derived from the raw text (None if txt is the raw text)
+    """
+    pieces = []
+    clean = [0]
+    raw = [0]
+
+    def anchor(position, rawPosition):
+        if rawPosition - position != raw[-1] - clean[-1]:
+            clean.append(position)
+            raw.append(rawPosition)
+
+    if offsets is None:
+        oldClean = oldRaw = ()
+    else:
+        oldClean, oldRaw = offsets
+    k = 1
+    pos = 0
+    length = 0
+    for match in regex.finditer(txt):
+        start, end = match.span()
+        # carry over the anchors of offsets that fall in the text kept before the match
+        while k < len(oldClean) and oldClean[k] < start:
+            if oldClean[k] > pos:
+                anchor(length + oldClean[k] - pos, oldRaw[k])
+            k += 1
+        pieces.append(txt[pos:start])
+        pieces.append(repl)
+        length += start - pos
+        if offsets is None:
+            anchor(length, start)
+            anchor(length + len(repl), end)
+        else:
+            anchor(length, map_offset(offsets, start))
+            anchor(length + len(repl), map_offset(offsets, end))
+        length += len(repl)
+        pos = end
+    for k in range(k, len(oldClean)):
+        if oldClean[k] > pos:
+            anchor(length + oldClean[k] - pos, oldRaw[k])
+    pieces.append(txt[pos:])
+    return ''.join(pieces), (clean, raw)
+
+
 NODE_XML_SKEL = \
 """
 <node>
@@ -42,36 +106,34 @@ CONTEXT_MARKUP_XML_SKEL = \
 </ConTextMarkup>
 """
 
-
-def create_tag_id():
-    """
-    get a unique identifier
-    """
-    return uuid.uuid1().int
-
+# the skeletons split around their variable length parts, for writeXML
+NODE_XML_HEAD, NODE_XML_TAIL = NODE_XML_SKEL.split("{0}")
+EDGE_XML_HEAD, EDGE_XML_TAIL = EDGE_XML_SKEL.split("{2}")
+MARKUP_XML_HEAD, MARKUP_XML_MIDDLE, MARKUP_XML_TAIL = \
+    CONTEXT_MARKUP_XML_SKEL.replace("{2}", "{3}").split("{3}")
 
 
-class ConTextMarkup(nx.DiGraph):
+class ConTextMarkupBase(object):
     """
     base class for context document.
     build around markedTargets a list of termObjects representing desired terms
     found in text and markedModifiers, tagObjects found in the text
+
+    ConTextMarkupBase implements the markup algorithm on top of a directed graph
+    class it is mixed with (see ConTextMarkup and LiteConTextMarkup).
     """
 
 
-    def __init__(self, txt='', unicodeEncoding='utf-8'):
-        """txt is the string to parse"""
-        # __document capture the document level structure
-        # for each sentence and then put in the archives when the next sentence
-        # is processed
-        super(ConTextMarkup, self).__init__(__txt=None,
-                                            __rawtxt=txt,
-                                            __scope=None,
-                                            __SCOPEUPDATED=False)
-        self.__document = nx.DiGraph()
-        self.__document.add_node("top", category="document")
+    def __init__(self, txt='', unicodeEncoding='utf-8', tagIdAllocator=None):
+        """txt is the string to parse
+        tagIdAllocator: callable returning new tag ids. If None, the process-wide
+        allocator of pyConTextNLP.tagIdAllocator is used"""
+        super(ConTextMarkupBase, self).__init__(__txt=None,
+                                                __rawtxt=txt,
+                                                __scope=None,
+                                                __SCOPEUPDATED=False)
         self.__VERBOSE = False
-        self.__tagID = 0
+        self.__tagIdAllocator = tagIdAllocator
         self.__unicodeEncoding = unicodeEncoding
 
 
@@ -82,6 +144,20 @@ class ConTextMarkup(nx.DiGraph):
         return self.__unicodeEncoding
 
 
+    def getTagIdAllocator(self):
+        """
+        return the tag id allocator used for marked items (None for the process-wide one)
+        """
+        return self.__tagIdAllocator
+
+
+    def setTagIdAllocator(self, allocator):
+        """
+        set the callable used to allocate ids of marked items
+        """
+        self.__tagIdAllocator = allocator
+
+
     def toggleVerbose(self):
         """toggles the boolean value for verbose mode"""
         self.__VERBOSE = not self.__VERBOSE
@@ -103,6 +179,7 @@ class ConTextMarkup(nx.DiGraph):
             print("Setting text to", txt)
         self.graph["__rawTxt"] = txt
         self.graph["__txt"] = None
+        self.graph["__offsetMap"] = None
         self.graph["__scope"] = None
         self.graph["__SCOPEUPDATED"] = False
 
@@ -135,27 +212,83 @@ class ConTextMarkup(nx.DiGraph):
         return self.graph.get("__rawTxt", '')
 
 
+    def setDocumentOffset(self, offset):
+        """
+        set the offset of the raw text in the document the sentence was split
+        from. The document spans of the marked items are moved accordingly
+        """
+        shift = (offset or 0) - (self.getDocumentOffset() or 0)
+        if shift:
+            for node in self.nodes():
+                span = node.getDocumentSpan()
+                if span is not None:
+                    node.setDocumentSpan((span[0] + shift, span[1] + shift))
+        self.graph["__docOffset"] = offset
+
+
+    def getDocumentOffset(self):
+        """
+        return the offset of the raw text in its document (None if not known)
+        """
+        return self.graph.get("__docOffset")
+
+
+    def getOffsetMap(self):
+        """
+        return the offset map from the cleaned text to the raw text (None if the
+        two are aligned), see sub_with_offsets
+        """
+        return self.graph.get("__offsetMap")
+
+
+    def getRawSpan(self, span):
+        """
+        map a (start, end) span of the cleaned text to the raw text
+        """
+        offsets = self.getOffsetMap()
+        if offsets is None:
+            return span
+        start, end = span
+        rawStart = map_offset(offsets, start)
+        if end <= start:
+            return rawStart, rawStart
+        return rawStart, map_offset(offsets, end - 1) + 1
+
+
+    def getDocumentSpan(self, span):
+        """
+        map a (start, end) span of the cleaned text to the document the raw text
+        was split from (the raw text if the document offset is not known)
+        """
+        start, end = self.getRawSpan(span)
+        offset = self.getDocumentOffset() or 0
+        return start + offset, end + offset
+
+
     def getNumod_byerSentences(self): # !!! Need to rewrite this to match graph
         """
         get the numod_byer o sentences in the context
         """
-        return len(self.__document)
+        # a markup holds a single sentence
+        return 1
 
 
     def cleanText(self, stripNonAlphaNumeric=False, stripNumod_byers=False):
         """Need to rename. applies the regular expression scrubbers to rawTxt"""
         if stripNonAlphaNumeric:
+            # one for one substitution: offsets are unchanged
             txt = REG_CLEAN1.sub(" ", self.getRawText())
         else:
             txt = self.getRawText()
 
-        # clean up white spaces
-        txt = REG_CLEAN2.sub(" ", txt)
+        # clean up white spaces, keeping track of the offsets into the raw text
+        txt, offsets = sub_with_offsets(REG_CLEAN2, " ", txt)
         if stripNumod_byers:
-            txt = REG_CLEAN3.sub("", txt)
+            txt, offsets = sub_with_offsets(REG_CLEAN3, "", txt, offsets)
 
         self.graph["__scope"] = (0, len(txt))
         self.graph["__txt"] = txt
+        self.graph["__offsetMap"] = offsets if len(offsets[0]) > 1 else None
         if self.getVerbose():
             print("cleaned text is now", self.getText())
 
@@ -164,53 +297,46 @@ class ConTextMarkup(nx.DiGraph):
         """
         return an XML representation of the markup
         """
+        xml = io.StringIO()
+        self.writeXML(xml)
+        return xml.getvalue()
+
+
+    def writeXML(self, fileobj):
+        """
+        write the XML representation of the markup (as returned by getXML) to
+        the text file object fileobj, piece by piece
+        """
+        write = fileobj.write
         nodes = list(self.nodes(data=True))
         nodes.sort()
-        node_string = ''
+        write(MARKUP_XML_HEAD.format(xmlScrub(self.getRawText()), xmlScrub(self.getText())))
         for n in nodes:
-            attribute_string = ''
+            write(NODE_XML_HEAD)
             keys = list(n[1].keys())
             keys.sort()
             for k in keys:
-                attribute_string += """<{0}> {1} </{2}>\n""".format(k, n[1][k], k)
-            modification_string = ''
-            modified_by = self.predecessors(n[0])
-            if modified_by:
-                for mod in modified_by:
-                    modification_string += """<modified_by>\n"""
-                    modification_string += \
-                        """<modifyingNode> %s </modifyingNode>\n"""%mod.getTagID()
-                    modification_string += \
-                        """<modifyingCategory> %s </modifyingCategory>\n"""%mod.getCategory()
-                    modification_string += """</modified_by>\n"""
-            modifies = self.successors(n[0])
-            if modifies:
-                for modified in modifies:
-                    modification_string += """<modifies>\n"""
-                    modification_string += \
-                        """<modifiedNode> {0} </modifiedNode>\n""".format(modified.getTagID())
-                    modification_string += \
-                        """</modifies>\n"""
-            node_string += \
-                    NODE_XML_SKEL.format(attribute_string+"{0}".format(n[0].getXML()) +\
-                        modification_string)
+                write("""<{0}> {1} </{2}>\n""".format(k, n[1][k], k))
+            write(n[0].getXML())
+            for mod in self.predecessors(n[0]):
+                write("""<modified_by>\n<modifyingNode> %s </modifyingNode>\n"""
+                      """<modifyingCategory> %s </modifyingCategory>\n</modified_by>\n"""%(
+                          mod.getTagID(), mod.getCategory()))
+            for modified in self.successors(n[0]):
+                write("""<modifies>\n<modifiedNode> {0} </modifiedNode>\n</modifies>\n""".format(
+                    modified.getTagID()))
+            write(NODE_XML_TAIL)
+        write(MARKUP_XML_MIDDLE)
         edges = list(self.edges(data=True))
         edges.sort()
-        edge_string = ''
         for edge in edges:
+            write(EDGE_XML_HEAD.format(edge[0].getTagID(), edge[1].getTagID()))
             keys = list(edge[2].keys())
             keys.sort()
-            attribute_string = ''
             for key in keys:
-                attribute_string += """<{0}> {1} </{2}>\n""".format(key, edge[2][key], key)
-            edge_string += "{0}".format(EDGE_XML_SKEL.format(edge[0].getTagID(),
-                                                             edge[1].getTagID(),
-                                                             attribute_string))
-
-        return CONTEXT_MARKUP_XML_SKEL.format(xmlScrub(self.getRawText()),
-                                              xmlScrub(self.getText()),
-                                              node_string,
-                                              edge_string)
+                write("""<{0}> {1} </{2}>\n""".format(key, edge[2][key], key))
+            write(EDGE_XML_TAIL)
+        write(MARKUP_XML_TAIL)
 
 
     def __unicode__(self):
@@ -270,26 +396,102 @@ class ConTextMarkup(nx.DiGraph):
 
 
         # Now limit scope based on the domains of the spans of the other
-        # modifier
-        for i in range(len(modifiers)-1):
-            modifier = modifiers[i]
-            for j in range(i+1, len(modifiers)):
-                modifier2 = modifiers[j]
-                if modifier.limitScope(modifier2) and \
-                   modifier2.getRule().lower() == 'terminate':
-                    self.add_edge(modifier2, modifier)
-                if modifier2.limitScope(modifier) and \
-                   modifier.getRule().lower() == 'terminate':
-                    self.add_edge(modifier, modifier2)
+        # modifiers. Modifiers are sorted by span start, so a forward modifier
+        # can only be limited by the nearest following modifier it can be
+        # limited by, and a backward modifier only by the preceding modifiers
+        # whose span end exceeds that of every modifier before them.
+        starts = [m.getSpan()[0] for m in modifiers]
+        ends = [m.getSpan()[1] for m in modifiers]
+        limiters = self.__get_scope_limiters(modifiers, ends)
+        edges = []
+        for pos, modifier in enumerate(modifiers):
+            rule = modifier.getRule()
+            if not rule or rule == 'terminate':
+                continue
+            # limitScope accepts modifiers of one of the modifier's categories
+            # and modifiers with rule 'terminate'
+            candidates = [limiters[c] for c in limiters if c is not None and modifier.isA(c)]
+            if None in limiters:
+                candidates.append(limiters[None])
+            if 'forward' in rule.lower() or 'bidirectional' in rule.lower():
+                lo = bisect_right(starts, starts[pos])
+                following = [p[bisect_left(p, lo)] for p, _ in candidates if p[-1] >= lo]
+                if following:
+                    nxt = min(following)
+                    if modifier.limitScope(modifiers[nxt]):
+                        edges.append(((pos, nxt, 0), modifiers[nxt], modifier))
+            elif 'backward' in rule.lower():
+                limitedBy = []
+                hi = bisect_left(starts, starts[pos])
+                while hi > 0:
+                    bounds = [(p, maxEnds, bisect_left(p, hi)) for p, maxEnds in candidates]
+                    bounds = [b for b in bounds if b[2]]
+                    if not bounds:
+                        break
+                    end = max(maxEnds[k-1] for _, maxEnds, k in bounds)
+                    if end <= modifier.getScope()[0]:
+                        break
+                    # the first preceding modifier reaching end sets the new scope
+                    hi = min(p[bisect_left(maxEnds, end, 0, k)] for p, maxEnds, k in bounds
+                             if maxEnds[k-1] >= end)
+                    limitedBy.append(hi)
+                for prev in reversed(limitedBy):
+                    if modifier.limitScope(modifiers[prev]):
+                        edges.append(((prev, pos, 1), modifiers[prev], modifier))
+        edges.sort(key=lambda e: e[0])
+        for _, modifier2, modifier in edges:
+            if modifier2.getRule().lower() == 'terminate':
+                self.add_edge(modifier2, modifier)
+
+
+    def __get_scope_limiters(self, modifiers, ends):
+        """
+        index the sorted modifiers by the categories they limit: for each lower-cased
+        category (and None for modifiers with rule 'terminate') the list of
+        positions of the modifiers and the running maximum of their span ends
+        """
+        positions = {}
+        for pos, modifier in enumerate(modifiers):
+            categories = modifier.getCategory()
+            if isinstance(categories, str):
+                categories = [categories]
+            for category in set(c.lower().strip() for c in categories):
+                positions.setdefault(category, []).append(pos)
+            if modifier.getRule() == 'terminate':
+                positions.setdefault(None, []).append(pos)
+        limiters = {}
+        for category, p in positions.items():
+            maxEnds = []
+            for pos in p:
+                maxEnds.append(max(ends[pos], maxEnds[-1]) if maxEnds else ends[pos])
+            limiters[category] = (p, maxEnds)
+        return limiters
 
 
     def markItems(self, items, mode="target"):
         """tags the sentence for a list of items
-        items: a list of contextItems"""
+        items: a list of contextItems or an itemMatcher built from one"""
         if not items:
             return
-        for item in items:
-            self.add_nodes_from(self.markItem(item, ConTextMode=mode), category=mode)
+        if isinstance(items, itemMatcher):
+            self.add_nodes_from(self.markMatcher(items, ConTextMode=mode), category=mode)
+            return
+        if not self.getText():
+            self.cleanText()
+        txt = self.getText()
+        matches = [(item, match) for item in items
+                   for match in self.__get_item_regex(item).finditer(txt)]
+        self.add_nodes_from(self.__create_tags(matches, mode), category=mode)
+
+
+    def markMatcher(self, matcher, ConTextMode="target"):
+        """
+        markup the current text with all the items of an itemMatcher, scanning the
+        text once rather than once per item."""
+        if not self.getText():
+            self.cleanText()
+
+        return self.__create_tags(list(matcher.finditer(self.getText())), ConTextMode)
 
 
     def markItem(self, item, ConTextMode="target", ignoreCase=True):
@@ -301,32 +503,45 @@ class ConTextMarkup(nx.DiGraph):
         if not self.getText():
             self.cleanText()
 
-        # See if we have already created a regular expression
+        regex = self.__get_item_regex(item, ignoreCase)
+        return self.__create_tags([(item, match) for match in regex.finditer(self.getText())],
+                                  ConTextMode)
 
-        if not item.getRE():
-            reg_exp = r"\b{}\b".format(item.getLiteral())
-            if self.getVerbose():
-                print("generating regular expression", reg_exp)
-        else:
-            reg_exp = item.getRE()
-            if self.getVerbose():
-                print("using provided regular expression", reg_exp)
-        if ignoreCase:
-            regex = re.compile(reg_exp, re.IGNORECASE|re.UNICODE)
-        else:
-            regex = re.compile(reg_exp, re.UNICODE)
-        
-        _iter = regex.finditer(self.getText())
+
+    def __get_item_regex(self, item, ignoreCase=True):
+        # compiled patterns are shared through the process-wide regex cache
+        if self.getVerbose():
+            if not item.getRE():
+                print("generating regular expression", item.getPattern())
+            else:
+                print("using provided regular expression", item.getPattern())
+        return item.getCompiledRE(ignoreCase)
+
+
+    def __create_tags(self, matches, ConTextMode):
+        """
+        create a tagObject for each (item, match) pair. Tags are returned in the
+        order of matches but ids are allocated in order of position in the text,
+        so that sorting tags by id sorts them by position.
+        """
+        allocator = self.__tagIdAllocator
+        if allocator is None:
+            allocator = create_tag_id
+        tagids = [None]*len(matches)
+        for index in sorted(range(len(matches)), key=lambda i: matches[i][1].start()):
+            tagids[index] = allocator()
+        scope = self.getScope()
         terms = []
-        for i in _iter:
+        for (item, match), tagid in zip(matches, tagids):
             tag_0 = tagObject(item,
                               ConTextMode,
-                              tagid=create_tag_id(),
-                              scope=self.getScope())
+                              tagid=tagid,
+                              scope=scope)
 
-            tag_0.setSpan(i.span())
-            tag_0.setPhrase(i.group())
-            tag_0.setMatchedGroupDictionary(i.groupdict())
+            tag_0.setSpan(match.span())
+            tag_0.setDocumentSpan(self.getDocumentSpan(match.span()))
+            tag_0.setPhrase(match.group())
+            tag_0.setMatchedGroupDictionary(match.groupdict())
             if self.getVerbose():
                 print("marked item", tag_0)
             terms.append(tag_0)
@@ -402,24 +617,64 @@ class ConTextMarkup(nx.DiGraph):
 
 
     def __prune_marks(self, _marks):
+        """
+        Remove marks encompassed by another mark of the same category.
+
+        Marks are swept in order of span start (ties keep graph order), a group of
+        marks sharing a start at a time. A mark can only be encompassed by a mark
+        that starts at or before it, so marks from earlier groups are summarized
+        by the largest end per category, and only marks sharing a start are
+        compared pairwise. The result is the same as comparing every pair in
+        start order: a mark is skipped once a removed mark has its exact span,
+        identical spans keep the first mark, and a mark encompassed by a later
+        mark with the same start is removed without removing anything after it.
+        """
         if len(_marks) < 2:
             return
-        # this can surely be done faster
         marks = list(_marks)
-        marks.sort()
+        marks.sort(key=lambda m: m[0].getSpan()[0])
         nodes_to_remove = []
-        for i in range(len(marks)-1):
-            mark1 = marks[i]
-            if mark1[0] not in nodes_to_remove:
-                for j in range(i+1, len(marks)):
-                    mark2 = marks[j]
-                    if mark1[0].encompasses(mark2[0]) and \
-                       mark1[1]['category'] == mark2[1]['category']:
-                        nodes_to_remove.append(mark2[0])
-                    elif mark2[0].encompasses(mark1[0]) and \
-                         mark2[1]['category'] == mark1[1]['category']:
-                        nodes_to_remove.append(mark1[0])
+        # largest end of the kept marks of earlier groups, per category
+        max_end = {}
+        i = 0
+        while i < len(marks):
+            start = marks[i][0].getSpan()[0]
+            j = i + 1
+            while j < len(marks) and marks[j][0].getSpan()[0] == start:
+                j += 1
+            group = marks[i:j]
+            ends = [m[0].getSpan()[1] for m in group]
+            categories = [m[1]['category'] for m in group]
+            removed = [c in max_end and max_end[c] >= e for e, c in zip(ends, categories)]
+            removed_ends = set()
+            for k in range(len(group)):
+                if removed[k]:
+                    nodes_to_remove.append(group[k][0])
+                    removed_ends.add(ends[k])
+            group_max_end = {}
+            for k in range(len(group)):
+                if ends[k] in removed_ends:
+                    continue
+                encompassed = False
+                for l in range(k+1, len(group)):
+                    if categories[l] != categories[k]:
+                        continue
+                    if ends[k] >= ends[l]:
+                        if not removed[l]:
+                            removed[l] = True
+                            nodes_to_remove.append(group[l][0])
+                            removed_ends.add(ends[l])
+                    else:
+                        removed[k] = True
+                        nodes_to_remove.append(group[k][0])
+                        removed_ends.add(ends[k])
+                        encompassed = True
                         break
+                if not encompassed:
+                    group_max_end[categories[k]] = max(ends[k], group_max_end.get(categories[k], ends[k]))
+            for category, end in group_max_end.items():
+                max_end[category] = max(end, max_end.get(category, end))
+            i = j
         if self.getVerbose():
             print("pruning the following nodes")
             for node in nodes_to_remove:
@@ -451,13 +706,22 @@ class ConTextMarkup(nx.DiGraph):
             self.updateScopes()
         targets = self.getConTextModeNodes("target")
         modifiers = self.getConTextModeNodes("modifier")
-        for target in targets:
-            for modifier in modifiers:
-                if modifier.applyRule(target):
-                    if self.getVerbose():
-                        print("applying relationship between", modifier, target)
+        # a modifier applies to the targets starting within its scope; collect
+        # the (target, modifier) pairs and add them in target then modifier order
+        starts = [t.getSpan()[0] for t in targets]
+        pairs = []
+        for j, modifier in enumerate(modifiers):
+            if not modifier.getRule() or modifier.getRule() == 'terminate':
+                continue
+            scope = modifier.getScope()
+            for i in range(bisect_left(starts, scope[0]), bisect_right(starts, scope[1])):
+                pairs.append((i, j))
+        pairs.sort()
+        for i, j in pairs:
+            if self.getVerbose():
+                print("applying relationship between", modifiers[j], targets[i])
 
-                    self.add_edge(modifier, target)
+            self.add_edge(modifiers[j], targets[i])
 
 
     def getMarkedTargets(self):
@@ -480,7 +744,7 @@ class ConTextMarkup(nx.DiGraph):
         """
         return immediate predecessorts of node. The returned list is sorted by node span.
         """
-        modifiers = self.predecessors(node)
+        modifiers = list(self.predecessors(node))
         modifiers.sort()
         return modifiers
 
@@ -513,3 +777,47 @@ class ConTextMarkup(nx.DiGraph):
         sub_txt = txt[start:end]
         tokens = sub_txt.split()
         return len(tokens)*direction
+
+
+class ConTextMarkup(ConTextMarkupBase, nx.DiGraph):
+    """
+    A sentence markup stored in a networkx.DiGraph. This is the default backend.
+    """
+
+
+class LiteConTextMarkup(ConTextMarkupBase, markupGraph):
+    """
+    A sentence markup stored in a markupGraph, which allocates less per sentence
+    and indexes the marked items by category. nodes(), edges(), predecessors()
+    and successors() return lists; use toDiGraph() for networkx algorithms.
+    """
+
+    def getConTextModeNodes(self, mode):
+        """
+        get the nodes of type mode sorted by span
+        """
+        nodes = self.getCategoryNodes(mode)
+        nodes.sort()
+        return nodes
+
+
+MARKUP_BACKENDS = {"networkx": ConTextMarkup,
+                   "lite": LiteConTextMarkup}
+
+DEFAULT_MARKUP_BACKEND = "networkx"
+
+
+def get_markup_class(backend=None):
+    """
+    return the markup class for backend: the name of a backend in
+    MARKUP_BACKENDS, a markup class, or None for DEFAULT_MARKUP_BACKEND
+    """
+    if backend is None:
+        backend = DEFAULT_MARKUP_BACKEND
+    if isinstance(backend, str):
+        try:
+            return MARKUP_BACKENDS[backend.lower()]
+        except KeyError:
+            raise ValueError("unknown markup backend {0!r}; expected one of {1}".format(
+                backend, ", ".join(sorted(MARKUP_BACKENDS))))
+    return backend
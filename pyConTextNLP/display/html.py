@@ -16,16 +16,37 @@ def __insert_color(txt,s,c):
     return txt[:s[0]]+'<span style="color: {0};">'.format(c)+\
            txt[s[0]:s[1]]+'</span>'+txt[s[1]:]
 
-def mark_text(txt,nodes,colors = {"name":"red","pet":"blue"},default_color="black"):
-    if not nodes:
-        return txt
-    else:
-        n = nodes.pop(-1)
-        return mark_text(__insert_color(txt,
-                                        n.getSpan(),
-                                        colors.get(n.getCategory()[0],default_color)),
-                         nodes,
-                         colors=colors)
+SPAN_TEMPLATE = '<span style="color: {0};">'
+
+def mark_text(txt,nodes,colors = {"name":"red","pet":"blue"},default_color="black",
+              span_template=SPAN_TEMPLATE):
+    """return txt with the span of each node wrapped in an HTML span colored by
+    the first category of the node:
+    txt: txt to be marked
+    nodes: objects with getSpan() and getCategory() methods (e.g. tagObjects)
+    colors: dictionary keyed by category with values valid HTML colors
+    default_color: color of the categories not in colors
+    span_template: opening tag of the HTML span, formatted with the color
+
+    The nodes are sorted by span and the HTML is built in a single pass. Where
+    spans overlap, each character is colored by the first span covering it in
+    span order: a span is cut to start at the end of the previous one, and left
+    out if it lies within it."""
+    pieces = []
+    position = 0
+    for n in sorted(nodes, key=lambda x: x.getSpan()):
+        start, end = n.getSpan()
+        if start < position:
+            if end <= position:
+                continue
+            start = position
+        pieces.append(txt[position:start])
+        pieces.append(span_template.format(colors.get(n.getCategory()[0], default_color)))
+        pieces.append(txt[start:end])
+        pieces.append('</span>')
+        position = end
+    pieces.append(txt[position:])
+    return "".join(pieces)
 
 def mark_document_with_html(doc,colors = {"name":"red","pet":"blue"}, default_color="black"):
     """takes a ConTextDocument object and returns an HTML paragraph with marked phrases in the
@@ -36,7 +57,7 @@ def mark_document_with_html(doc,colors = {"name":"red","pet":"blue"}, default_co
 
     """
     return """<p> {0} </p>""".format(" ".join([mark_text(m.graph['__txt'],
-                                                 __sort_by_span(m.nodes()),
+                                                 m.nodes(),
                                                  colors=colors,
                                                  default_color=default_color) for m in get_document_markups(doc)]))
 
@@ -65,7 +86,7 @@ def mark_document_with_html_sections(doc,colors = {"name":"red","pet":"blue"}, d
     #     print(h)
     #
             h += """<p> {0} </p>""".format(" ".join([mark_text(
-                        m.graph['__txt'], __sort_by_span(m.nodes()), colors=colors, default_color=default_color
+                        m.graph['__txt'], m.nodes(), colors=colors, default_color=default_color
                     ) for m in get_section_markups(doc,section)
                 ]))
 
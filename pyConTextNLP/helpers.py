@@ -19,7 +19,16 @@ The exception terms are contained in the attribute exceptionTerms. Terms can be
 through the class methods addExceptionTerms and deleteExceptionTerms. A short list of default terms
 common in English texts are included in the attribute defaultExceptions. By default these are
 used when a sentenceSplitter instance is created.
+
+A sentence splitter is any object with a method spanSentences(txt) returning the (start, end)
+offsets of the sentences of txt, and a method splitSentences(txt) returning the sentences as
+strings. clinicalSentenceSplitter is a fast rule based splitter tuned for clinical reports and is
+the default used by get_sentence_splitter; textBlobSentenceSplitter uses TextBlob (and NLTK punkt),
+which is only imported when it is first used.
 """
+import re
+
+
 class sentenceSplitter(object):
     """Class for splitting sentences"""
 
@@ -98,3 +107,155 @@ class sentenceSplitter(object):
             sentences.append(' '.join(txt) )
 
         return sentences
+
+    def spanSentences(self, txt):
+        """
+        return the (start, end) offsets of the sentences splitSentences would return.
+        Unlike splitSentences, txt[start:end] keeps the original white space
+        """
+        spans = []
+        start = None
+        for word in re.finditer(r'\S+', txt):
+            if start is None:
+                start = word.start()
+            currentWord = word.group()
+            if currentWord[-1] in '.?!' and currentWord not in self.exceptionTerms:
+                spans.append((start, word.end()))
+                start = None
+        if start is not None:
+            spans.append((start, len(txt.rstrip())))
+        return spans
+
+
+class clinicalSentenceSplitter(object):
+    """
+    Rule based sentence splitter for clinical text. A sentence ends at a
+    terminal '.', '?' or '!' followed by white space unless the word is an
+    exception term (e.g. Dr., b.i.d.), a single letter initial or the next word
+    starts in lower case. A sentence also ends before a blank line, before a
+    section header at the start of a line (e.g. "IMPRESSION:") and before a
+    numbered or bulleted list item. Hard wrapped lines are not split.
+    """
+
+    defaultExceptions = ['Dr.', 'Mr.', 'Mrs.', 'Ms.', 'St.', 'Jr.', 'Sr.', 'Prof.', 'M.D.', 'D.O.',
+                         'Ph.D.', 'D.M.D.', 'R.N.', 'B.A.', 'A.B.', 'B.S.', 'M.S.', 'vs.', 'viz.',
+                         'e.g.', 'i.e.', 'approx.', 'no.', 'pt.', 'q.', 'q.d.', 'b.i.d.', 't.i.d.',
+                         'q.i.d.', 'q.h.s.', 'p.o.', 'n.p.o.', 'p.r.n.', 'a.m.', 'p.m.', 'fig.', 'min.', 'max.']
+
+    __terminal = re.compile(r"""[.?!]+["')\]]*(?=\s|$)""")
+    __breaks = re.compile(r"""\n[ \t]*\n|                                  # blank line
+                              ^[ \t]*[A-Z][A-Za-z0-9/&(),' -]{0,40}:(?!\d)|  # section header
+                              ^[ \t]*(?:\(?\d{1,2}[.)]|[-*\u2022])[ \t]|     # list item
+                              ^(?P<separator>[ \t]*[_=*-]{4,}[ \t]*)$         # separator line
+                           """, re.MULTILINE | re.VERBOSE)
+    __listMarker = re.compile(r'\(?\d{1,2}[.)]$')
+    __word = re.compile(r'[^\W_]')
+
+    def __init__(self, exceptionTerms=None):
+        """
+        exceptionTerms: words ending in a period that do not end a sentence,
+        compared without regard to case. Defaults to defaultExceptions
+        """
+        if exceptionTerms is None:
+            exceptionTerms = self.defaultExceptions
+        self.exceptionTerms = set(t.lower() for t in exceptionTerms)
+
+    def getExceptionTerms(self):
+        return self.exceptionTerms
+
+    def addExceptionTerms(self, *terms):
+        self.exceptionTerms.update(t.lower() for t in terms)
+
+    def deleteExceptionTerms(self, *terms):
+        self.exceptionTerms.difference_update(t.lower() for t in terms)
+
+    def __isBoundary(self, txt, start, end):
+        """return whether the terminal punctuation txt[start:end] ends a sentence"""
+        wordStart = start
+        while wordStart > 0 and not txt[wordStart - 1].isspace():
+            wordStart -= 1
+        word = txt[wordStart:start + 1]
+        if word.lower() in self.exceptionTerms:
+            return False
+        if len(word) == 2 and word[0].isalpha() and txt[start] == '.':
+            return False
+        nxt = end
+        while nxt < len(txt) and txt[nxt].isspace():
+            nxt += 1
+        if nxt < len(txt) and txt[nxt].islower():
+            return False
+        if self.__listMarker.match(word):
+            # "1." after a header, a line start or another sentence opens a list
+            # item rather than closing a sentence
+            before = txt[:wordStart].rstrip()
+            if not before or before[-1] in ':.?!' or txt[len(before):wordStart].count('\n'):
+                return False
+        return True
+
+    def __boundaries(self, txt):
+        boundaries = set()
+        for m in self.__breaks.finditer(txt):
+            boundaries.add(m.start())
+            if m.group('separator'):
+                boundaries.add(m.end())
+        for m in self.__terminal.finditer(txt):
+            if self.__isBoundary(txt, m.start(), m.end()):
+                boundaries.add(m.end())
+        return sorted(boundaries)
+
+    def spanSentences(self, txt):
+        """
+        return the list of (start, end) offsets of the sentences of txt, without
+        leading or trailing white space. Segments without any word character
+        (e.g. separator lines) are dropped
+        """
+        spans = []
+        start = 0
+        for end in self.__boundaries(txt) + [len(txt)]:
+            segment = txt[start:end]
+            if self.__word.search(segment):
+                lstrip = len(segment) - len(segment.lstrip())
+                spans.append((start + lstrip, start + len(segment.rstrip())))
+            start = end
+        return spans
+
+    def splitSentences(self, txt):
+        """return the list of sentences of txt"""
+        return [txt[start:end] for start, end in self.spanSentences(txt)]
+
+
+class textBlobSentenceSplitter(object):
+    """
+    Sentence splitter using TextBlob, i.e. the NLTK punkt tokenizer. TextBlob
+    is imported when the splitter is first used.
+    """
+
+    def spanSentences(self, txt):
+        from textblob import TextBlob
+        return [(s.start, s.end) for s in TextBlob(txt).sentences]
+
+    def splitSentences(self, txt):
+        return [txt[start:end] for start, end in self.spanSentences(txt)]
+
+
+SENTENCE_SPLITTERS = {"clinical": clinicalSentenceSplitter,
+                      "textblob": textBlobSentenceSplitter,
+                      "simple": sentenceSplitter}
+DEFAULT_SENTENCE_SPLITTER = "clinical"
+
+
+def get_sentence_splitter(splitter=None):
+    """
+    return a sentence splitter. splitter is the name of a registered splitter
+    ("clinical", "textblob" or "simple"), None for DEFAULT_SENTENCE_SPLITTER or
+    an object with a spanSentences method, which is returned as is
+    """
+    if splitter is None:
+        splitter = DEFAULT_SENTENCE_SPLITTER
+    if hasattr(splitter, "spanSentences"):
+        return splitter
+    try:
+        return SENTENCE_SPLITTERS[splitter]()
+    except (KeyError, TypeError):
+        raise ValueError("Unknown sentence splitter {0!r}; expected one of {1}".format(
+            splitter, ", ".join(sorted(SENTENCE_SPLITTERS))))
@@ -0,0 +1,409 @@
+"""
+module for a compact, round-trippable serialization of markups and documents
+
+getXML writes a markup or document for reading by people, and nothing reads
+it back. The functions here encode a ConTextMarkup (or LiteConTextMarkup) and
+a ConTextDocument as columns of builtin values: a table of the contextItems
+used, one list per tagObject attribute (tag id, item index, span, ...) and the
+edges as pairs of row numbers. The columns are pickled, so encoding and
+decoding run in the C pickler, and loading only accepts builtin values: no
+class is looked up while decoding. The cyclic garbage collector is paused while
+the graphs are rebuilt: every object allocated is kept, and collections
+triggered by the allocations would otherwise take most of the loading time.
+
+dumps_markup/loads_markup and dumps_document/loads_document convert single
+objects. corpusWriter and read_corpus write and read a stream of named
+documents (or markups), so the markups of a corpus can be computed once and
+read back by the inference stage.
+"""
+import gc
+import io
+import pickle
+import struct
+from contextlib import contextmanager
+
+from ..ConTextMarkup import MARKUP_BACKENDS, get_markup_class
+from ..itemData import contextItem
+from ..pyConText import ConTextDocument
+from ..tagIdAllocator import counterTagIdAllocator, globalTagIdAllocator
+from ..tagObject import tagObject
+
+MAGIC = b"PCTX"
+VERSION = 1
+
+MARKUP = "markup"
+DOCUMENT = "document"
+
+# allocators whose state (the next id) is saved with a document
+ALLOCATORS = {"counter": counterTagIdAllocator,
+              "global": globalTagIdAllocator}
+
+_HEADER = struct.Struct("<4sB")
+_NAME_LENGTH = struct.Struct("<I")
+_RECORD_LENGTH = struct.Struct("<Q")
+
+
+class _builtinUnpickler(pickle.Unpickler):
+    """an unpickler of builtin values only"""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError("unexpected class {0}.{1} in serialized markup".format(module, name))
+
+
+@contextmanager
+def _gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _pack(kind, columns):
+    return _HEADER.pack(MAGIC, VERSION) + pickle.dumps((kind, columns), pickle.HIGHEST_PROTOCOL)
+
+
+def _unpack(data, kind):
+    if not is_serialized(data):
+        raise ValueError("data is not a serialized markup or document")
+    version = _HEADER.unpack_from(data)[1]
+    if version != VERSION:
+        raise ValueError("unsupported serialization version {0:d}".format(version))
+    found, columns = _builtinUnpickler(io.BytesIO(memoryview(data)[_HEADER.size:])).load()
+    if kind is not None and found != kind:
+        raise ValueError("expected a serialized {0}, found a {1}".format(kind, found))
+    return found, columns
+
+
+def is_serialized(data):
+    """return whether data starts like the output of dumps_markup or dumps_document"""
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def _backend_name(cls):
+    for name, backend in MARKUP_BACKENDS.items():
+        if backend is cls:
+            return name
+    raise ValueError("cannot serialize markups of the unregistered class {0}".format(cls.__name__))
+
+
+def _item_key(item):
+    return (item.getLiteral(), tuple(item.getCategory()), item.getRE(), item.getRule())
+
+
+def _encode_items(items):
+    return [list(key) for key in map(_item_key, items)]
+
+
+def _decode_items(table, items=None):
+    """
+    rebuild the contextItems of table. items is an optional dictionary of the
+    items already rebuilt, so identical items are shared between records
+    """
+    if items is None:
+        items = {}
+    decoded = []
+    for literal, category, regex, rule in table:
+        key = (literal, tuple(category), regex, rule)
+        item = items.get(key)
+        if item is None:
+            item = contextItem([literal, ",".join(category), regex, rule])
+            items[key] = item
+        decoded.append(item)
+    return decoded
+
+
+TAG_COLUMNS = ("tag_id", "item", "context_category", "category", "span_start", "span_end",
+               "document_span", "phrase", "groups", "scope", "attributes")
+
+
+def _new_tag_columns():
+    return {name: [] for name in TAG_COLUMNS}
+
+
+def _encode_markup(markup, tags, itemIndex, items):
+    """
+    append the tags of markup to the tag columns tags and return the record of
+    the markup: its class, encoding, graph attributes, number of tags and edges
+    (as pairs of rows counted from its first tag). The contextItems are
+    appended to items and numbered in the dictionary itemIndex
+    """
+    rows = {}
+    tagIds, itemRows = tags["tag_id"], tags["item"]
+    categories = tags["category"]
+    for row, (tag, data) in enumerate(markup.nodes(data=True)):
+        rows[tag] = row
+        item = tag.getItem()
+        index = itemIndex.get(id(item))
+        if index is None:
+            index = itemIndex[id(item)] = len(items)
+            items.append(item)
+        tagIds.append(tag.getTagID())
+        itemRows.append(index)
+        tags["context_category"].append(tag.getConTextCategory())
+        category = tag.getCategory()
+        categories.append(None if category == item.getCategory() else category)
+        start, end = tag.getSpan()
+        tags["span_start"].append(start)
+        tags["span_end"].append(end)
+        tags["document_span"].append(tag.getDocumentSpan())
+        tags["phrase"].append(tag.getPhrase())
+        tags["groups"].append(tag.getMatchedGroupDictionary() or None)
+        tags["scope"].append(list(tag.getScope()))
+        tags["attributes"].append(dict(data))
+    edges = [(rows[u], rows[v], dict(data)) for u, v, data in markup.edges(data=True)] if rows else []
+    return [_backend_name(type(markup)), markup.getUnicodeEncoding(), dict(markup.graph), len(rows), edges]
+
+
+def _decode_markup(record, tags, first, items, tagIdAllocator=None):
+    """rebuild the markup of record, whose tags start at row first of the tag columns tags"""
+    backend, encoding, graph, count, edges = record
+    markup = get_markup_class(backend)(unicodeEncoding=encoding, tagIdAllocator=tagIdAllocator)
+    markup.graph.update(graph)
+    if not count:
+        return markup
+    nodes = []
+    for row in range(first, first + count):
+        tag = tagObject(items[tags["item"][row]], tags["context_category"][row],
+                        scope=tags["scope"][row], tagid=tags["tag_id"][row])
+        category = tags["category"][row]
+        if category is not None:
+            tag.setCategory(category)
+        tag.setSpan((tags["span_start"][row], tags["span_end"][row]))
+        docSpan = tags["document_span"][row]
+        if docSpan is not None:
+            tag.setDocumentSpan(docSpan)
+        tag.setPhrase(tags["phrase"][row])
+        tag.setMatchedGroupDictionary(tags["groups"][row])
+        nodes.append(tag)
+    markup.add_nodes_from(zip(nodes, tags["attributes"][first:first + count]))
+    markup.add_edges_from((nodes[u], nodes[v], data) for u, v, data in edges)
+    return markup
+
+
+def dumps_markup(markup):
+    """serialize a ConTextMarkup or LiteConTextMarkup"""
+    items = []
+    tags = _new_tag_columns()
+    record = _encode_markup(markup, tags, {}, items)
+    return _pack(MARKUP, {"markup": record, "tags": tags, "items": _encode_items(items)})
+
+
+def loads_markup(data, tagIdAllocator=None, items=None):
+    """
+    rebuild a markup serialized with dumps_markup
+    tagIdAllocator: the allocator of the new markup (None for the process-wide one)
+    items: optional dictionary of contextItems shared between loaded markups
+    """
+    with _gc_paused():
+        return _load_markup(_unpack(data, MARKUP)[1], tagIdAllocator, items)
+
+
+def _load_markup(columns, tagIdAllocator, items):
+    return _decode_markup(columns["markup"], columns["tags"], 0,
+                          _decode_items(columns["items"], items), tagIdAllocator)
+
+
+def _encode_allocator(allocator):
+    for name, cls in ALLOCATORS.items():
+        if type(allocator) is cls:
+            return name, allocator.__getstate__()
+    return None
+
+
+def _decode_allocator(state):
+    if state is None:
+        return None
+    allocator = ALLOCATORS[state[0]].__new__(ALLOCATORS[state[0]])
+    allocator.__setstate__(state[1])
+    return allocator
+
+
+def dumps_document(doc):
+    """
+    serialize a ConTextDocument: its text, sections, markups and the state of
+    its tag id allocator
+    """
+    graph = doc.getDocument()
+    itemIndex = {}
+    items = []
+    tags = _new_tag_columns()
+    allocator = doc.getTagIdAllocator()
+    markups = []
+    sections = []
+    for parent, child, data in graph.edges(data=True):
+        if data.get("category") == "markup":
+            markups.append((data["sentenceNumber"], parent, child))
+        else:
+            sections.append((data.get("__sectionNumber"), parent, child))
+    markups.sort(key=lambda m: m[0])
+    sections.sort(key=lambda s: s[0])
+    # the tags of the markups are encoded in sentence order
+    records = [(parent, markup.getTagIdAllocator() is allocator,
+                _encode_markup(markup, tags, itemIndex, items)) for _, parent, markup in markups]
+    markupNodes = set(m[2] for m in markups)
+    sectionAttributes = {n: dict(data) for n, data in graph.nodes(data=True)
+                         if data and n not in markupNodes}
+    columns = {"backend": _backend_name(doc.getMarkupClass()),
+               "encoding": doc.getUnicodeEncoding(),
+               "allocator": _encode_allocator(doc.getTagIdAllocator()),
+               "raw_text": doc.getRawText(),
+               "current_parent": doc.getCurrentparent(),
+               "sections": [s[1:] for s in sections],
+               "section_attributes": sectionAttributes,
+               "markups": records,
+               "tags": tags,
+               "items": _encode_items(items)}
+    return _pack(DOCUMENT, columns)
+
+
+def loads_document(data, items=None):
+    """
+    rebuild a ConTextDocument serialized with dumps_document. The sentences
+    are numbered in order from 0, so the numbers left unused by re-added
+    markups are not kept
+    items: optional dictionary of contextItems shared between loaded documents
+    """
+    with _gc_paused():
+        return _load_document(_unpack(data, DOCUMENT)[1], items)
+
+
+def _load_document(columns, items):
+    doc = ConTextDocument(unicodeEncoding=columns["encoding"],
+                          tagIdAllocator=_decode_allocator(columns["allocator"]),
+                          markupBackend=columns["backend"])
+    doc.setRawText(columns["raw_text"])
+    for parent, label in columns["sections"]:
+        doc.setParent(parent)
+        doc.insertSection(label)
+    graph = doc.getDocument()
+    for label, attributes in columns["section_attributes"].items():
+        graph.nodes[label].update(attributes)
+    decodedItems = _decode_items(columns["items"], items)
+    tags = columns["tags"]
+    first = 0
+    for parent, sharedAllocator, record in columns["markups"]:
+        allocator = doc.getTagIdAllocator() if sharedAllocator else None
+        doc.setParent(parent)
+        doc.addMarkup(_decode_markup(record, tags, first, decodedItems, allocator))
+        first += record[3]
+    doc.setParent(columns["current_parent"])
+    return doc
+
+
+def dumps(obj):
+    """serialize a ConTextDocument or a markup"""
+    if isinstance(obj, ConTextDocument):
+        return dumps_document(obj)
+    return dumps_markup(obj)
+
+
+def loads(data, items=None):
+    """rebuild the ConTextDocument or markup serialized in data"""
+    with _gc_paused():
+        kind, columns = _unpack(data, None)
+        if kind == DOCUMENT:
+            return _load_document(columns, items)
+        return _load_markup(columns, None, items)
+
+
+class corpusWriter(object):
+    """
+    Write named documents (or markups) to a binary file, one record after the
+    other. Each record is the name of the document followed by its
+    serialization, both prefixed by their length, so a reader can skip the
+    documents it does not need without decoding them.
+    """
+
+    def __init__(self, fileobj):
+        """fileobj: path or binary file object to write to"""
+        if isinstance(fileobj, (str, bytes)) or hasattr(fileobj, "__fspath__"):
+            self.__file = open(fileobj, "wb")
+            self.__close = True
+        else:
+            self.__file = fileobj
+            self.__close = False
+        self.__count = 0
+
+    def write(self, name, obj):
+        """append the document or markup obj under name"""
+        encoded = name.encode("utf-8")
+        data = dumps(obj)
+        self.__file.write(_NAME_LENGTH.pack(len(encoded)))
+        self.__file.write(encoded)
+        self.__file.write(_RECORD_LENGTH.pack(len(data)))
+        self.__file.write(data)
+        self.__count += 1
+
+    def writeAll(self, docs):
+        """append every (name, document) pair of docs, or every item of the mapping docs"""
+        if hasattr(docs, "items"):
+            docs = docs.items()
+        for name, obj in docs:
+            self.write(name, obj)
+
+    def getCount(self):
+        """return the number of records written"""
+        return self.__count
+
+    def close(self):
+        if self.__close:
+            self.__file.close()
+        else:
+            self.__file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write_corpus(fileobj, docs):
+    """write the documents of docs (a mapping or (name, document) pairs) to fileobj"""
+    with corpusWriter(fileobj) as writer:
+        writer.writeAll(docs)
+        return writer.getCount()
+
+
+def _read_exactly(f1, size):
+    data = f1.read(size)
+    if len(data) != size:
+        raise ValueError("truncated corpus file")
+    return data
+
+
+def _iter_records(f1, names):
+    while True:
+        header = f1.read(_NAME_LENGTH.size)
+        if not header:
+            return
+        if len(header) != _NAME_LENGTH.size:
+            raise ValueError("truncated corpus file")
+        name = _read_exactly(f1, _NAME_LENGTH.unpack(header)[0]).decode("utf-8")
+        size = _RECORD_LENGTH.unpack(_read_exactly(f1, _RECORD_LENGTH.size))[0]
+        if names is not None and name not in names:
+            f1.seek(size, io.SEEK_CUR)
+            continue
+        yield name, _read_exactly(f1, size)
+
+
+def read_corpus(fileobj, names=None):
+    """
+    generate the (name, document) pairs written by corpusWriter, in order
+    fileobj: path or binary file object to read from
+    names: optional collection of the names to read; the other records are skipped
+    The contextItems are shared between the documents read.
+    """
+    if names is not None:
+        names = set(names)
+    items = {}
+    if isinstance(fileobj, (str, bytes)) or hasattr(fileobj, "__fspath__"):
+        with open(fileobj, "rb") as f1:
+            for name, data in _iter_records(f1, names):
+                yield name, loads(data, items)
+    else:
+        for name, data in _iter_records(fileobj, names):
+            yield name, loads(data, items)
@@ -21,8 +21,12 @@ A module defining the itemData class. itemData objects are the basis tools for t
 """
 import platform
 
+import hashlib
 import os
+import pickle
+import re
 import yaml
+from .regexCache import compile_regex, REGEX_CACHE
 
 if platform.python_version_tuple()[0] == '2':
 
@@ -53,6 +57,7 @@ else:
 
 class contextItem(object):
     __numEnteries = 4
+    __slots__ = ('__literal', '__category', '__re', '__rule')
 
     def __init__(self, args):
         # print(args)
@@ -93,6 +98,23 @@ class contextItem(object):
     def getRule(self):
         return self.__rule
 
+    def getPattern(self):
+        """return the pattern string used to mark this item: the regular expression
+        if one was provided, otherwise the literal bounded by word boundaries"""
+        if self.__re:
+            return self.__re
+        return r"\b{}\b".format(self.__literal)
+
+    def getCompiledRE(self, ignoreCase=True):
+        """return the compiled pattern for this item from the process-wide regex cache"""
+        if ignoreCase:
+            return compile_regex(self.getPattern(), re.IGNORECASE | re.UNICODE)
+        return compile_regex(self.getPattern(), re.UNICODE)
+
+    def invalidateCompiledRE(self):
+        """drop any compiled variants of this item's pattern from the regex cache"""
+        REGEX_CACHE.invalidate(self.getPattern())
+
     def __unicode__(self):
         txt = """literal<<{0}>>; category<<{1}>>; re<<{2}>>; rule<<{3}>>""".format(
             self.__literal, self.__category, self.__re, self.__rule)
@@ -152,6 +174,16 @@ class itemData(list):
                 itm = contextItem(i)
             super(itemData, self).append(itm)
 
+    def compileREs(self, ignoreCase=True):
+        """compile the patterns of all items into the regex cache ahead of marking"""
+        for item in self:
+            item.getCompiledRE(ignoreCase)
+
+    def invalidateREs(self):
+        """drop the compiled patterns of all items from the regex cache"""
+        for item in self:
+            item.invalidateCompiledRE()
+
     def __unicode__(self):
         tmp = """itemData: {0:d} items [""".format(len(self))
         for i in self:
@@ -166,7 +198,23 @@ class itemData(list):
         return self.__repr__()
 
 
-def get_item_data(file_str):
+LEXICON_ARTIFACT_VERSION = 1
+LEXICON_ARTIFACT_SUFFIX = ".lexc"
+
+
+class _artifactUnpickler(pickle.Unpickler):
+    """an unpickler of builtin values only, so an artifact cannot run code when it is loaded"""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError("unexpected class {0}.{1} in lexicon artifact".format(module, name))
+
+
+def get_item_data(file_str, use_artifact=False):
+    """
+    read a lexicon from a csv, tsv or yml file (or from a string of their content).
+    If use_artifact is True, files are loaded through their compiled lexicon
+    artifact (see load_item_data)
+    """
     file_name = file_str.lower()
     if file_name.endswith(".csv") or file_name.endswith(".tsv") or file_name.endswith(".yml"):
         pwd = os.getcwd()
@@ -174,6 +222,8 @@ def get_item_data(file_str):
             file_str = os.path.join(pwd, file_str)
         if not os.path.exists(file_str):
             return itemData()
+        if use_artifact:
+            return load_item_data(file_str)
         if file_name.endswith('csv') or file_name.endswith('tsv'):            
             return instantiateFromCSVtoitemData(file_str)
         elif file_name.endswith('yml'):
@@ -191,6 +241,68 @@ def get_item_data(file_str):
             "This input format is not supported. It can be either a path of csv, tsv or yaml file, or a string of corresponding file content.")
 
 
+def hash_lexicon_file(file_str):
+    """return the sha256 hex digest of the content of a lexicon file"""
+    with open(file_str, 'rb') as f0:
+        return hashlib.sha256(f0.read()).hexdigest()
+
+
+def compile_item_data(file_str, artifact=None):
+    """
+    parse the csv, tsv or yml lexicon file_str and save the normalized items
+    and the hash of the source file as a versioned binary artifact (by default
+    file_str + LEXICON_ARTIFACT_SUFFIX). Returns the parsed itemData, also when
+    the artifact cannot be written (e.g. in a read-only directory).
+    """
+    if artifact is None:
+        artifact = file_str + LEXICON_ARTIFACT_SUFFIX
+    source_hash = hash_lexicon_file(file_str)
+    items = get_item_data(file_str)
+    content = {'version': LEXICON_ARTIFACT_VERSION,
+               'source_hash': source_hash,
+               'items': [(item.getLiteral(), ','.join(item.getCategory()), item.getRE(), item.getRule())
+                         for item in items]}
+    # write to a temporary file first so concurrently starting workers never read a partial artifact
+    tmp_artifact = "{0}.{1:d}.tmp".format(artifact, os.getpid())
+    try:
+        with open(tmp_artifact, 'wb') as f0:
+            pickle.dump(content, f0, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_artifact, artifact)
+    except OSError:
+        if os.path.exists(tmp_artifact):
+            os.remove(tmp_artifact)
+    return itemData(*items)
+
+
+def load_item_data(file_str, artifact=None, compileREs=False):
+    """
+    load the lexicon file_str from its compiled artifact. The artifact is
+    rebuilt with compile_item_data when it is missing, was written by another
+    artifact version, the hash of file_str no longer matches, or it cannot be
+    read back (e.g. a truncated or malformed file, or one holding anything
+    but builtin values).
+    If compileREs is True the item patterns are compiled into the regex cache.
+    """
+    if artifact is None:
+        artifact = file_str + LEXICON_ARTIFACT_SUFFIX
+    items = None
+    if os.path.exists(artifact):
+        try:
+            with open(artifact, 'rb') as f0:
+                content = _artifactUnpickler(f0).load()
+            if content['version'] == LEXICON_ARTIFACT_VERSION and \
+                    content['source_hash'] == hash_lexicon_file(file_str):
+                items = itemData(*[contextItem(args) for args in content['items']])
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError, KeyError, IndexError,
+                TypeError):
+            items = None
+    if items is None:
+        items = compile_item_data(file_str, artifact)
+    if compileREs:
+        items.compileREs()
+    return items
+
+
 def instantiateFromCSVStr(content, splitter):
     reader = csv.reader(content.split('\n'), delimiter=splitter)
     items = itemData()
@@ -0,0 +1,273 @@
+"""
+Module defining the markupGraph class, a minimal directed graph used as a
+lightweight alternative to networkx.DiGraph for sentence markups.
+
+A sentence markup only holds a few tagObjects and the edges from modifiers to
+the targets they modify, but a networkx.DiGraph allocates an attribute dict and
+successor and predecessor dicts for every node. markupGraph keeps one
+attribute dict per node, only creates adjacency dicts for nodes that have
+edges, and indexes the nodes by their 'category' attribute so the targets or
+modifiers of a sentence can be listed without scanning every node.
+
+The subset of the networkx.DiGraph interface used by pyConTextNLP and its
+callers is provided: nodes(), edges(), predecessors(), successors(), the
+add/remove methods and graph attributes. nodes(), edges(), predecessors() and
+successors() return lists. toDiGraph() copies the graph into a
+networkx.DiGraph for anything else (e.g. drawing).
+"""
+
+
+class nodeView(object):
+    """
+    A read-only view of the nodes of a markupGraph that can be called like
+    networkx.DiGraph.nodes() and indexed like networkx.DiGraph.nodes[n]
+    """
+
+    def __init__(self, graph):
+        self.__graph = graph
+
+    def __call__(self, data=False):
+        return self.__graph.getNodes(data)
+
+    def __getitem__(self, n):
+        return self.__graph.getNodeAttributes(n)
+
+    def __iter__(self):
+        return iter(self.__graph)
+
+    def __len__(self):
+        return len(self.__graph)
+
+    def __contains__(self, n):
+        return n in self.__graph
+
+
+class markupGraph(object):
+    """
+    A directed graph storing node attributes, edges and a category index in
+    plain dicts. Nodes must be hashable; node and edge order is insertion
+    order, as in networkx.
+
+    The category index is maintained by add_node/add_nodes_from; changing the
+    'category' attribute of a node in place is not reflected in
+    getCategoryNodes.
+    """
+
+    def __init__(self, **attr):
+        self.graph = dict(attr)
+        self.__node = {}
+        # adjacency dicts are only created for nodes that have edges
+        self.__succ = {}
+        self.__pred = {}
+        self.__byCategory = {}
+
+    @property
+    def nodes(self):
+        return nodeView(self)
+
+    def getNodes(self, data=False):
+        """return the list of nodes, or of (node, attributes) pairs if data is True"""
+        if data:
+            return list(self.__node.items())
+        return list(self.__node)
+
+    def getNodeAttributes(self, n):
+        return self.__node[n]
+
+    def getCategoryNodes(self, category):
+        """return the nodes with attribute category equal to category, in insertion order"""
+        return list(self.__byCategory.get(category, ()))
+
+    def __index(self, n, category):
+        self.__byCategory.setdefault(category, {})[n] = None
+
+    def __unindex(self, n, category):
+        nodes = self.__byCategory.get(category)
+        if nodes is not None:
+            nodes.pop(n, None)
+            if not nodes:
+                del self.__byCategory[category]
+
+    def add_node(self, n, **attr):
+        attributes = self.__node.get(n)
+        if attributes is None:
+            self.__node[n] = attr
+            if 'category' in attr:
+                self.__index(n, attr['category'])
+            return
+        category = attributes.get('category')
+        attributes.update(attr)
+        if attributes.get('category') != category:
+            self.__unindex(n, category)
+            # keep the index in node order, as a scan of the nodes would be
+            category = attributes['category']
+            self.__byCategory[category] = {m: None for m, a in self.__node.items()
+                                           if a.get('category') == category}
+
+    def add_nodes_from(self, nodes, **attr):
+        for n in nodes:
+            try:
+                n in self.__node
+                self.add_node(n, **attr)
+            except TypeError:
+                # (node, attribute dict) pairs, as networkx accepts
+                n, ndict = n
+                nattr = attr.copy()
+                nattr.update(ndict)
+                self.add_node(n, **nattr)
+
+    def remove_node(self, n):
+        attributes = self.__node.pop(n)
+        if 'category' in attributes:
+            self.__unindex(n, attributes['category'])
+        for v in self.__succ.pop(n, ()):
+            self.__discard(self.__pred, v, n)
+        for u in self.__pred.pop(n, ()):
+            self.__discard(self.__succ, u, n)
+
+    def remove_nodes_from(self, nodes):
+        for n in nodes:
+            if n in self.__node:
+                self.remove_node(n)
+
+    @staticmethod
+    def __discard(adjacency, u, v):
+        neighbors = adjacency[u]
+        del neighbors[v]
+        if not neighbors:
+            del adjacency[u]
+
+    def add_edge(self, u, v, **attr):
+        if u not in self.__node:
+            self.__node[u] = {}
+        if v not in self.__node:
+            self.__node[v] = {}
+        successors = self.__succ.setdefault(u, {})
+        attributes = successors.get(v)
+        if attributes is None:
+            attributes = {}
+            successors[v] = attributes
+            self.__pred.setdefault(v, {})[u] = attributes
+        attributes.update(attr)
+
+    def add_edges_from(self, ebunch, **attr):
+        for e in ebunch:
+            if len(e) == 3:
+                u, v, edata = e
+                eattr = attr.copy()
+                eattr.update(edata)
+                self.add_edge(u, v, **eattr)
+            else:
+                u, v = e
+                self.add_edge(u, v, **attr)
+
+    def remove_edge(self, u, v):
+        self.__discard(self.__succ, u, v)
+        self.__discard(self.__pred, v, u)
+
+    def remove_edges_from(self, ebunch):
+        for e in ebunch:
+            if self.has_edge(e[0], e[1]):
+                self.remove_edge(e[0], e[1])
+
+    def edges(self, nbunch=None, data=False):
+        """
+        return the list of (u, v) edges, or (u, v, attributes) if data is True,
+        optionally limited to the edges out of the nodes in nbunch
+        """
+        if nbunch is None:
+            sources = self.__node
+        elif nbunch in self:
+            sources = [nbunch]
+        else:
+            sources = [n for n in nbunch if n in self.__node]
+        succ = self.__succ
+        if data:
+            return [(u, v, d) for u in sources for v, d in succ.get(u, {}).items()]
+        return [(u, v) for u in sources for v in succ.get(u, ())]
+
+    out_edges = edges
+
+    def in_edges(self, nbunch=None, data=False):
+        if nbunch is None:
+            targets = self.__node
+        elif nbunch in self:
+            targets = [nbunch]
+        else:
+            targets = [n for n in nbunch if n in self.__node]
+        pred = self.__pred
+        if data:
+            return [(u, v, d) for v in targets for u, d in pred.get(v, {}).items()]
+        return [(u, v) for v in targets for u in pred.get(v, ())]
+
+    def successors(self, n):
+        if n not in self.__node:
+            raise KeyError("The node {0} is not in the graph.".format(n))
+        return list(self.__succ.get(n, ()))
+
+    def predecessors(self, n):
+        if n not in self.__node:
+            raise KeyError("The node {0} is not in the graph.".format(n))
+        return list(self.__pred.get(n, ()))
+
+    neighbors = successors
+
+    def has_node(self, n):
+        return n in self.__node
+
+    def has_edge(self, u, v):
+        return v in self.__succ.get(u, ())
+
+    def in_degree(self, n=None):
+        if n is None:
+            return [(m, len(self.__pred.get(m, ()))) for m in self.__node]
+        return len(self.__pred.get(n, ()))
+
+    def out_degree(self, n=None):
+        if n is None:
+            return [(m, len(self.__succ.get(m, ()))) for m in self.__node]
+        return len(self.__succ.get(n, ()))
+
+    def degree(self, n=None):
+        if n is None:
+            return [(m, self.degree(m)) for m in self.__node]
+        return len(self.__pred.get(n, ())) + len(self.__succ.get(n, ()))
+
+    def number_of_nodes(self):
+        return len(self.__node)
+
+    def number_of_edges(self):
+        return sum(len(successors) for successors in self.__succ.values())
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return False
+
+    def clear(self):
+        self.graph.clear()
+        self.__node.clear()
+        self.__succ.clear()
+        self.__pred.clear()
+        self.__byCategory.clear()
+
+    def toDiGraph(self):
+        """return a networkx.DiGraph with the same nodes, edges and attributes"""
+        import networkx as nx
+        g = nx.DiGraph(**self.graph)
+        g.add_nodes_from(self.getNodes(data=True))
+        g.add_edges_from(self.edges(data=True))
+        return g
+
+    def __iter__(self):
+        return iter(self.__node)
+
+    def __len__(self):
+        return len(self.__node)
+
+    def __contains__(self, n):
+        try:
+            return n in self.__node
+        except TypeError:
+            return False
@@ -0,0 +1,181 @@
+"""
+Module defining a bounded store for marked up documents.
+
+A classifier that saves the ConTextDocument of every document it classifies
+holds every sentence graph of a corpus in memory. lruMarkupStore is a mapping
+from document names to documents that keeps at most maxDocs documents, or
+maxBytes of serialized documents, in memory and evicts the least recently used
+ones. Evicted documents are either dropped or, if a spill directory is given,
+written to it and read back when they are asked for again.
+"""
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from .ConTextMarkup import ConTextMarkupBase
+from .io import binary
+from .pyConText import ConTextDocument
+
+
+def dump_document(doc):
+    """
+    serialize a document for the store: ConTextDocuments and markups in the
+    binary format of pyConTextNLP.io.binary, anything else with pickle
+    """
+    if isinstance(doc, (ConTextDocument, ConTextMarkupBase)):
+        return binary.dumps(doc)
+    return pickle.dumps(doc, pickle.HIGHEST_PROTOCOL)
+
+
+def load_document(data):
+    """deserialize a document serialized with dump_document"""
+    if binary.is_serialized(data):
+        return binary.loads(data)
+    return pickle.loads(data)
+
+
+class lruMarkupStore(MutableMapping):
+    """
+    A least-recently-used mapping of document names to documents, bounded by
+    the number of documents and/or the total size of their serialized form
+    (a proxy for their size in memory). Without a spill directory evicted
+    documents are forgotten: they are no longer keys of the store.
+
+    Documents are serialized when they are stored if maxBytes is set, and when
+    they are spilled. With both maxBytes and a spill directory, the serialized
+    form made when a document is stored is kept with it and written when it is
+    spilled, so each document is serialized once. A document reloaded from the
+    spill directory keeps its file, so it is not written again when it is
+    evicted again: documents should not be modified once they are stored.
+    """
+
+    def __init__(self, maxDocs=None, maxBytes=None, spillDir=None,
+                 dumps=dump_document, loads=load_document):
+        """
+        maxDocs: the number of documents kept in memory (None for no bound)
+        maxBytes: the total serialized size of the documents kept in memory (None for no bound)
+        spillDir: directory evicted documents are written to; None to drop them
+        dumps, loads: the serialization of the documents
+        """
+        self.__maxDocs = maxDocs
+        self.__maxBytes = maxBytes
+        self.__spillDir = spillDir
+        if spillDir is not None:
+            os.makedirs(spillDir, exist_ok=True)
+        self.__dumps = dumps
+        self.__loads = loads
+        # name -> spill file (None until the document is spilled), in insertion order
+        self.__index = {}
+        # name -> (document, serialized size, serialized form to spill or None) of the documents in memory,
+        # least recently used first
+        self.__memory = OrderedDict()
+        self.__bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def getMaxDocs(self):
+        return self.__maxDocs
+
+    def getMaxBytes(self):
+        return self.__maxBytes
+
+    def getSpillDir(self):
+        return self.__spillDir
+
+    def __setitem__(self, name, doc):
+        if name in self.__index:
+            del self[name]
+        data = self.__dumps(doc) if self.__maxBytes is not None else None
+        size = len(data) if data is not None else 0
+        if self.__spillDir is None:
+            data = None
+        self.__index[name] = None
+        self.__memory[name] = (doc, size, data)
+        self.__bytes += size
+        self.__evict()
+
+    def __getitem__(self, name):
+        entry = self.__memory.get(name)
+        if entry is not None:
+            self.hits += 1
+            self.__memory.move_to_end(name)
+            return entry[0]
+        fileName = self.__index[name]
+        if fileName is None:
+            raise KeyError(name)
+        self.misses += 1
+        with open(fileName, 'rb') as f1:
+            data = f1.read()
+        doc = self.__loads(data)
+        self.__memory[name] = (doc, len(data), None)
+        self.__bytes += len(data)
+        self.__evict(keep=name)
+        return doc
+
+    def __delitem__(self, name):
+        fileName = self.__index.pop(name)
+        entry = self.__memory.pop(name, None)
+        if entry is not None:
+            self.__bytes -= entry[1]
+        if fileName is not None:
+            os.remove(fileName)
+
+    def __iter__(self):
+        return iter(list(self.__index))
+
+    def __len__(self):
+        return len(self.__index)
+
+    def __contains__(self, name):
+        return name in self.__index
+
+    def clear(self):
+        """drop every document, removing the spilled files"""
+        for name in list(self.__index):
+            del self[name]
+        self.hits = 0
+        self.misses = 0
+
+    def inMemory(self, name):
+        """return whether the document is held in memory"""
+        return name in self.__memory
+
+    def getStats(self):
+        """return a dictionary of the document counts, memory use and hit/miss counters"""
+        return {"docs": len(self.__index),
+                "in_memory": len(self.__memory),
+                "bytes": self.__bytes,
+                "spilled": sum(1 for f in self.__index.values() if f is not None),
+                "hits": self.hits,
+                "misses": self.misses}
+
+    def __overBound(self):
+        return ((self.__maxDocs is not None and len(self.__memory) > self.__maxDocs) or
+                (self.__maxBytes is not None and self.__bytes > self.__maxBytes))
+
+    def __evict(self, keep=None):
+        """evict least recently used documents until the bounds hold, except keep"""
+        while self.__memory and self.__overBound():
+            name = next(iter(self.__memory))
+            if name == keep:
+                if len(self.__memory) == 1:
+                    break
+                self.__memory.move_to_end(name)
+                continue
+            doc, size, data = self.__memory.pop(name)
+            self.__bytes -= size
+            if self.__spillDir is None:
+                del self.__index[name]
+            elif self.__index[name] is None:
+                self.__index[name] = self.__spill(doc, data)
+
+    def __spill(self, doc, data=None):
+        if data is None:
+            data = self.__dumps(doc)
+        # unique file names, so several stores can share a spill directory
+        fd, fileName = tempfile.mkstemp(suffix=".markup", dir=self.__spillDir)
+        with os.fdopen(fd, 'wb') as f1:
+            f1.write(data)
+        return fileName
@@ -0,0 +1,103 @@
+"""
+Module defining the itemMatcher class, a matching engine that marks a sentence
+with a whole itemData list while scanning the sentence only once.
+
+Running one finditer per contextItem makes markup cost grow with
+sentences x items. Most lexicon entries are plain literals, and a plain literal
+bounded by word boundaries can only match where its first word occurs as a
+whole token of the sentence. itemMatcher indexes the plain-literal items by
+that first word, tokenizes each sentence once, and only runs the patterns of
+items whose first word is present. Items with their own regular expression are
+verified on every sentence. The matches (spans, phrases and group dictionaries)
+and their order are the same as running markItem for each item in turn.
+"""
+import re
+from collections import defaultdict
+
+REG_WORD = re.compile(r"""\w+""")
+REG_PLAIN_LITERAL = re.compile(r"""\w[^.^$*+?{}\[\]\\|()]*\Z""", re.ASCII)
+REG_FIRST_WORD = re.compile(r"""\w+""", re.ASCII)
+
+
+def _literal_key(item, ignoreCase):
+    """
+    return the first word of item's literal if item can be prefiltered on it,
+    otherwise None
+    """
+    if item.getRE() or not ignoreCase:
+        return None
+    literal = item.getLiteral()
+    if not literal.isascii() or not REG_PLAIN_LITERAL.match(literal):
+        return None
+    return REG_FIRST_WORD.match(literal).group().lower()
+
+
+class itemMatcher(object):
+    """
+    A single-pass matcher built from an itemData list.
+
+    items: a list of contextItems
+    ignoreCase: compile the item patterns with IGNORECASE (default True)
+    """
+
+    def __init__(self, items, ignoreCase=True):
+        self.__items = list(items)
+        self.__ignoreCase = ignoreCase
+        self.__regexes = [item.getCompiledRE(ignoreCase) for item in self.__items]
+        self.__byFirstWord = defaultdict(list)
+        self.__alwaysCheck = []
+        for index, item in enumerate(self.__items):
+            key = _literal_key(item, ignoreCase)
+            if key is None:
+                self.__alwaysCheck.append(index)
+            else:
+                self.__byFirstWord[key].append(index)
+
+    def getItems(self):
+        """return the list of contextItems the matcher was built from"""
+        return self.__items
+
+    def getIgnoreCase(self):
+        return self.__ignoreCase
+
+    def getNumPrefilteredItems(self):
+        """return the number of items that are only checked when their first word occurs"""
+        return len(self.__items) - len(self.__alwaysCheck)
+
+    def candidates(self, txt):
+        """return the indices (in item order) of the items that may match txt"""
+        if not txt.isascii():
+            # IGNORECASE folding of non-ASCII text does not always agree with
+            # str.lower(), so only ASCII sentences are prefiltered
+            return range(len(self.__items))
+        found = list(self.__alwaysCheck)
+        byFirstWord = self.__byFirstWord
+        for word in set(REG_WORD.findall(txt.lower())):
+            found.extend(byFirstWord.get(word, ()))
+        found.sort()
+        return found
+
+    def finditer(self, txt):
+        """
+        generate (item, match) pairs for all matches in txt, ordered by item and
+        then by position, as markItem would find them
+        """
+        items = self.__items
+        regexes = self.__regexes
+        for index in self.candidates(txt):
+            item = items[index]
+            for match in regexes[index].finditer(txt):
+                yield item, match
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __unicode__(self):
+        return "itemMatcher: {0:d} items ({1:d} prefiltered)".format(
+            len(self.__items), self.getNumPrefilteredItems())
+
+    def __str__(self):
+        return self.__unicode__()
+
+    def __repr__(self):
+        return self.__unicode__()
@@ -21,9 +21,11 @@ sub-texts of interest
 3) pyConText: a class that implements the context algorithm
 
 """
+import io
 import re
-from .ConTextMarkup import ConTextMarkup
+from .ConTextMarkup import ConTextMarkup, LiteConTextMarkup, get_markup_class
 from .io.xml import xmlScrub
+from .tagIdAllocator import counterTagIdAllocator
 import networkx as nx
 
 
@@ -42,12 +44,21 @@ class ConTextDocument(object):
     found in text and markedModifiers, tagObjects found in the text
     """
     rb = re.compile(r"""\b""",re.UNICODE)
-    def __init__(self,unicodeEncoding='utf-8'):
-        """txt is the string to parse"""
+    def __init__(self,unicodeEncoding='utf-8', tagIdAllocator=None, markupBackend=None):
+        """txt is the string to parse
+        tagIdAllocator: callable returning new tag ids for the markups of this
+        document. Defaults to a counter private to the document, so tag ids are
+        deterministic and increase with position in the document.
+        markupBackend: name of the markup backend ("networkx" or "lite") or a
+        markup class; used for the markups of this document and the document graph"""
         # __document capture the document level structure
         # for each sentence and then put in the archives when the next sentence
         # is processed
         self.__unicodeEncoding = unicodeEncoding
+        if tagIdAllocator is None:
+            tagIdAllocator = counterTagIdAllocator()
+        self.__tagIdAllocator = tagIdAllocator
+        self.__markupClass = get_markup_class(markupBackend)
         self.__document = nx.DiGraph()
         self.__currentSentenceNum = 0
         self.__currentSectionNum = 0
@@ -56,9 +67,19 @@ class ConTextDocument(object):
         self.__currentParent = "document"
         self.__root = "document"
         self.__documentGraph = None
+        # the text the sentences were split from, if known
+        self.__rawTxt = None
+        # indexes maintained on insert: the document edge (parent, markup, data)
+        # of each sentence by sentence number (None once the markup has been
+        # re-added), the (sentenceNumber, markup) pairs of each section in
+        # sentence order and the section number of each (parent, section) edge
+        self.__sentences = []
+        self.__sectionMarkups = {}
+        self.__sections = {}
 
     def insertSection(self,sectionLabel,setToParent=False):
         self.__document.add_edge(self.__currentParent,sectionLabel,category="section",__sectionNumber=self.__currentSectionNum)
+        self.__sections[(self.__currentParent, sectionLabel)] = self.__currentSectionNum
         self.__currentSectionNum += 1
         if setToParent:
             self.__currentParent = sectionLabel
@@ -78,24 +99,46 @@ class ConTextDocument(object):
             self.__document.node[self.__currentParent][key] = kwargs[key]
     def getUnicodeEncoding(self):
         return self.__unicodeEncoding
+    def getTagIdAllocator(self):
+        """return the tag id allocator to be used by the markups of this document"""
+        return self.__tagIdAllocator
+    def getMarkupClass(self):
+        """return the class of the markups of this document"""
+        return self.__markupClass
+    def setRawText(self, txt):
+        """set the text of the document; the document offsets of the markups refer to it"""
+        self.__rawTxt = txt
+    def getRawText(self):
+        """return the text of the document, or None if it has not been set"""
+        return self.__rawTxt
 
     def addMarkup(self, markup):
         """
         add the markup as a node in the document attached to the current parent.
         """
         # I'm not sure if I want to be using copy here
-        self.__document.add_edge(self.__currentParent,markup,
+        parent = self.__currentParent
+        if self.__document.has_edge(parent, markup):
+            # the edge is updated with the new sentence number
+            sentenceNumber = self.__document[parent][markup]['sentenceNumber']
+            self.__sentences[sentenceNumber] = None
+            self.__sectionMarkups[parent] = [s for s in self.__sectionMarkups[parent]
+                                             if s[0] != sentenceNumber]
+        self.__document.add_edge(parent,markup,
                 category="markup",
                 sentenceNumber=self.__currentSentenceNum)
+        self.__sentences.append((parent, markup, self.__document[parent][markup]))
+        self.__sectionMarkups.setdefault(parent, []).append((self.__currentSentenceNum, markup))
 
         self.__currentSentenceNum += 1
+        if self.__documentGraph is not None:
+            self.__addToDocumentGraph(markup)
     def retrieveMarkup(self,sentenceNumber):
         """
-        retrieve the markup corresponding to sentenceNumber
+        retrieve the document edge (section, markup, data) of sentenceNumber
         """
-        edge = [e for e in self.__document.edges(data=True) if e[2]['category'] == "markup" and e[2]['sentenceNumber'] == sentenceNumber]
-        if edge:
-            return edge[0]
+        if 0 <= sentenceNumber < len(self.__sentences):
+            return self.__sentences[sentenceNumber]
 
     def getSectionNodes(self,sectionLabel = None, category="markup"):
         if not sectionLabel:
@@ -107,27 +150,34 @@ class ConTextDocument(object):
         return tmp[1]
 
     def getSectionMarkups(self, sectionLabel = None, returnSentenceNumbers=True ):
-        """return the markup graphs for the section ordered by sentence number"""
+        """return the markup graphs for the section ordered by sentence number
+        sectionLabel may also be a list or tuple of section labels (as returned
+        by getDocumentSections), in which case the markups of all these
+        sections are returned ordered by sentence number"""
         if not sectionLabel:
             sectionLabel = self.__currentParent
-        successors = [(e[2]['sentenceNumber'],e[1]) for e in self.__document.out_edges(sectionLabel, data=True)
-                                                            if e[2].get("category") == "markup"]
-        successors.sort()
+        if isinstance(sectionLabel, list) or \
+           (isinstance(sectionLabel, tuple) and sectionLabel not in self.__sectionMarkups):
+            successors = []
+            for label in set(sectionLabel):
+                successors.extend(self.__sectionMarkups.get(label, ()))
+            successors.sort(key=lambda s: s[0])
+        else:
+            successors = list(self.__sectionMarkups.get(sectionLabel, ()))
         if returnSentenceNumbers:
             return successors
         else:
-            tmp = list(zip(*successors))
-            return tmp[1]
+            return tuple(s[1] for s in successors)
+
+    def getDocumentMarkups(self):
+        """return the markup graphs of the document ordered by sentence number"""
+        return [s[1] for s in self.__sentences if s is not None]
 
     def getDocumentSections(self):
-        edges = [ (e[2]['__sectionNumber'],e[1]) for e in self.__document.edges(data=True) if e[2].get("category") == "section"]
-        edges.sort()
-        tmp = list(zip(*edges))
-        if len(tmp) > 1:
-            tmp = [self.__root, tmp[1]]
-        else:
-            tmp = [self.__root]
-        return tmp
+        if not self.__sections:
+            return [self.__root]
+        edges = sorted((number, section[1]) for section, number in self.__sections.items())
+        return [self.__root, tuple(e[1] for e in edges)]
 
     def getSectionText(self,sectionLabel = None ):
         """
@@ -137,35 +187,46 @@ class ConTextDocument(object):
         return txt
 
     def getDocumentGraph(self):
-        if not self.__documentGraph:
+        if self.__documentGraph is None:
             self.computeDocumentGraph()
         return self.__documentGraph
 
     def getXML(self):
-        txt = ""
-# first generate string for all the sentences from the document in order to compute document level offsets
-        documentString = ""
+        xml = io.StringIO()
+        self.writeXML(xml)
+        return xml.getvalue()
+
+    def writeXML(self, fileobj):
+        """
+        write the XML representation of the document (as returned by getXML)
+        to the text file object fileobj, sentence by sentence
+        """
+        write = fileobj.write
+        head, tail = ConTextDocumentXMLSkel.split("{0}")
+        write(head)
+# first write the sentences of the document in order, computing their document level offsets
         sentenceOffsets = {}
+        offset = 0
         sections = self.getDocumentSections()
         for s in sections:
             markups = self.getSectionMarkups(s)
             for m in markups:
-                sentenceOffsets[m[0]] = len(documentString)
-                documentString = documentString + m[1].getText()+" "
-
-        txt += xmlScrub(documentString)
-        # get children sections of root
-
+                sentenceOffsets[m[0]] = offset
+                txt = m[1].getText()+" "
+                offset += len(txt)
+                # xmlScrub replaces single characters, so the sentences can be scrubbed one by one
+                write(xmlScrub(txt))
 
         for s in sections:
-            txt += """<section>\n<sectionLabel> {0} </sectionLabel>\n""".format(s)
+            write("""<section>\n<sectionLabel> {0} </sectionLabel>\n""".format(s))
             markups = self.getSectionMarkups(s)
             for m in markups:
-                txt += "<sentence>\n<sentenceNumber> %d </sentenceNumber>\n<sentenceOffset> %d </sentenceOffset></sentence>\n%s"%(
-                    (m[0],sentenceOffsets[m[0]],m[1].getXML()))
-            txt += """</section>\n"""
+                write("<sentence>\n<sentenceNumber> %d </sentenceNumber>\n<sentenceOffset> %d </sentenceOffset></sentence>\n"%(
+                    (m[0],sentenceOffsets[m[0]])))
+                m[1].writeXML(fileobj)
+            write("""</section>\n""")
+        write(tail)
 
-        return ConTextDocumentXMLSkel.format(txt)
     def __unicode__(self):
         txt = '_'*42+"\n"
         return txt
@@ -175,28 +236,28 @@ class ConTextDocument(object):
         return self.__unicode__()#.encode('utf-8')
 
     def computeDocumentGraph(self, verbose=False):
-        """Create a single document graph from the union of the graphs created
-           for each sentence in the archive. Note that the algorithm in NetworkX
-           is different based on whether the Python version is greater than or
-           equal to 2.6"""
-        # Note that this as written does not include the currentGraph in the DocumentGraph
-        # Maybe this should be changed
-        self.__documentGraph = ConTextMarkup()
+        """Create a single document graph holding the nodes and edges of the
+           graphs created for each sentence, in sentence order. Once computed,
+           the document graph is extended in place by addMarkup."""
+        self.__documentGraph = self.__markupClass()
         if verbose:
-            print("Document markup has {0d} edges".format(self.__document.number_of_edges()))
-        markups = [e[1] for e in self.__document.edges(data=True) if e[2].get('category') == 'markup']
+            print("Document markup has {0:d} edges".format(self.__document.number_of_edges()))
+        markups = self.getDocumentMarkups()
         if verbose:
-            print("Document markup has {0d} conTextMarkup objects".format(len(markups)))
-        for i in range(len(markups)):
-        #for m in markups:
-            m = markups[i]
+            print("Document markup has {0:d} conTextMarkup objects".format(len(markups)))
+        for i, m in enumerate(markups):
             if verbose:
-                print("markup {0d} has {1d} total items including {2d} targets".format(i,m.number_of_nodes(),m.getNumMarkedTargets()))
+                print("markup {0:d} has {1:d} total items including {2:d} targets".format(i,m.number_of_nodes(),m.getNumMarkedTargets()))
 
-            self.__documentGraph = nx.union(m,self.__documentGraph)
+            self.__addToDocumentGraph(m)
             if verbose:
-                print("documentGraph now has {0d} nodes".format(self.__documentGraph.number_of_nodes()))
-
-
-
+                print("documentGraph now has {0:d} nodes".format(self.__documentGraph.number_of_nodes()))
 
+    def __addToDocumentGraph(self, markup):
+        """add the nodes and edges of markup to the document graph"""
+        graph = self.__documentGraph
+        # as with nx.union, graph attributes already set take precedence
+        for key, value in markup.graph.items():
+            graph.graph.setdefault(key, value)
+        graph.add_nodes_from(markup.nodes(data=True))
+        graph.add_edges_from(markup.edges(data=True))
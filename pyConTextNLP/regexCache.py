@@ -0,0 +1,102 @@
+"""
+Module defining a bounded, process-wide cache of compiled regular expressions.
+
+pyConText marks every sentence with every contextItem, so the same handful of
+pattern strings are compiled over and over. Compiled patterns are kept here,
+keyed by (pattern, flags), and evicted in least-recently-used order once
+maxsize entries are held.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 65536
+
+
+class regexCache(object):
+    """
+    A least-recently-used cache of compiled regular expressions keyed by
+    (pattern, flags). hits and misses count cache lookups since the last reset.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.__maxsize = maxsize
+        self.__cache = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def getMaxSize(self):
+        return self.__maxsize
+
+    def setMaxSize(self, maxsize):
+        """change the bound on the number of cached patterns, evicting if needed"""
+        with self.__lock:
+            self.__maxsize = maxsize
+            self.__evict()
+
+    def compile(self, pattern, flags=0):
+        """return the compiled form of pattern, compiling it only on a miss"""
+        key = (pattern, flags)
+        with self.__lock:
+            regex = self.__cache.get(key)
+            if regex is not None:
+                self.hits += 1
+                self.__cache.move_to_end(key)
+                return regex
+            self.misses += 1
+        regex = re.compile(pattern, flags)
+        with self.__lock:
+            self.__cache[key] = regex
+            self.__evict()
+        return regex
+
+    def invalidate(self, pattern, flags=None):
+        """
+        drop pattern from the cache. If flags is None every compiled variant of
+        pattern is dropped.
+        """
+        with self.__lock:
+            if flags is not None:
+                self.__cache.pop((pattern, flags), None)
+            else:
+                for key in [k for k in self.__cache if k[0] == pattern]:
+                    del self.__cache[key]
+
+    def clear(self):
+        """drop every compiled pattern and reset the counters"""
+        with self.__lock:
+            self.__cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def getStats(self):
+        """return a dictionary of the hit/miss counters and current size"""
+        with self.__lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "size": len(self.__cache),
+                    "maxsize": self.__maxsize}
+
+    def __evict(self):
+        while self.__maxsize is not None and len(self.__cache) > self.__maxsize:
+            self.__cache.popitem(last=False)
+
+    def __len__(self):
+        return len(self.__cache)
+
+    def __contains__(self, key):
+        return key in self.__cache
+
+
+REGEX_CACHE = regexCache()
+
+
+def compile_regex(pattern, flags=0):
+    """compile pattern through the process-wide cache"""
+    return REGEX_CACHE.compile(pattern, flags)
+
+
+def clear_regex_cache():
+    """empty the process-wide cache"""
+    REGEX_CACHE.clear()
@@ -0,0 +1,64 @@
+"""
+Module defining tag id allocators.
+
+Every tagObject gets an integer id when it is marked. An allocator is any
+callable that takes no arguments and returns a new id. The allocators defined
+here are cheap counters: ids are sortable in allocation order and, when a
+fresh allocator is used for each document, deterministic.
+"""
+import itertools
+import uuid
+
+
+class counterTagIdAllocator(object):
+    """
+    Allocate consecutive integer ids starting at start. Use one allocator per
+    document to get the same ids every time the document is marked up.
+    """
+
+    def __init__(self, start=1):
+        self.__counter = itertools.count(start)
+
+    def __call__(self):
+        return next(self.__counter)
+
+    def __getstate__(self):
+        # itertools.count cannot be inspected, so take the next value and start over from it
+        start = next(self.__counter)
+        self.__counter = itertools.count(start)
+        return start
+
+    def __setstate__(self, start):
+        self.__counter = itertools.count(start)
+
+
+class globalTagIdAllocator(counterTagIdAllocator):
+    """
+    Allocate consecutive integer ids under a random 64 bit prefix, so that ids
+    remain sortable within a document but are unique when markups from
+    different processes or machines are merged.
+    """
+
+    def __init__(self, start=1):
+        super(globalTagIdAllocator, self).__init__((uuid.uuid4().int >> 64 << 64) + start)
+
+
+DEFAULT_ALLOCATOR = counterTagIdAllocator()
+
+
+def get_default_allocator():
+    """return the process-wide allocator used when no allocator is specified"""
+    return DEFAULT_ALLOCATOR
+
+
+def set_default_allocator(allocator):
+    """replace the process-wide allocator; allocator is a callable returning new ids"""
+    global DEFAULT_ALLOCATOR
+    DEFAULT_ALLOCATOR = allocator
+
+
+def create_tag_id():
+    """
+    get a unique identifier from the process-wide allocator
+    """
+    return DEFAULT_ALLOCATOR()
@@ -2,9 +2,9 @@
 tabObject module
 """
 
-import uuid
 import copy
 from .io.xml import xmlScrub
+from .tagIdAllocator import create_tag_id
 
 tagObjectXMLSkel=\
 """
@@ -28,7 +28,19 @@ class tagObject(object):
     1) The contextItem defining the tag
     3) The location of the tag within the text being parsed
 
+    tagObjects are slotted: a document holds one per marked phrase and the
+    markup graphs hash them repeatedly, so they carry no instance dictionary
+    and hash on their tag id.
+
+    Comparisons, == included, are by span, while the hash is the tag id: two
+    tags with the same span compare equal but hash differently. Sets and graphs
+    therefore keep tags with the same span as distinct members (their ids
+    differ), and a tag is only found in them by a tag with its id and span.
+    Use == to compare spans, not to look tags up.
     """
+    __slots__ = ('__item', '__category', '__spanStart', '__spanEnd', '__docSpan', '__foundPhrase',
+                 '__foundDict', '__ConTextCategory', '__tagID', '__scope', '__SCOPEUPDATED')
+
     def __init__(self, item, ConTextCategory, scope=None, tagid=None, **kwargs):
         """
         item: contextItem used to generate term
@@ -37,14 +49,18 @@ class tagObject(object):
         variants
         """
         self.__item = item
-        self.__category = self.__item.getCategory()
+        # None until the category is changed: the item's categories are used
+        self.__category = None
         self.__spanStart = 0
         self.__spanEnd = 0
+        # span in the original document, None if not known
+        self.__docSpan = None
         self.__foundPhrase = ''
-        self.__foundDict = {}
+        # None when the match had no named groups
+        self.__foundDict = None
         self.__ConTextCategory = ConTextCategory
-        if not tagid:
-            tagid = uuid.uid1().int
+        if tagid is None:
+            tagid = create_tag_id()
         self.__tagID = tagid
         if scope == None:
             self.__scope = []
@@ -132,6 +148,11 @@ class tagObject(object):
         return description
 
 
+    def getItem(self):
+        """returns the contextItem defining this object"""
+        return self.__item
+
+
     def getLiteral(self):
         """returns the term defining this object"""
         return self.__item.getLiteral()
@@ -139,10 +160,14 @@ class tagObject(object):
 
     def getCategory(self):
         """returns the category (e.g. CONJUNCTION) for this object"""
+        if self.__category is None:
+            return self.__item.getCategory()
         return self.__category[:]
 
 
     def categoryString(self):
+        if self.__category is None:
+            return self.__item.categoryString()
         return u'_'.join(self.__category)
 
 
@@ -155,6 +180,8 @@ class tagObject(object):
 
 
     def replaceCategory(self,oldCategory, newCategory):
+        if self.__category is None:
+            self.__category = self.__item.getCategory()
         for index, item in enumerate(self.__category):
             if item == oldCategory.lower().strip():
                 try:
@@ -174,6 +201,16 @@ class tagObject(object):
         """return the span within the associated text for this object"""
         return self.__spanStart,self.__spanEnd
 
+    def setDocumentSpan(self, span):
+        """set the span of the tag in the original document text"""
+        self.__docSpan = tuple(span)
+
+
+    def getDocumentSpan(self):
+        """return the span of the tag in the original document text, or None if not known"""
+        return self.__docSpan
+
+
     def setPhrase(self, phrase):
         """set the actual matched phrase used to generate this object"""
         self.__foundPhrase = phrase
@@ -186,11 +223,13 @@ class tagObject(object):
 
     def setMatchedGroupDictionary(self, mdict):
         """set the foundDict variable to mdict. This gets the name/value pair for each NAMED group within the regular expression"""
-        self.__foundDict = mdict.copy()
+        self.__foundDict = mdict.copy() if mdict else None
 
 
     def getMatchedGroupDictionary(self):
         """return a copy of the matched group dictionary"""
+        if self.__foundDict is None:
+            return {}
         return self.__foundDict.copy()
 
 
@@ -209,7 +248,8 @@ class tagObject(object):
     def __ge__(self, other): return self.__spanStart >= other.__spanStart
 
     def __hash__(self):
-        return hash(repr(self))
+        # not consistent with __eq__ (see the class docstring)
+        return hash(self.__tagID)
 
 
     def encompasses(self, other):
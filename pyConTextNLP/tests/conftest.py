@@ -0,0 +1,42 @@
+import os
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+import pytest
+
+KB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "KB")
+
+
+@pytest.fixture(scope="session")
+def lexicon():
+    modifiers = itemData.get_item_data(os.path.join(KB, "pneumonia_modifiers.tsv"))
+    targets = itemData.get_item_data(os.path.join(KB, "pneumonia_targets.yml"))
+    return modifiers, targets
+
+
+@pytest.fixture(scope="module")
+def sentences():
+    return ['IMPRESSION: NO GROSS EVIDENCE OF PNEUMONIA.',
+            'There is no evidence of pneumonia, although an infiltrate cannot totally be excluded.',
+            'Nothing to mark here.',
+            'Patchy opacities in the right lower lobe may represent atelectasis or pneumonia.',
+            'History of pneumonia, now resolved.']
+
+
+@pytest.fixture(scope="session")
+def mark_sentence(lexicon):
+    """return a function marking up a sentence with the lexicon, through the pipeline of markup_sentence"""
+    modifiers, targets = lexicon
+
+    def mark(sentence, markupClass=ConTextMarkup, tagIdAllocator=None):
+        markup = markupClass(tagIdAllocator=tagIdAllocator)
+        markup.setRawText(sentence)
+        markup.cleanText()
+        markup.markItems(targets, mode="target")
+        markup.markItems(modifiers, mode="modifier")
+        markup.pruneMarks()
+        markup.dropMarks('Exclusion')
+        markup.applyModifiers()
+        markup.pruneSelfModifyingRelationships()
+        markup.dropInactiveModifiers()
+        return markup
+    return mark
@@ -0,0 +1,83 @@
+import io
+import pickle
+from pyConTextNLP.ConTextMarkup import get_markup_class
+from pyConTextNLP.io import binary
+from pyConTextNLP.pyConText import ConTextDocument
+import pytest
+
+
+@pytest.fixture(scope="module")
+def sentences(sentences):
+    return ['IMPRESSION: NO GROSS EVIDENCE OF  PNEUMONIA.'] + sentences[2:]
+
+
+def _document(sentences, mark_sentence, backend):
+    context = ConTextDocument(markupBackend=backend)
+    context.setRawText(" ".join(sentences))
+    offset = 0
+    for i, sentence in enumerate(sentences):
+        if i == 2:
+            context.insertSection("findings", setToParent=True)
+        markup = mark_sentence(sentence, get_markup_class(backend), context.getTagIdAllocator())
+        markup.setDocumentOffset(offset)
+        offset += len(sentence) + 1
+        context.addMarkup(markup)
+    return context
+
+
+def _state(markup):
+    return (type(markup), dict(markup.graph),
+            [(n.getTagID(), n.getLiteral(), n.getCategory(), n.getConTextCategory(), n.getSpan(),
+              n.getDocumentSpan(), n.getPhrase(), n.getScope(), d) for n, d in markup.nodes(data=True)],
+            [(u.getTagID(), v.getTagID(), d) for u, v, d in markup.edges(data=True)])
+
+
+@pytest.mark.parametrize("backend", ["networkx", "lite"])
+def test_document_round_trip(mark_sentence, sentences, backend):
+    context = _document(sentences, mark_sentence, backend)
+    loaded = binary.loads(binary.dumps(context))
+    assert isinstance(loaded, ConTextDocument)
+    assert loaded.getRawText() == context.getRawText()
+    assert loaded.getCurrentparent() == "findings"
+    assert loaded.getDocumentSections() == context.getDocumentSections()
+    assert [_state(m) for m in loaded.getDocumentMarkups()] == \
+           [_state(m) for m in context.getDocumentMarkups()]
+    assert [s[0] for s in loaded.getSectionMarkups("findings")] == [2, 3]
+    assert loaded.getXML() == context.getXML()
+    # the tag ids of new markups follow on from the loaded ones
+    assert loaded.getTagIdAllocator()() == context.getTagIdAllocator()()
+    for markup in loaded.getDocumentMarkups():
+        assert markup.getTagIdAllocator() is loaded.getTagIdAllocator()
+
+
+def test_markup_round_trip(mark_sentence, sentences):
+    markup = _document(sentences, mark_sentence, "networkx").getDocumentMarkups()[0]
+    items = {}
+    first = binary.loads_markup(binary.dumps_markup(markup), items=items)
+    second = binary.loads(binary.dumps_markup(markup), items=items)
+    assert _state(first) == _state(markup) == _state(second)
+    assert [first.getRawSpan(n.getSpan()) for n in first.nodes()] == \
+           [markup.getRawSpan(n.getSpan()) for n in markup.nodes()]
+    # identical contextItems are shared between loaded markups
+    assert [n.getItem() for n in first.nodes()] == [n.getItem() for n in second.nodes()]
+    assert all(a.getItem() is b.getItem() for a, b in zip(first.nodes(), second.nodes()))
+
+
+def test_corpus_round_trip(mark_sentence, sentences, tmp_path):
+    docs = [("doc{0}".format(i), _document(sentences[i:], mark_sentence, "lite")) for i in range(3)]
+    path = str(tmp_path / "corpus.markup")
+    assert binary.write_corpus(path, docs) == 3
+    loaded = list(binary.read_corpus(path))
+    assert [name for name, _ in loaded] == ["doc0", "doc1", "doc2"]
+    for (_, doc), (_, other) in zip(docs, loaded):
+        assert other.getXML() == doc.getXML()
+    with open(path, "rb") as f1:
+        assert [name for name, _ in binary.read_corpus(f1, names=["doc2"])] == ["doc2"]
+
+
+def test_loads_rejects_objects():
+    data = binary.MAGIC + bytes([binary.VERSION]) + pickle.dumps(("markup", io.BytesIO()))
+    with pytest.raises(pickle.UnpicklingError):
+        binary.loads(data)
+    with pytest.raises(ValueError):
+        binary.loads(pickle.dumps([]))
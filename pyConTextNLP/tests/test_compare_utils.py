@@ -0,0 +1,150 @@
+import os
+import random
+import compare_utils
+from nlp_pneumonia_utils import Annotation
+import pytest
+
+
+def _annotation(type_name, start_index, end_index):
+    anno = Annotation()
+    anno.type = type_name
+    anno.start_index = start_index
+    anno.end_index = end_index
+    return anno
+
+
+def _random_map(rng, doc_names, types, empty_spans):
+    annotation_map = {}
+    for doc_name in doc_names:
+        grouped_annotations = {}
+        for type_name in types:
+            r = rng.random()
+            if r < 0.2:
+                # the type is missing on this side
+                continue
+            annos = []
+            if r > 0.25:
+                for _ in range(rng.randint(0, 8)):
+                    # few distinct starts, so that duplicate and shared starts are common
+                    start_index = rng.randint(0, 30)
+                    length = rng.randint(0 if empty_spans else 1, 6)
+                    annos.append(_annotation(type_name, start_index, start_index + length))
+            grouped_annotations[type_name] = annos
+        annotation_map[doc_name] = grouped_annotations
+    return annotation_map
+
+
+def _compare_per_doc(annotation_map1, annotation_map2, compare_method):
+    """compare as it was before compare_corpus"""
+    types = set()
+    for grouped_annotations in list(annotation_map1.values()) + list(annotation_map2.values()):
+        types.update(grouped_annotations.keys())
+    evaluators = {}
+    for doc_name, grouped_annotations in annotation_map1.items():
+        if compare_method == 'strict':
+            compare_utils.strict_compare_one_doc(evaluators, doc_name, grouped_annotations,
+                                                 annotation_map2[doc_name], sorted(types))
+        else:
+            compare_utils.relax_compare_one_doc(evaluators, doc_name, grouped_annotations,
+                                                annotation_map2[doc_name], sorted(types))
+    return evaluators
+
+
+def _results(evaluators):
+    return [(type_name, e.get_values(), [(k, [id(a) for a in v]) for k, v in e.get_fps().items()],
+             [(k, [id(a) for a in v]) for k, v in e.get_fns().items()]) for type_name, e in evaluators.items()]
+
+
+@pytest.mark.parametrize("compare_method", ["strict", "relax"])
+def test_compare_corpus_matches_per_doc(compare_method):
+    rng = random.Random(7)
+    for _ in range(500):
+        doc_names = ["doc{0:d}".format(i) for i in rng.sample(range(20), rng.randint(1, 6))]
+        types = rng.sample(["A", "B", "C", "D"], rng.randint(1, 4))
+        # the IntervalTree of relax_compare_one_doc rejects empty spans in the first map
+        annotation_map1 = _random_map(rng, doc_names, types, empty_spans=compare_method == 'strict')
+        annotation_map2 = _random_map(rng, doc_names, types, empty_spans=True)
+        annotation_map2 = {doc_name: annotation_map2[doc_name] for doc_name in rng.sample(doc_names, len(doc_names))}
+        assert _results(compare_utils.compare_corpus(annotation_map1, annotation_map2, compare_method)) == \
+            _results(_compare_per_doc(annotation_map1, annotation_map2, compare_method))
+
+
+def test_compare_corpus_empty_spans():
+    empty1 = _annotation("A", 5, 5)
+    inside1 = _annotation("A", 2, 8)
+    empty2 = _annotation("A", 5, 5)
+    touching2 = _annotation("A", 8, 10)
+    evaluator = compare_utils.compare_corpus({"doc": {"A": [empty1, inside1]}},
+                                             {"doc": {"A": [empty2, touching2]}}, 'relax')["A"]
+    # empty spans overlap nothing, and spans that only touch do not overlap
+    assert evaluator.get_values() == (0, 2, 2, None)
+    assert evaluator.get_fps() == {"doc": [empty1, inside1]}
+    assert evaluator.get_fns() == {"doc": [empty2, touching2]}
+    evaluator = compare_utils.compare_corpus({"doc": {"A": [empty1, inside1]}},
+                                             {"doc": {"A": [empty2, touching2]}}, 'strict')["A"]
+    assert evaluator.get_values() == (1, 1, 1, None)
+
+
+def _spans(grouped_annotations):
+    return {type_name: [(a.start_index, a.end_index, a.spanned_text) for a in annos]
+            for type_name, annos in grouped_annotations.items()}
+
+
+@pytest.fixture
+def project(tmp_path):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "doc1.txt").write_bytes(b"no pneumonia.\r\nright lower lobe opacity\r\n")
+    (project_dir / "doc1.ann").write_bytes(b"T1\tEVIDENCE_OF_PNEUMONIA 3 12\tpneumonia\r\n"
+                                           b"T2\tEVIDENCE_OF_PNEUMONIA 15 25;32 39\tright lower opacity\r\n"
+                                           b"A1\tNegated T1\r\n"
+                                           b"R1\tModifies Arg1:T1 Arg2:T2\r\n")
+    (project_dir / "doc2.txt").write_text("nothing here")
+    return str(project_dir)
+
+
+def test_group_brat_annotations_discontinuous():
+    annotations = compare_utils.group_brat_annotations(["T1\tEVIDENCE 10 15;20 28\tright lung\n",
+                                                        "T2\tEVIDENCE 3 5\tno\n",
+                                                        "#1\tAnnotatorNotes T1\tcheck\n",
+                                                        "E1\tFinding:T1\n"])
+    assert _spans(annotations) == {"EVIDENCE": [(10, 28, "right lung\n"), (3, 5, "no\n")]}
+
+
+def test_load_brat_project(project):
+    doc_map, annotation_map = compare_utils.load_brat_project(project)
+    assert sorted(os.listdir(project)) == ["doc1.ann", "doc1.txt", "doc2.txt"]
+    # line endings are kept: the offsets count them
+    assert doc_map == {"doc1": "no pneumonia.\r\nright lower lobe opacity\r\n", "doc2": "nothing here"}
+    assert doc_map["doc1"][15:25] == "right lowe" and doc_map["doc1"][3:12] == "pneumonia"
+    assert {name: _spans(grouped) for name, grouped in annotation_map.items()} == \
+        {"doc1": {"EVIDENCE_OF_PNEUMONIA": [(3, 12, "pneumonia\r\n"), (15, 39, "right lower opacity\r\n")]}}
+    assert (doc_map, {name: _spans(grouped) for name, grouped in annotation_map.items()}) == \
+        (dict((b, t) for b, t, _ in compare_utils.iter_project_docs(project) if t is not None),
+         {b: _spans(a) for b, _, a in compare_utils.iter_project_docs(project) if a is not None})
+
+
+def test_load_brat_project_cache(project, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    os.mkdir(cache_dir)
+    expected = compare_utils.load_brat_project(project)
+    for _ in range(2):
+        doc_map, annotation_map = compare_utils.load_brat_project(project, cache_dir=cache_dir)
+        assert doc_map == expected[0]
+        assert {name: _spans(g) for name, g in annotation_map.items()} == \
+            {name: _spans(g) for name, g in expected[1].items()}
+    assert len(os.listdir(cache_dir)) == 1
+    assert sorted(os.listdir(project)) == ["doc1.ann", "doc1.txt", "doc2.txt"]
+
+    # a file with the same size and modification time is taken from the cache
+    path = os.path.join(project, "doc2.txt")
+    stat = os.stat(path)
+    with open(path, "w") as f1:
+        f1.write("NOTHING HERE")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert compare_utils.load_brat_project(project, cache_dir=cache_dir)[0]["doc2"] == "nothing here"
+    # and parsed again once its modification time changes
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert compare_utils.load_brat_project(project, cache_dir=cache_dir)[0]["doc2"] == "NOTHING HERE"
+    os.remove(os.path.join(project, "doc1.ann"))
+    assert compare_utils.load_brat_project(project, cache_dir=cache_dir)[1] == {}
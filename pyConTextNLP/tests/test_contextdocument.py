@@ -0,0 +1,120 @@
+import networkx as nx
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.pyConText import ConTextDocument
+import pytest
+
+def _union_graph(markups):
+    graph = ConTextMarkup()
+    for m in markups:
+        graph = nx.union(m, graph)
+    return graph
+
+
+def _state(graph):
+    return (sorted((n.getTagID(), sorted(d.items())) for n, d in graph.nodes(data=True)),
+            sorted((u.getTagID(), v.getTagID()) for u, v in graph.edges()))
+
+
+def test_document_graph_same_as_union(mark_sentence, sentences):
+    context = ConTextDocument()
+    markups = []
+    for sentence in sentences:
+        markups.append(mark_sentence(sentence, tagIdAllocator=context.getTagIdAllocator()))
+        context.addMarkup(markups[-1])
+    graph = context.getDocumentGraph()
+    assert _state(graph) == _state(_union_graph(markups))
+    assert [id(n) for n in graph.nodes()] == [id(n) for m in markups for n in m.nodes()]
+    assert graph.graph == _union_graph(markups).graph
+
+
+def test_document_graph_extended_by_addMarkup(mark_sentence, sentences):
+    context = ConTextDocument()
+    markups = [mark_sentence(sentences[0], tagIdAllocator=context.getTagIdAllocator())]
+    context.addMarkup(markups[0])
+    graph = context.getDocumentGraph()
+    for sentence in sentences[1:]:
+        markups.append(mark_sentence(sentence, tagIdAllocator=context.getTagIdAllocator()))
+        context.addMarkup(markups[-1])
+    assert context.getDocumentGraph() is graph
+    assert _state(graph) == _state(_union_graph(markups))
+
+
+def test_empty_document_graph_computed_once():
+    context = ConTextDocument()
+    graph = context.getDocumentGraph()
+    assert len(graph) == 0
+    assert context.getDocumentGraph() is graph
+
+
+def _scan_section_markups(context, sectionLabel):
+    """the edge scan getSectionMarkups used before the section index"""
+    successors = [(e[2]['sentenceNumber'], e[1]) for e in context.getDocument().out_edges(sectionLabel, data=True)
+                  if e[2].get("category") == "markup"]
+    successors.sort(key=lambda s: s[0])
+    return successors
+
+
+@pytest.fixture
+def sectioned(mark_sentence, sentences):
+    context = ConTextDocument()
+    context.addMarkup(mark_sentence(sentences[0], tagIdAllocator=context.getTagIdAllocator()))
+    context.insertSection("findings", setToParent=True)
+    for sentence in sentences[1:3]:
+        context.addMarkup(mark_sentence(sentence, tagIdAllocator=context.getTagIdAllocator()))
+    context.setParent("document")
+    context.insertSection("impression", setToParent=True)
+    for sentence in sentences[3:]:
+        context.addMarkup(mark_sentence(sentence, tagIdAllocator=context.getTagIdAllocator()))
+    context.setParent("findings")
+    context.addMarkup(mark_sentence(sentences[0], tagIdAllocator=context.getTagIdAllocator()))
+    return context
+
+
+def test_section_index(sectioned):
+    context = sectioned
+    assert context.getDocumentSections() == ["document", ("findings", "impression")]
+    for label in ["document", "findings", "impression", ("findings", "impression")]:
+        assert context.getSectionMarkups(label) == _scan_section_markups(context, label)
+    assert context.getSectionMarkups() == _scan_section_markups(context, "findings")
+    assert context.getSectionMarkups("impression", returnSentenceNumbers=False) == \
+           tuple(m for _, m in _scan_section_markups(context, "impression"))
+    assert context.getSectionMarkups("missing") == []
+
+
+def test_sentence_index(sectioned):
+    context = sectioned
+    markups = [m for _, m in sorted(_scan_section_markups(context, ("document", "findings", "impression")),
+                                    key=lambda s: s[0])]
+    assert context.getDocumentMarkups() == markups
+    assert [context.retrieveMarkup(i)[1] for i in range(len(markups))] == markups
+    assert context.retrieveMarkup(3)[0] == "impression"
+    assert context.retrieveMarkup(3)[2] == {"category": "markup", "sentenceNumber": 3}
+    assert context.retrieveMarkup(len(markups)) is None
+
+
+def test_readded_markup(mark_sentence, sentences):
+    context = ConTextDocument()
+    markup = mark_sentence(sentences[0], tagIdAllocator=context.getTagIdAllocator())
+    context.addMarkup(markup)
+    context.addMarkup(mark_sentence(sentences[1], tagIdAllocator=context.getTagIdAllocator()))
+    context.addMarkup(markup)
+    assert context.retrieveMarkup(0) is None
+    assert context.retrieveMarkup(2)[1] is markup
+    assert context.getSectionMarkups() == _scan_section_markups(context, "document")
+
+
+def test_writeXML(sectioned, mark_sentence, tmp_path):
+    context = sectioned
+    context.addMarkup(mark_sentence("Fever & cough < 3 days.", tagIdAllocator=context.getTagIdAllocator()))
+    path = tmp_path / "document.xml"
+    with open(str(path), "w") as f1:
+        context.writeXML(f1)
+    xml = path.read_text()
+    assert xml == context.getXML()
+    assert xml.startswith("\n<ConTextDocument>\n")
+    assert xml.endswith("</section>\n\n</ConTextDocument>\n")
+    assert "Fever &amp; cough &lt; 3 days. " in xml
+    offset = sum(len(m.getText()) + 1 for m in context.getSectionMarkups("document", False))
+    assert "<sentenceNumber> 1 </sentenceNumber>\n<sentenceOffset> {0:d} </sentenceOffset>".format(offset) in xml
+    markup = context.getDocumentMarkups()[-1]
+    assert markup.getXML() in xml
@@ -1,3 +1,6 @@
+import random
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.tagObject import tagObject
 from pyConTextNLP.ConTextMarkup import ConTextMarkup
 import pytest
 
@@ -43,3 +46,133 @@ def test_scrub_text(sent2):
     context.setRawText(sent2)
     context.cleanText(stripNonAlphaNumeric=True)
     assert context.getText().rfind(u'.') == -1
+
+def test_cleanText_offsets():
+    txt = "No  gross\n\tevidence of 12 pulmonary\n   embolism ."
+    context = ConTextMarkup()
+    context.setRawText(txt)
+    context.cleanText(stripNonAlphaNumeric=True, stripNumod_byers=True)
+    clean = context.getText()
+    assert clean == "No gross evidence of  pulmonary embolism "
+    for word in clean.split():
+        start = clean.index(word)
+        rawStart, rawEnd = context.getRawSpan((start, start + len(word)))
+        assert txt[rawStart:rawEnd] == word
+
+def test_tag_document_spans(items):
+    txt = "Scan:  no gross\n   evidence of pulmonary\n  embolus."
+    context = ConTextMarkup()
+    context.setRawText(txt)
+    context.cleanText()
+    context.markItems([itemData.contextItem(i) for i in items], mode="target")
+    spans = sorted(t.getDocumentSpan() for t in context.nodes())
+    assert [txt[s:e] for s, e in spans] == ["no gross\n   evidence of", "pulmonary\n  embolus"]
+    context.setDocumentOffset(100)
+    assert sorted(t.getDocumentSpan() for t in context.nodes()) == [(s + 100, e + 100) for s, e in spans]
+
+def _pairwise_prune(marks):
+    """the pairwise comparison pruneMarks used before the sweep"""
+    marks = sorted(marks, key=lambda m: m[0].getSpan()[0])
+    nodes_to_remove = []
+    for i in range(len(marks)-1):
+        mark1 = marks[i]
+        if mark1[0] not in nodes_to_remove:
+            for j in range(i+1, len(marks)):
+                mark2 = marks[j]
+                if mark1[0].encompasses(mark2[0]) and \
+                   mark1[1]['category'] == mark2[1]['category']:
+                    nodes_to_remove.append(mark2[0])
+                elif mark2[0].encompasses(mark1[0]) and \
+                     mark2[1]['category'] == mark1[1]['category']:
+                    nodes_to_remove.append(mark1[0])
+                    break
+    return set(id(n) for n in nodes_to_remove)
+
+def _random_markup(rng, n, width):
+    item = itemData.contextItem(["pneumonia", "EVIDENCE_OF_PNEUMONIA", "", ""])
+    context = ConTextMarkup()
+    for i in range(n):
+        start = rng.randrange(width)
+        tag = tagObject(item, "target", tagid=i+1)
+        tag.setSpan((start, start + rng.randrange(1, 8)))
+        context.add_node(tag, category=rng.choice(["target", "modifier"]))
+    return context
+
+def test_pruneMarks_same_as_pairwise():
+    rng = random.Random(0)
+    for trial in range(300):
+        context = _random_markup(rng, rng.randrange(2, 40), rng.choice([5, 20, 60]))
+        marks = list(context.nodes(data=True))
+        removed = _pairwise_prune(marks)
+        context.pruneMarks()
+        assert set(id(n) for n in context.nodes()) == \
+               set(id(m[0]) for m in marks if id(m[0]) not in removed)
+
+def test_pruneMarks_keeps_first_identical_span():
+    item = itemData.contextItem(["pneumonia", "EVIDENCE_OF_PNEUMONIA", "", ""])
+    context = ConTextMarkup()
+    tags = [tagObject(item, "target", tagid=i+1) for i in range(3)]
+    for tag in tags:
+        tag.setSpan((4, 13))
+        context.add_node(tag, category="target")
+    context.pruneMarks()
+    assert list(context.nodes()) == tags[:1]
+
+def _pairwise_update_scopes(context):
+    """the pairwise comparison updateScopes used before the sorted-span search"""
+    modifiers = context.getConTextModeNodes("modifier")
+    for modifier in modifiers:
+        modifier.setScope()
+    for i in range(len(modifiers)-1):
+        modifier = modifiers[i]
+        for j in range(i+1, len(modifiers)):
+            modifier2 = modifiers[j]
+            if modifier.limitScope(modifier2) and \
+               modifier2.getRule().lower() == 'terminate':
+                context.add_edge(modifier2, modifier)
+            if modifier2.limitScope(modifier) and \
+               modifier.getRule().lower() == 'terminate':
+                context.add_edge(modifier, modifier2)
+
+def _pairwise_apply_modifiers(context):
+    for target in context.getConTextModeNodes("target"):
+        for modifier in context.getConTextModeNodes("modifier"):
+            if modifier.applyRule(target):
+                context.add_edge(modifier, target)
+
+def _random_modifier_markup(seed):
+    rng = random.Random(seed)
+    width = rng.choice([20, 80, 200])
+    categories = ["definite_negated_existence", "indication", "probable_existence",
+                  "indication, historical", "conj"]
+    rules = ["forward", "backward", "bidirectional", "terminate", "Terminate", ""]
+    context = ConTextMarkup()
+    for i in range(rng.randrange(1, 60)):
+        start = rng.randrange(width)
+        if rng.random() < 0.6:
+            item = itemData.contextItem(["m{0}".format(i), rng.choice(categories), "",
+                                         rng.choice(rules)])
+            mode = "modifier"
+        else:
+            item = itemData.contextItem(["t{0}".format(i), "pneumonia", "", ""])
+            mode = "target"
+        tag = tagObject(item, mode, scope=(0, width), tagid=i+1)
+        tag.setSpan((start, start + rng.randrange(1, 10)))
+        if rng.random() < 0.1:
+            tag.replaceCategory(tag.getCategory()[0], rng.choice(categories))
+        context.add_node(tag, category=mode)
+    return context
+
+def _graph_state(context):
+    return ([(n.getTagID(), list(n.getScope())) for n in context.nodes()],
+            [(u.getTagID(), v.getTagID()) for u, v in context.edges()],
+            [[p.getTagID() for p in context.predecessors(n)] for n in context.nodes()])
+
+def test_updateScopes_applyModifiers_same_as_pairwise():
+    for seed in range(300):
+        c1 = _random_modifier_markup(seed)
+        _pairwise_update_scopes(c1)
+        _pairwise_apply_modifiers(c1)
+        c2 = _random_modifier_markup(seed)
+        c2.applyModifiers()
+        assert _graph_state(c1) == _graph_state(c2)
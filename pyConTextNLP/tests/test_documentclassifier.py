@@ -0,0 +1,139 @@
+import os
+import shutil
+from DocumentClassifier import DocumentClassifier, FeatureInferencer, read_csv_rules
+from nlp_pneumonia_utils import iter_zip_documents
+from pyConTextNLP.utils import get_document_markups
+from visual import convertMarkups2Columns
+import pytest
+
+KB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "KB")
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+
+
+class CrashingText(str):
+    """a document text that kills the worker process it is sent to"""
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return DocumentClassifier(os.path.join(KB, "pneumonia_targets.yml"), os.path.join(KB, "pneumonia_modifiers.yml"),
+                              os.path.join(KB, "featurer_inferences.csv"), os.path.join(KB, "doc_inferences.csv"),
+                              expected_values=["PNEUMONIA_DOC_YES"])
+
+
+@pytest.fixture(scope="module")
+def docs():
+    texts = ["IMPRESSION: NO GROSS EVIDENCE OF PNEUMONIA.",
+             "Patchy opacities in the right lower lobe may represent atelectasis or pneumonia.",
+             "Nothing to mark here.",
+             "Findings consistent with pneumonia."]
+    return [("doc{0:d}".format(i), texts[i % len(texts)]) for i in range(24)]
+
+
+def test_predict_batch_isolates_crashing_worker(classifier, docs):
+    expected = [(doc_name, classifier.predict(text, doc_name), None) for doc_name, text in docs]
+    crashing = list(docs)
+    crashing[9] = ("doc9", CrashingText(docs[9][1]))
+    results = list(classifier.predict_batch(crashing, workers=2, chunksize=4))
+    assert [r[0] for r in results] == [doc_name for doc_name, _ in docs]
+    assert results[9][1] is None and "BrokenProcessPool" in results[9][2]
+    assert results[:9] + results[10:] == expected[:9] + expected[10:]
+
+
+def _legacy_feature_conclusions(rules, annotations, relations):
+    """FeatureInferencer.process before the rules were compiled"""
+    match_checker = dict()
+    inference_map = dict()
+    for rule_id, rule in enumerate(rules):
+        match_checker.setdefault(rule[1], dict())[rule_id] = set(rule[2:])
+        inference_map.setdefault(rule[1], dict())[rule_id] = rule[0]
+    matched_conclusion_types = []
+    annotation_types = dict()
+    for markup_id, type in zip(annotations['markup_id'], annotations['type']):
+        annotation_types.setdefault(markup_id, type)
+    targets = set(markup_id for markup_id, category in zip(annotations['markup_id'], annotations['vis_category'])
+                  if category == 'Target')
+    sorted_modifiers = dict()
+    for relation_type, modifier_type, target_id in zip(relations['type'], relations['arg1_cate'], relations['arg2_id']):
+        if modifier_type == 'Modifier':
+            sorted_modifiers.setdefault(target_id, set()).add(relation_type)
+    for target_id, modifiers in sorted_modifiers.items():
+        source_type = annotation_types[target_id]
+        # the old engine raised KeyError for a modified target whose type has no rules
+        for rule_id, modifiers_in_rule in match_checker.get(source_type, {}).items():
+            if modifiers_in_rule < modifiers or modifiers_in_rule == modifiers or '' in modifiers_in_rule:
+                matched_conclusion_types.append(inference_map[source_type][rule_id])
+                targets.discard(target_id)
+    for source_type, matcher in match_checker.items():
+        for rule_id, condition_values in matcher.items():
+            if len(condition_values) == 0 or '' in condition_values:
+                for markup_id, type in zip(annotations['markup_id'], annotations['type']):
+                    if type == source_type:
+                        matched_conclusion_types.append(inference_map[source_type][rule_id])
+                        targets.discard(markup_id)
+    for target_id in targets:
+        matched_conclusion_types.append(annotation_types[target_id])
+    return matched_conclusion_types
+
+
+def _legacy_document_conclusion(rules, matched_conclusion_types):
+    """DocumentInferencer.process before the rules were compiled"""
+    if len(rules) == 1:
+        return rules[0][0]
+    for rule in rules:
+        if set(rule[1:]).issubset(matched_conclusion_types):
+            return rule[0]
+    return 'NEG_DOC'
+
+
+@pytest.fixture(scope="module")
+def marked_up_docs(classifier):
+    docs = []
+    for archive in ("training_v2.zip", "test_v2.zip"):
+        for doc_name, anno_doc in iter_zip_documents(os.path.join(DATA, archive)):
+            classifier.classify_doc(anno_doc.text, doc_name)
+            markups = get_document_markups(classifier.saved_markups_map[doc_name]) \
+                if doc_name in classifier.saved_markups_map else []
+            docs.append((doc_name, anno_doc.text, markups))
+    return docs
+
+
+@pytest.mark.parametrize("negation_rules", [False, True])
+def test_compiled_rules_match_legacy_engine(classifier, marked_up_docs, negation_rules, tmp_path):
+    feature_rule_file = os.path.join(KB, "featurer_inferences.csv")
+    if negation_rules:
+        # the example rules commented out in the rule file, which conclude from modifier values
+        with open(feature_rule_file) as f1:
+            feature_rules = f1.read().replace("#NEG_EVIDENCE", "NEG_EVIDENCE")
+        feature_rule_file = str(tmp_path / "featurer_inferences.csv")
+        with open(feature_rule_file, "w") as f1:
+            f1.write(feature_rules)
+    feature_inferencer = FeatureInferencer(feature_rule_file)
+    legacy_rules = read_csv_rules(feature_rule_file)
+    document_rules = read_csv_rules(os.path.join(KB, "doc_inferences.csv"))
+    assert len(legacy_rules) == (3 if negation_rules else 1)
+    for doc_name, text, markups in marked_up_docs:
+        annotations, relations, _ = convertMarkups2Columns(markups, doc_txt=text)
+        expected = _legacy_feature_conclusions(legacy_rules, annotations, relations)
+        conclusions = feature_inferencer.process_markups(markups)
+        assert sorted(conclusions) == sorted(expected), doc_name
+        assert sorted(feature_inferencer.process(annotations, relations)) == sorted(expected), doc_name
+        assert classifier.document_inferencer.process(conclusions) == \
+            _legacy_document_conclusion(document_rules, expected), doc_name
+    assert sum(1 for _, _, markups in marked_up_docs if any(m.edges() for m in markups)) > 1
+
+
+@pytest.mark.parametrize("use_artifacts", [False, True])
+def test_lexicon_artifacts_opt_in(docs, use_artifacts, tmp_path):
+    for name in ("pneumonia_targets.yml", "pneumonia_modifiers.yml"):
+        shutil.copy(os.path.join(KB, name), str(tmp_path / name))
+    classifier = DocumentClassifier(str(tmp_path / "pneumonia_targets.yml"), str(tmp_path / "pneumonia_modifiers.yml"),
+                                    os.path.join(KB, "featurer_inferences.csv"), os.path.join(KB, "doc_inferences.csv"),
+                                    expected_values=["PNEUMONIA_DOC_YES"], use_artifacts=use_artifacts)
+    expected = [(doc_name, classifier.predict(text, doc_name), None) for doc_name, text in docs]
+    assert list(classifier.predict_batch(docs, workers=2, chunksize=4)) == expected
+    artifacts = sorted(f for f in os.listdir(str(tmp_path)) if f.endswith(".lexc"))
+    assert artifacts == (["pneumonia_modifiers.yml.lexc", "pneumonia_targets.yml.lexc"] if use_artifacts else [])
@@ -29,3 +29,46 @@ def test_deleteExceptionTermsWithoutCaseVariants(splitter):
     splitter.deleteExceptionTerms("M.D.")
     assert ("M.D." not in splitter.getExceptionTerms())
     assert ("m.d." in splitter.getExceptionTerms())
+
+
+@pytest.fixture(scope="module")
+def report():
+    return ("IMPRESSION: 1. LIMITED STUDY. 2. No pneumonia.\n"
+            "FINDINGS:  Seen by Dr. Smith, pt. on abx b.i.d. for approx.\n"
+            "two days. Temp 98.6. BP 120/80.\n\n"
+            "HISTORY:\n- Cough\n2) Fever\n________\n"
+            "Is there effusion? No")
+
+
+def test_clinicalSentenceSplitter(report):
+    assert helpers.clinicalSentenceSplitter().splitSentences(report) == [
+        "IMPRESSION: 1. LIMITED STUDY.",
+        "2. No pneumonia.",
+        "FINDINGS:  Seen by Dr. Smith, pt. on abx b.i.d. for approx.\ntwo days.",
+        "Temp 98.6.",
+        "BP 120/80.",
+        "HISTORY:",
+        "- Cough",
+        "2) Fever",
+        "Is there effusion?",
+        "No"]
+
+
+def test_spanSentences_offsets(report):
+    for splitter in (helpers.clinicalSentenceSplitter(), helpers.sentenceSplitter()):
+        spans = splitter.spanSentences(report)
+        assert spans == sorted(spans)
+        for start, end in spans:
+            assert report[start:end] == report[start:end].strip()
+    spans = helpers.sentenceSplitter().spanSentences(report)
+    assert [" ".join(report[start:end].split()) for start, end in spans] == \
+        helpers.sentenceSplitter().splitSentences(report)
+
+
+def test_get_sentence_splitter():
+    assert isinstance(helpers.get_sentence_splitter(), helpers.clinicalSentenceSplitter)
+    assert isinstance(helpers.get_sentence_splitter("textblob"), helpers.textBlobSentenceSplitter)
+    splitter = helpers.sentenceSplitter()
+    assert helpers.get_sentence_splitter(splitter) is splitter
+    with pytest.raises(ValueError):
+        helpers.get_sentence_splitter("punkt")
@@ -0,0 +1,53 @@
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.display.html import mark_text
+from pyConTextNLP.tagObject import tagObject
+import pytest
+
+
+def _tag(span, category):
+    tag = tagObject(itemData.contextItem([category, category, "", ""]), "target", tagid=span[0])
+    tag.setSpan(span)
+    return tag
+
+
+def _mark_recursively(txt, nodes, colors, default_color):
+    """mark_text before it was made iterative, for non-overlapping spans"""
+    if not nodes:
+        return txt
+    n = nodes.pop(-1)
+    s = n.getSpan()
+    txt = txt[:s[0]] + '<span style="color: {0};">'.format(colors.get(n.getCategory()[0], default_color)) + \
+        txt[s[0]:s[1]] + '</span>' + txt[s[1]:]
+    return _mark_recursively(txt, nodes, colors, default_color)
+
+
+@pytest.fixture
+def colors():
+    return {"pneumonia": "red", "negation": "green"}
+
+
+def test_mark_text_non_overlapping(colors):
+    txt = "no evidence of pneumonia or effusion."
+    tags = [_tag((15, 24), "pneumonia"), _tag((0, 14), "negation"), _tag((28, 36), "effusion")]
+    expected = _mark_recursively(txt, sorted(tags, key=lambda t: t.getSpan()), colors, "black")
+    assert mark_text(txt, tags, colors=colors) == expected
+    assert mark_text(txt, []) == txt
+    # the default color is used for every node, not only the last one
+    assert mark_text(txt, tags, colors=colors, default_color="blue").count("color: blue;") == 1
+    assert mark_text(txt, tags, colors={}, default_color="blue").count("color: blue;") == 3
+
+
+def test_mark_text_overlapping(colors):
+    txt = "right lower lobe pneumonia"
+    tags = [_tag((6, 26), "pneumonia"), _tag((0, 16), "negation"), _tag((6, 11), "effusion")]
+    assert mark_text(txt, tags, colors=colors) == \
+        '<span style="color: green;">right lower lobe</span>' \
+        '<span style="color: red;"> pneumonia</span>'
+    assert mark_text(txt, tags[::-1], colors=colors) == mark_text(txt, tags, colors=colors)
+
+
+def test_mark_text_many_marks(colors):
+    txt = "pneumonia " * 5000
+    tags = [_tag((10 * i, 10 * i + 9), "pneumonia") for i in range(5000)]
+    marked = mark_text(txt, tags, colors=colors, span_template="<b {0}>")
+    assert marked == "<b red>pneumonia</span> " * 5000
@@ -0,0 +1,85 @@
+import os
+import pickle
+import shutil
+import pyConTextNLP.itemData as itemData
+import pytest
+
+KB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "KB")
+
+
+def _describe(items):
+    return [(i.getLiteral(), i.getCategory(), i.getRE(), i.getRule()) for i in items]
+
+
+@pytest.fixture(params=["pneumonia_modifiers.tsv", "pneumonia_targets.yml"])
+def lexicon_file(request, tmp_path):
+    fname = str(tmp_path / request.param)
+    shutil.copy(os.path.join(KB, request.param), fname)
+    return fname
+
+
+def test_compile_and_load(lexicon_file):
+    compiled = itemData.compile_item_data(lexicon_file)
+    assert os.path.exists(lexicon_file + itemData.LEXICON_ARTIFACT_SUFFIX)
+    loaded = itemData.load_item_data(lexicon_file)
+    assert _describe(loaded) == _describe(compiled) == _describe(itemData.get_item_data(lexicon_file))
+
+
+def test_load_creates_artifact(lexicon_file):
+    items = itemData.get_item_data(lexicon_file, use_artifact=True)
+    assert os.path.exists(lexicon_file + itemData.LEXICON_ARTIFACT_SUFFIX)
+    assert _describe(items) == _describe(itemData.get_item_data(lexicon_file))
+
+
+def test_artifact_invalidated_on_change(lexicon_file):
+    itemData.compile_item_data(lexicon_file)
+    if lexicon_file.endswith(".yml"):
+        extra = "---\nComments: ''\nDirection: ''\nLex: consolidation\nRegex: ''\nType: EVIDENCE_OF_PNEUMONIA\n"
+    else:
+        extra = "consolidation\tEVIDENCE_OF_PNEUMONIA\t\t\n"
+    with open(lexicon_file, "a") as f0:
+        f0.write(extra)
+    items = itemData.load_item_data(lexicon_file)
+    assert "consolidation" in [i.getLiteral() for i in items]
+
+
+def test_artifact_not_writable(lexicon_file, tmp_path, monkeypatch):
+    expected = _describe(itemData.get_item_data(lexicon_file))
+    missing_dir = str(tmp_path / "missing" / "lexicon.lexc")
+    assert _describe(itemData.load_item_data(lexicon_file, artifact=missing_dir)) == expected
+
+    def replace(src, dst):
+        raise PermissionError(dst)
+    monkeypatch.setattr(itemData.os, "replace", replace)
+    assert _describe(itemData.load_item_data(lexicon_file)) == expected
+    assert [f for f in os.listdir(os.path.dirname(lexicon_file)) if f.endswith(".tmp")] == []
+
+
+@pytest.mark.parametrize("content", [[], {"version": itemData.LEXICON_ARTIFACT_VERSION}, {"items": None}])
+def test_malformed_artifact_rebuilt(lexicon_file, content):
+    with open(lexicon_file + itemData.LEXICON_ARTIFACT_SUFFIX, "wb") as f0:
+        pickle.dump(content, f0)
+    items = itemData.load_item_data(lexicon_file)
+    assert _describe(items) == _describe(itemData.get_item_data(lexicon_file))
+    assert _describe(itemData.load_item_data(lexicon_file)) == _describe(items)
+
+
+class _Payload(object):
+    """a pickled global that records that it was called"""
+
+    def __reduce__(self):
+        return os.mkdir, (self.marker,)
+
+
+def test_artifact_with_global_rebuilt(lexicon_file, tmp_path):
+    payload = _Payload()
+    payload.marker = str(tmp_path / "unpickled")
+    content = {"version": itemData.LEXICON_ARTIFACT_VERSION,
+               "source_hash": itemData.hash_lexicon_file(lexicon_file), "items": [payload]}
+    with open(lexicon_file + itemData.LEXICON_ARTIFACT_SUFFIX, "wb") as f0:
+        pickle.dump(content, f0)
+    items = itemData.load_item_data(lexicon_file)
+    assert not os.path.exists(payload.marker)
+    assert _describe(items) == _describe(itemData.get_item_data(lexicon_file))
+    with open(lexicon_file + itemData.LEXICON_ARTIFACT_SUFFIX, "rb") as f0:
+        assert b"mkdir" not in f0.read()
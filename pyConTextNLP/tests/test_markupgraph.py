@@ -0,0 +1,65 @@
+import pickle
+import networkx as nx
+from pyConTextNLP.ConTextMarkup import ConTextMarkup, LiteConTextMarkup, get_markup_class
+from pyConTextNLP.markupGraph import markupGraph
+from pyConTextNLP.tagIdAllocator import counterTagIdAllocator
+import pytest
+
+
+@pytest.fixture(scope="module")
+def sentences(sentences):
+    return ['IMPRESSION: NO GROSS EVIDENCE OF PNEUMONIA OR PULMONARY EMBOLISM.'] + sentences[1:]
+
+
+def test_lite_markup_same_as_networkx(mark_sentence, sentences):
+    for sentence in sentences:
+        m1 = mark_sentence(sentence, ConTextMarkup, counterTagIdAllocator())
+        m2 = mark_sentence(sentence, LiteConTextMarkup, counterTagIdAllocator())
+        assert m1.getXML() == m2.getXML()
+        assert [n.getTagID() for n in m1.nodes()] == [n.getTagID() for n in m2.nodes()]
+        assert [(u.getTagID(), v.getTagID()) for u, v in m1.edges()] == \
+               [(u.getTagID(), v.getTagID()) for u, v in m2.edges()]
+        for n in m2.nodes():
+            assert m2.nodes[n]['category'] == m1.nodes[n]['category']
+            assert m2.predecessors(n) == list(m1.predecessors(n))
+            assert m2.successors(n) == list(m1.successors(n))
+
+
+def test_lite_markup_pickle_and_union(mark_sentence, sentences):
+    m = mark_sentence(sentences[0], LiteConTextMarkup, counterTagIdAllocator())
+    m2 = pickle.loads(pickle.dumps(m))
+    assert m2.getXML() == m.getXML()
+    g = nx.union(m, LiteConTextMarkup())
+    assert isinstance(g, LiteConTextMarkup)
+    assert g.number_of_edges() == m.number_of_edges()
+
+
+def test_markupgraph_category_index():
+    g = markupGraph()
+    g.add_nodes_from(["a", "b"], category="target")
+    g.add_node("c", category="modifier")
+    g.add_edge("c", "a")
+    assert g.getCategoryNodes("target") == ["a", "b"]
+    g.add_node("a", category="modifier")
+    assert g.getCategoryNodes("target") == ["b"]
+    assert g.getCategoryNodes("modifier") == ["a", "c"]
+    g.remove_node("c")
+    assert g.edges() == []
+    assert g.degree("a") == 0
+    assert g.getCategoryNodes("modifier") == ["a"]
+
+
+def test_markupgraph_to_digraph():
+    g = markupGraph(name="test")
+    g.add_edge("m", "t", category="modifies")
+    d = g.toDiGraph()
+    assert list(d.edges(data=True)) == g.edges(data=True)
+    assert d.graph["name"] == "test"
+
+
+def test_get_markup_class():
+    assert get_markup_class() is ConTextMarkup
+    assert get_markup_class("lite") is LiteConTextMarkup
+    assert get_markup_class(LiteConTextMarkup) is LiteConTextMarkup
+    with pytest.raises(ValueError):
+        get_markup_class("igraph")
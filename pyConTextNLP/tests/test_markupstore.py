@@ -0,0 +1,64 @@
+import os
+import pickle
+from pyConTextNLP.markupStore import lruMarkupStore
+import pytest
+
+
+@pytest.fixture
+def docs():
+    return [("doc{0}".format(i), ["sentence {0}".format(i)] * (i + 1)) for i in range(6)]
+
+
+def test_lruMarkupStore_drops_least_recently_used(docs):
+    store = lruMarkupStore(maxDocs=3)
+    for name, doc in docs[:3]:
+        store[name] = doc
+    assert store["doc0"] == docs[0][1]
+    store["doc3"] = docs[3][1]
+    assert list(store) == ["doc0", "doc2", "doc3"]
+    assert "doc1" not in store
+
+
+def test_lruMarkupStore_spills_and_reloads(docs, tmp_path):
+    store = lruMarkupStore(maxDocs=2, spillDir=str(tmp_path))
+    for name, doc in docs:
+        store[name] = doc
+    assert len(store) == len(docs)
+    assert store.getStats()["in_memory"] == 2
+    assert len(os.listdir(str(tmp_path))) == 4
+    assert not store.inMemory("doc0")
+    assert store["doc0"] == docs[0][1]
+    assert store.inMemory("doc0")
+    assert store.getStats()["in_memory"] == 2
+    assert dict(store.items()) == dict(docs)
+    assert len(os.listdir(str(tmp_path))) == 6
+    # reloaded documents keep their file, they are not written again
+    assert dict(store.items()) == dict(docs)
+    assert len(os.listdir(str(tmp_path))) == 6
+    store.clear()
+    assert len(store) == 0
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_lruMarkupStore_byte_bound(docs, tmp_path):
+    store = lruMarkupStore(maxBytes=200, spillDir=str(tmp_path))
+    for name, doc in docs:
+        store[name] = doc
+        assert store.getStats()["bytes"] <= 200 or store.getStats()["in_memory"] == 1
+    del store["doc5"]
+    assert "doc5" not in store
+    assert [store[name] for name, _ in docs[:5]] == [doc for _, doc in docs[:5]]
+
+
+def test_lruMarkupStore_serializes_once(docs, tmp_path):
+    dumped = []
+
+    def dumps(doc):
+        dumped.append(doc)
+        return pickle.dumps(doc)
+    store = lruMarkupStore(maxBytes=200, spillDir=str(tmp_path), dumps=dumps)
+    for name, doc in docs:
+        store[name] = doc
+    assert store.getStats()["spilled"] > 0
+    assert dumped == [doc for _, doc in docs]
+    assert dict(store.items()) == dict(docs)
@@ -0,0 +1,59 @@
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.matcher import itemMatcher
+import pytest
+
+
+@pytest.fixture(scope="module")
+def items(lexicon):
+    modifiers, targets = lexicon
+    items = itemData.itemData(*modifiers)
+    items.extend(targets)
+    items.extend([["pulmonary embolism", "PULMONARY_EMBOLISM",
+                   r"""pulmonary\s(artery )?(?P<kind>embol[a-z]+)""", ""],
+                  ["no gross evidence of", "PROBABLE_NEGATED_EXISTENCE", "", "forward"],
+                  ["r/o", "INDICATION", "", "forward"]])
+    return items
+
+
+@pytest.fixture(scope="module")
+def sentences(sentences):
+    return sentences + [
+        'IMPRESSION: 1. LIMITED STUDY DEMONSTRATING NO GROSS EVIDENCE OF SIGNIFICANT PULMONARY EMBOLISM.',
+        'R/O pneumonia.',
+        'kanso utesl\xf6t eller diabetes men inte s\xe4kert, PNEUMONIA.',
+        '']
+
+
+def _marks(context):
+    return [(n.getLiteral(), n.getSpan(), n.getPhrase(), n.getMatchedGroupDictionary())
+            for n in context.nodes()]
+
+
+def test_matcher_same_marks_as_items(items, sentences):
+    matcher = itemMatcher(items)
+    for sentence in sentences:
+        c1 = ConTextMarkup()
+        c1.setRawText(sentence)
+        c1.cleanText()
+        c1.markItems(items, mode="target")
+        c2 = ConTextMarkup()
+        c2.setRawText(sentence)
+        c2.cleanText()
+        c2.markItems(matcher, mode="target")
+        assert _marks(c1) == _marks(c2)
+
+
+def test_matcher_groupdict(items):
+    matcher = itemMatcher(items)
+    context = ConTextMarkup()
+    context.setRawText("Pulmonary artery embolus seen.")
+    context.cleanText()
+    tags = context.markMatcher(matcher)
+    assert [t.getMatchedGroupDictionary() for t in tags] == [{"kind": "embolus"}]
+
+
+def test_matcher_prefilters_literals(items):
+    matcher = itemMatcher(items)
+    assert matcher.getNumPrefilteredItems() > 0
+    assert len(matcher.candidates("nothing to see here")) < len(items)
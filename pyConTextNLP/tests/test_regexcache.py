@@ -0,0 +1,83 @@
+import re
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.regexCache import regexCache, REGEX_CACHE
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+import pytest
+
+
+@pytest.fixture(scope="module")
+def items():
+    return [["pulmonary embolism",
+             "PULMONARY_EMBOLISM",
+             r"""pulmonary\s(artery )?(embol[a-z]+)""",
+             ""],
+            ["no gross evidence of",
+             "PROBABLE_NEGATED_EXISTENCE",
+             "",
+             "forward"]]
+
+
+def test_cache_hit_miss():
+    cache = regexCache()
+    r1 = cache.compile(r"\bfoo\b", re.IGNORECASE)
+    r2 = cache.compile(r"\bfoo\b", re.IGNORECASE)
+    assert r1 is r2
+    assert cache.getStats()["hits"] == 1
+    assert cache.getStats()["misses"] == 1
+
+
+def test_cache_keyed_by_flags():
+    cache = regexCache()
+    cache.compile("foo", re.IGNORECASE)
+    cache.compile("foo", 0)
+    assert len(cache) == 2
+
+
+def test_cache_bounded():
+    cache = regexCache(maxsize=2)
+    cache.compile("a")
+    cache.compile("b")
+    cache.compile("a")
+    cache.compile("c")
+    assert ("a", 0) in cache
+    assert ("b", 0) not in cache
+    assert len(cache) == 2
+
+
+def test_cache_invalidate():
+    cache = regexCache()
+    cache.compile("foo", re.IGNORECASE)
+    cache.compile("foo", 0)
+    cache.invalidate("foo", 0)
+    assert ("foo", 0) not in cache
+    assert ("foo", re.IGNORECASE) in cache
+    cache.invalidate("foo")
+    assert len(cache) == 0
+
+
+def test_contextItem_getPattern(items):
+    cti = itemData.contextItem(items[1])
+    assert cti.getPattern() == r'\b%s\b' % items[1][0]
+    cti = itemData.contextItem(items[0])
+    assert cti.getPattern() == items[0][2]
+
+
+def test_contextItem_getCompiledRE(items):
+    cti = itemData.contextItem(items[1])
+    regex = cti.getCompiledRE()
+    assert regex is cti.getCompiledRE()
+    assert regex.flags & re.IGNORECASE
+    cti.invalidateCompiledRE()
+    assert (cti.getPattern(), re.IGNORECASE | re.UNICODE) not in REGEX_CACHE
+
+
+def test_markItem_uses_cache(items):
+    cti = itemData.contextItem(items[0])
+    context = ConTextMarkup()
+    context.setRawText("There is a pulmonary embolism.")
+    context.cleanText()
+    context.markItem(cti)
+    hits = REGEX_CACHE.hits
+    tags = context.markItem(cti)
+    assert REGEX_CACHE.hits == hits + 1
+    assert tags[0].getPhrase() == "pulmonary embolism"
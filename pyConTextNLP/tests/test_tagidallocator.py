@@ -0,0 +1,61 @@
+import pickle
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.pyConText import ConTextDocument
+from pyConTextNLP.tagObject import tagObject
+from pyConTextNLP.tagIdAllocator import counterTagIdAllocator, globalTagIdAllocator
+import pytest
+
+
+@pytest.fixture(scope="module")
+def items():
+    return itemData.itemData(["pneumonia", "EVIDENCE_OF_PNEUMONIA", "", ""],
+                             ["no", "DEFINITE_NEGATED_EXISTENCE", "", "forward"])
+
+
+def test_counter_allocator():
+    allocator = counterTagIdAllocator()
+    assert [allocator() for i in range(3)] == [1, 2, 3]
+
+
+def test_counter_allocator_pickle():
+    allocator = counterTagIdAllocator()
+    allocator()
+    copy = pickle.loads(pickle.dumps(allocator))
+    assert copy() == 2
+    assert allocator() == 2
+
+
+def test_global_allocator():
+    a1 = globalTagIdAllocator()
+    a2 = globalTagIdAllocator()
+    first = a1()
+    assert a1() == first + 1
+    assert first != a2()
+
+
+def test_tagObject_default_id(items):
+    tag = tagObject(items[0], "target")
+    assert isinstance(tag.getTagID(), int)
+
+
+def test_ids_follow_position(items):
+    context = ConTextMarkup(tagIdAllocator=counterTagIdAllocator())
+    context.setRawText("pneumonia, no pneumonia.")
+    context.cleanText()
+    context.markItems(items, mode="target")
+    nodes = sorted(context.nodes(), key=lambda n: n.getTagID())
+    assert [n.getSpan()[0] for n in nodes] == sorted(n.getSpan()[0] for n in nodes)
+    assert [n.getTagID() for n in nodes] == [1, 2, 3]
+
+
+def test_document_allocator_deterministic(items):
+    ids = []
+    for i in range(2):
+        document = ConTextDocument()
+        context = ConTextMarkup(tagIdAllocator=document.getTagIdAllocator())
+        context.setRawText("no pneumonia")
+        context.cleanText()
+        context.markItems(items, mode="target")
+        ids.append(sorted(n.getTagID() for n in context.nodes()))
+    assert ids[0] == ids[1]
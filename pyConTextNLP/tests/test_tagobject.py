@@ -0,0 +1,68 @@
+import pickle
+import networkx as nx
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.tagObject import tagObject
+import pytest
+
+
+@pytest.fixture(scope="module")
+def item():
+    return itemData.contextItem(["no gross evidence of", "PROBABLE_NEGATED_EXISTENCE", "", "forward"])
+
+
+def test_tagObject_slotted(item):
+    tag = tagObject(item, "modifier", tagid=7)
+    assert not hasattr(tag, "__dict__")
+    assert not hasattr(item, "__dict__")
+
+
+def test_tagObject_hash_by_id(item):
+    tag1 = tagObject(item, "modifier", tagid=7)
+    tag2 = tagObject(item, "modifier", tagid=8)
+    assert hash(tag1) == hash(7)
+    assert len({tag1, tag2}) == 2
+
+
+def test_tagObject_equal_spans_distinct_members(item):
+    tag1 = tagObject(item, "modifier", tagid=7)
+    tag2 = tagObject(item, "modifier", tagid=8)
+    tag1.setSpan((3, 10))
+    tag2.setSpan((3, 10))
+    # equality compares spans, the hash is the tag id
+    assert tag1 == tag2 and hash(tag1) != hash(tag2)
+    assert len({tag1, tag2}) == 2
+    graph = nx.DiGraph()
+    graph.add_nodes_from([tag1, tag2])
+    assert len(graph) == 2 and list(graph) == [tag1, tag2]
+    assert list(graph)[1] is tag2
+    tag2.setSpan((4, 10))
+    assert tag1 != tag2 and tag2 in graph
+
+
+def test_tagObject_category_copy_on_write(item):
+    tag = tagObject(item, "modifier", tagid=7)
+    category = tag.getCategory()
+    category.pop()
+    assert tag.getCategory() == ["probable_negated_existence"]
+    tag.replaceCategory("probable_negated_existence", "definite_negated_existence")
+    assert tag.getCategory() == ["definite_negated_existence"]
+    assert item.getCategory() == ["probable_negated_existence"]
+    assert tag.categoryString() == "definite_negated_existence"
+
+
+def test_tagObject_groupdict(item):
+    tag = tagObject(item, "modifier", tagid=7)
+    assert tag.getMatchedGroupDictionary() == {}
+    tag.setMatchedGroupDictionary({"a": "b"})
+    assert tag.getMatchedGroupDictionary() == {"a": "b"}
+
+
+def test_tagObject_pickle(item):
+    tag = tagObject(item, "modifier", scope=(0, 30), tagid=7)
+    tag.setSpan((0, 20))
+    tag.setPhrase("no gross evidence of")
+    copy = pickle.loads(pickle.dumps(tag))
+    assert copy.getTagID() == 7
+    assert copy.getSpan() == (0, 20)
+    assert copy.getScope() == [0, 30]
+    assert copy.getLiteral() == "no gross evidence of"
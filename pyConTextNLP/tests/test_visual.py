@@ -0,0 +1,36 @@
+import os
+from nlp_pneumonia_utils import markup_context_document
+from visual import Vis, estimate_page_height, SITE_PAGER_HEIGHT, SITE_TITLE_HEIGHT
+import pytest
+
+KB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "KB")
+
+
+@pytest.fixture(scope="module")
+def processed_docs(lexicon):
+    modifiers, targets = lexicon
+    texts = ["IMPRESSION: NO GROSS EVIDENCE OF PNEUMONIA.",
+             "Patchy opacities in the right lower lobe may represent atelectasis or pneumonia.\n" * 4,
+             "Nothing to mark here."]
+    return {"doc{0:d}".format(i): markup_context_document(text, modifiers, targets) for i, text in enumerate(texts)}
+
+
+def test_write_site(processed_docs, tmp_path):
+    vis = Vis(context_file=os.path.join(KB, "pneumonia_modifiers.tsv"), tmp_dir=str(tmp_path))
+    page, height = vis.write_site(processed_docs, page_size=2)
+    assert page == os.path.join(str(tmp_path), "pycontext.html")
+    assert sorted(os.listdir(str(tmp_path / "pycontext"))) == ["0.js", "1.js", "2.js", "collData.js"]
+    heights = []
+    for doc in processed_docs.values():
+        doc_data, doc_txt, total_annotations = vis.gen_doc_data(doc)
+        heights.append(SITE_TITLE_HEIGHT + estimate_page_height(doc_txt, total_annotations))
+    assert height == SITE_PAGER_HEIGHT + max(heights[0] + heights[1], heights[2])
+
+    # rewriting the site with fewer documents drops the docData of the others
+    (tmp_path / "pycontext" / "notes.txt").write_text("kept")
+    page, height = vis.write_site({"doc2": processed_docs["doc2"]})
+    assert sorted(os.listdir(str(tmp_path / "pycontext"))) == ["0.js", "collData.js", "notes.txt"]
+    assert height == SITE_PAGER_HEIGHT + heights[2]
+    with open(page) as f:
+        html = f.read()
+    assert '"doc2"' in html and '"doc0"' not in html
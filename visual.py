@@ -5,108 +5,321 @@ import matplotlib
 import pandas as pd
 import json
 import math
+import os
+from collections.abc import Mapping
 from pyConTextNLP.utils import get_document_markups
 
 from itemData import get_item_data
 
 
-# convert a document markups into dataframes
-def convertMarkups2DF(markups, annotations=None, relations=None, filter_no_markup_txt=True):
+ANNOTATION_COLUMNS = ['markup_id', 'vis_category', 'start', 'end', 'txt', 'type']
+RELATION_COLUMNS = ['relation_id', 'type', 'arg1_cate', 'arg1_id', 'arg2_cate', 'arg2_id']
+
+
+def new_columns(names):
+    """return an empty columnar table: a dict mapping each column name to a list"""
+    return {name: [] for name in names}
+
+
+def df2columns(df, names):
+    return {name: df[name].tolist() for name in names}
+
+
+def columns2df(columns, names):
+    if not columns[names[0]]:
+        return pd.DataFrame(columns=names)
+    return pd.DataFrame(columns, columns=names)
+
+
+# convert a document markups into columns (dicts of lists), without building any DataFrame
+def convertMarkups2Columns(markups, annotations=None, relations=None, filter_no_markup_txt=True, doc_txt=None):
+    """
+    return the annotations and relations of markups as columnar tables (dicts
+    mapping the column names of convertMarkups2DF to lists) and the document text.
+    doc_txt: the text the markups were split from (e.g. ConTextDocument.getRawText()).
+    If given, the annotation offsets are the document spans of the marked items and
+    doc_txt is returned as is. Otherwise the offsets refer to the concatenation of
+    the cleaned sentence texts, each preceded by a newline.
+    """
     if annotations is None:
-        annotations = pd.DataFrame(columns=['markup_id', 'vis_category', 'start', 'end', 'txt', 'type'])
+        annotations = new_columns(ANNOTATION_COLUMNS)
     if relations is None:
-        relations = pd.DataFrame(columns=['relation_id', 'type', 'arg1_cate', 'arg1_id', 'arg2_cate', 'arg2_id'])
+        relations = new_columns(RELATION_COLUMNS)
     node_dic = dict()
-    doc_txt = ''
+    if doc_txt is not None:
+        for markup in markups:
+            if len(markup) > 0:
+                convertMarkup2Columns(markup, None, annotations, relations, node_dic, doc_txt)
+        return annotations, relations, doc_txt
+    pieces = []
+    offset = 0
     for markup in markups:
         txt = markup.graph['__txt']
-        offset = len(doc_txt)
         if len(markup) > 0:
-            annotations, relations = convertMarkup2DF(markup, offset, annotations, relations, node_dic)
+            convertMarkup2Columns(markup, offset, annotations, relations, node_dic)
         if (not filter_no_markup_txt) or len(markup) > 0:
-            doc_txt += '\n' + txt
-    return annotations, relations, doc_txt
+            pieces.append('\n')
+            pieces.append(txt)
+            offset += len(txt) + 1
+    return annotations, relations, ''.join(pieces)
 
 
-# convert a snippet markups into dataframes
-def convertMarkup2DF(markup, offset=0, annotations=None, relations=None, node_dic=dict()):
+# convert a document markups into dataframes
+def convertMarkups2DF(markups, annotations=None, relations=None, filter_no_markup_txt=True, doc_txt=None):
+    """
+    the DataFrame form of convertMarkups2Columns; rows are appended to annotations
+    and relations if they are given
+    """
+    if annotations is not None:
+        annotations = df2columns(annotations, ANNOTATION_COLUMNS)
+    if relations is not None:
+        relations = df2columns(relations, RELATION_COLUMNS)
+    annotations, relations, doc_txt = convertMarkups2Columns(markups, annotations, relations,
+                                                             filter_no_markup_txt, doc_txt)
+    return columns2df(annotations, ANNOTATION_COLUMNS), columns2df(relations, RELATION_COLUMNS), doc_txt
+
+
+# convert a snippet markups into columns
+def convertMarkup2Columns(markup, offset=0, annotations=None, relations=None, node_dic=None, txt=None):
+    """
+    offset: added to the spans of the marked items, or None to use their document
+    spans, in which case txt should be the document text (the cleaned sentence
+    text is used by default)
+    """
     if annotations is None:
-        annotations = pd.DataFrame(columns=['markup_id', 'vis_category', 'start', 'end', 'txt', 'type'])
+        annotations = new_columns(ANNOTATION_COLUMNS)
     if relations is None:
-        relations = pd.DataFrame(columns=['relation_id', 'type', 'arg1_cate', 'arg1_id', 'arg2_cate', 'arg2_id'])
+        relations = new_columns(RELATION_COLUMNS)
+    if node_dic is None:
+        node_dic = dict()
+    if txt is None:
+        txt = markup.graph['__txt']
     for node in markup.nodes():
-        add_node(node_dic, annotations, node, offset, markup.graph['__txt'])
+        add_node_columns(node_dic, annotations, node, offset, txt)
 
+    vis_categories = annotations['vis_category']
     for e in markup.edges():
         modifier_type = e[0].getConTextCategory().title()
         target_type = e[1].getConTextCategory().title()
         if target_type == 'Modifier':
             modifier_type = 'Termination'
 
-        add_node(node_dic, annotations, e[0], offset, markup.graph['__txt'])
-        add_node(node_dic, annotations, e[1], offset, markup.graph['__txt'])
+        modifier_id = add_node_columns(node_dic, annotations, e[0], offset, txt)
+        target_id = add_node_columns(node_dic, annotations, e[1], offset, txt)
 
-        modifier_id = node_dic[gen_doc_node_id(e[0], offset)]
-        target_id = node_dic[gen_doc_node_id(e[1], offset)]
-
-        annotations.loc[modifier_id, 'vis_category'] = modifier_type
+        vis_categories[modifier_id] = modifier_type
 
         # put the modifier's name on the edge rather than the context clue's markup
         # annotations.loc[modifier_id, 'type'] = 'Modifier'
 
-        relation_id = len(relations)
-        relations.loc[relation_id] = ['R' + str(relation_id), e[0].getCategory()[0],
-                                      modifier_type, 'T' + str(modifier_id),
-                                      target_type, 'T' + str(target_id)]
+        relation_id = len(relations['relation_id'])
+        for name, value in zip(RELATION_COLUMNS, ['R' + str(relation_id), e[0].getCategory()[0],
+                                                  modifier_type, 'T' + str(modifier_id),
+                                                  target_type, 'T' + str(target_id)]):
+            relations[name].append(value)
     return annotations, relations
 
 
+# convert a snippet markups into dataframes
+def convertMarkup2DF(markup, offset=0, annotations=None, relations=None, node_dic=None, txt=None):
+    """the DataFrame form of convertMarkup2Columns"""
+    if annotations is not None:
+        annotations = df2columns(annotations, ANNOTATION_COLUMNS)
+    if relations is not None:
+        relations = df2columns(relations, RELATION_COLUMNS)
+    annotations, relations = convertMarkup2Columns(markup, offset, annotations, relations, node_dic, txt)
+    return columns2df(annotations, ANNOTATION_COLUMNS), columns2df(relations, RELATION_COLUMNS)
+
+
+def get_node_span(node, offset):
+    """the span of node shifted by offset, or its document span if offset is None"""
+    if offset is None:
+        return node.getDocumentSpan()
+    start, end = node.getSpan()
+    return start + offset, end + offset
+
+
 def gen_doc_node_id(node, offset):
-    return str(node.getTagID()) + str(node.getSpan()[0] + offset)
+    # a tuple rather than concatenated digits: with small per-document tag ids, str(1) + str(23) == str(12) + str(3)
+    return node.getTagID(), get_node_span(node, offset)[0]
 
 
-def add_node(node_dic, annotations_df, node, offset, txt):
+def add_node_columns(node_dic, annotations, node, offset, txt):
+    """add node to the annotation columns unless it is already there; return its row number"""
     origin_id = gen_doc_node_id(node, offset)
-    if origin_id not in node_dic:
-        node_id = len(node_dic)
-        markup_id = 'T' + str(node_id)
+    node_id = node_dic.get(origin_id)
+    if node_id is None:
+        node_id = len(annotations['markup_id'])
         node_dic[origin_id] = node_id
-        type = node.getCategory().pop()
-        category = node.getConTextCategory().title()
-        annotations_df.loc[node_id] = [markup_id, category, node.getSpan()[0] + offset, node.getSpan()[1] + offset,
-                                       txt[node.getSpan()[0]:node.getSpan()[1]], type]
-    pass
+        start, end = get_node_span(node, offset)
+        # txt is the document text when offset is None, the sentence text otherwise
+        txt_start, txt_end = (start, end) if offset is None else node.getSpan()
+        annotations['markup_id'].append('T' + str(node_id))
+        annotations['vis_category'].append(node.getConTextCategory().title())
+        annotations['start'].append(start)
+        annotations['end'].append(end)
+        annotations['txt'].append(txt[txt_start:txt_end])
+        annotations['type'].append(node.getCategory().pop())
+    return node_id
+
+
+# walk document markups once, producing the rows of the annotation and relation tables
+def iter_brat_rows(markups, filter_no_markup_txt=True, doc_txt=None):
+    """
+    generate, markup by markup, the rows convertMarkups2Columns adds to the
+    annotation and relation tables (lists in the order of ANNOTATION_COLUMNS and
+    RELATION_COLUMNS), without building the tables. Yields (txt, annotation rows,
+    relation rows) for each markup, where txt is the text the markup adds to the
+    document text (without the preceding newline), or None if it adds none.
+    Rows are yielded once the markup is complete.
+    """
+    node_rows = dict()
+    relation_count = 0
+    offset = 0
+    for markup in markups:
+        annotations = []
+        relations = []
+        if len(markup) > 0:
+            txt = markup.graph['__txt'] if doc_txt is None else doc_txt
+            markup_offset = offset if doc_txt is None else None
+            for node in markup.nodes():
+                add_node_row(node_rows, annotations, node, markup_offset, txt)
+            for modifier, target in markup.edges():
+                modifier_type = modifier.getConTextCategory().title()
+                target_type = target.getConTextCategory().title()
+                if target_type == 'Modifier':
+                    modifier_type = 'Termination'
+                modifier_row = add_node_row(node_rows, annotations, modifier, markup_offset, txt)
+                target_row = add_node_row(node_rows, annotations, target, markup_offset, txt)
+                modifier_row[1] = modifier_type
+                relations.append(['R' + str(relation_count), modifier.getCategory()[0],
+                                  modifier_type, modifier_row[0], target_type, target_row[0]])
+                relation_count += 1
+        txt = None
+        if doc_txt is None and ((not filter_no_markup_txt) or len(markup) > 0):
+            txt = markup.graph['__txt']
+            offset += len(txt) + 1
+        yield txt, annotations, relations
+
+
+def add_node_row(node_rows, annotations, node, offset, txt):
+    """the row form of add_node_columns: return the annotation row of node, adding it if it is new"""
+    origin_id = gen_doc_node_id(node, offset)
+    row = node_rows.get(origin_id)
+    if row is None:
+        start, end = get_node_span(node, offset)
+        txt_start, txt_end = (start, end) if offset is None else node.getSpan()
+        row = ['T' + str(len(node_rows)), node.getConTextCategory().title(), start, end,
+               txt[txt_start:txt_end], node.getCategory().pop()]
+        node_rows[origin_id] = row
+        annotations.append(row)
+    return row
+
+
+def brat_entity(row):
+    """the brat docData entity of an annotation row"""
+    return [row[0], row[1], [[row[2], row[3]]]]
+
+
+def brat_relation(row):
+    """the brat docData relation of a relation row"""
+    relation_type = row[1]
+    if row[2] == 'Termination':
+        relation_type += '_t'
+    return [row[0], relation_type, [[row[2], row[3]], [row[4], row[5]]]]
+
+
+def convertMarkups2Brat(markups, filter_no_markup_txt=True, doc_txt=None):
+    """
+    return the brat docData of markups (the docData Vis.serialize_to_js builds
+    from the tables of convertMarkups2DF) and the document text as
+    convertMarkups2Columns returns it
+    """
+    entities = []
+    relations = []
+    pieces = []
+    for txt, annotation_rows, relation_rows in iter_brat_rows(markups, filter_no_markup_txt, doc_txt):
+        entities.extend(brat_entity(row) for row in annotation_rows)
+        relations.extend(brat_relation(row) for row in relation_rows)
+        if txt is not None:
+            pieces.append('\n')
+            pieces.append(txt)
+    if doc_txt is None:
+        doc_txt = ''.join(pieces)
+        # the text starts with a newline, which the offsets count but brat is not shown
+        return {'text': doc_txt[1:], 'entities': entities, 'relations': relations}, doc_txt
+    return {'text': doc_txt, 'entities': entities, 'relations': relations}, doc_txt
+
+
+def write_brat_doc_data(f, markups, filter_no_markup_txt=True, doc_txt=None):
+    """
+    write the brat docData of markups as JSON to the text file f. The entities
+    are written markup by markup; the relations and, without doc_txt, the text
+    are written at the end. return the number of entities
+    """
+    relations = []
+    pieces = []
+    count = 0
+    f.write('{"entities": [')
+    for txt, annotation_rows, relation_rows in iter_brat_rows(markups, filter_no_markup_txt, doc_txt):
+        for row in annotation_rows:
+            f.write(', ' if count else '')
+            f.write(json.dumps(brat_entity(row)))
+            count += 1
+        relations.extend(brat_relation(row) for row in relation_rows)
+        if txt is not None:
+            pieces.append('\n')
+            pieces.append(txt)
+    f.write('], "relations": ')
+    f.write(json.dumps(relations))
+    f.write(', "text": ')
+    f.write(json.dumps(doc_txt if doc_txt is not None else ''.join(pieces)[1:]))
+    f.write('}')
+    return count
+
+
+def write_brat_ann(f, markups, filter_no_markup_txt=True, doc_txt=None):
+    """
+    write the markups as brat standoff annotations to the text file f, markup by
+    markup, and return the text the offsets refer to (the content of the .txt
+    file). Entities are typed by the category of the marked item, relations by
+    the category of the modifier, with the modifier as Arg1 and the modified
+    item as Arg2. Line breaks in the annotated text are written as spaces.
+    """
+    pieces = []
+    for txt, annotation_rows, relation_rows in iter_brat_rows(markups, filter_no_markup_txt, doc_txt):
+        for markup_id, vis_category, start, end, span_txt, type in annotation_rows:
+            f.write('{0}\t{1} {2:d} {3:d}\t{4}\n'.format(markup_id, type, start, end,
+                                                       span_txt.replace('\r', ' ').replace('\n', ' ')))
+        for relation_id, type, arg1_cate, arg1_id, arg2_cate, arg2_id in relation_rows:
+            f.write('{0}\t{1} Arg1:{2} Arg2:{3}\n'.format(relation_id, type, arg1_id, arg2_id))
+        if txt is not None:
+            pieces.append('\n')
+            pieces.append(txt)
+    if doc_txt is None:
+        return ''.join(pieces)[1:]
+    return doc_txt
+
+
+def write_brat_project(processed_docs, directory, filter_no_markup_txt=True):
+    """
+    export processed_docs (a mapping of document names to ConTextDocuments) to
+    directory as a brat project: a .txt and a .ann file per document. The text
+    is the raw text of the document if it is known, the sentences separated by
+    newlines otherwise. return the number of documents written
+    """
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for doc_name, doc in processed_docs.items():
+        with open(os.path.join(directory, doc_name + '.ann'), 'w', encoding='utf-8') as f:
+            txt = write_brat_ann(f, get_document_markups(doc), filter_no_markup_txt, doc.getRawText())
+        with open(os.path.join(directory, doc_name + '.txt'), 'w', encoding='utf-8', newline='') as f:
+            f.write(txt)
+        count += 1
+    return count
 
 
-class Vis():
-    def __init__(self, context_file='KB/pneumonia_modifiers.tsv', lib_dir='',
-                 file_name="x.html", tmp_dir='tmp/'):
-        self.relation_def = self.read_context_types(context_file)
-        self.file_name = file_name
-        self.tmp_dir = tmp_dir
-        self.template = '''<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
-            <html>
-            
-            <head>
-                <meta http-equiv="content-type" content="text/html; charset=UTF-8">
-                <title>Brat Embedding {file_name}</title>
-                <link rel="stylesheet" type="text/css" href="{lib_dir}css/style-vis.css">
-                <script type="text/javascript" src="{lib_dir}js/head.js"></script>
-                <script type="text/javascript">
-              function resizeIframe(obj) {
-                obj.style.height = obj.contentWindow.document.body.scrollHeight + 'px';
-              }
-            </script>
-            </head>
-            
-            <body>
-            
-            <!-- load all the libraries upfront, which takes forever. -->
-            <script type="text/javascript" src="{lib_dir}js/brat_loader.js"></script>
-            
-            <script type="text/javascript">
-            
-            var collData = {
+BRAT_ENTITY_TYPES = '''var collData = {
                 entity_types: [ {
                         type   : 'Target',
                         labels : ['Target', 'Tar'],
@@ -131,7 +344,31 @@ class Vis():
                         // Use a slightly darker version of the bgColor for the border
                         borderColor: 'darken'
                 }]
-            };
+            };'''
+
+BRAT_TEMPLATE = '''<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+            <html>
+            
+            <head>
+                <meta http-equiv="content-type" content="text/html; charset=UTF-8">
+                <title>Brat Embedding {file_name}</title>
+                <link rel="stylesheet" type="text/css" href="{lib_dir}css/style-vis.css">
+                <script type="text/javascript" src="{lib_dir}js/head.js"></script>
+                <script type="text/javascript">
+              function resizeIframe(obj) {
+                obj.style.height = obj.contentWindow.document.body.scrollHeight + 'px';
+              }
+            </script>
+            </head>
+            
+            <body>
+            
+            <!-- load all the libraries upfront, which takes forever. -->
+            <script type="text/javascript" src="{lib_dir}js/brat_loader.js"></script>
+            
+            <script type="text/javascript">
+            
+            {collData}
             
             {relationship}
             
@@ -150,9 +387,108 @@ class Vis():
             </body>
             </html>
             '''
-        self.template = self.template.replace('{lib_dir}', lib_dir)
-        self.template = self.template.replace('{relationship}', self.relation_def)
-        pass
+
+
+SITE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head>
+    <meta http-equiv="content-type" content="text/html; charset=UTF-8">
+    <title>{title}</title>
+    <link rel="stylesheet" type="text/css" href="{lib_dir}css/style-vis.css">
+    <script type="text/javascript" src="{lib_dir}js/head.js"></script>
+</head>
+<body>
+<!-- the libraries and collData are loaded once for all the documents -->
+<script type="text/javascript" src="{lib_dir}js/brat_loader.js"></script>
+<script type="text/javascript" src="{site_dir}collData.js"></script>
+<p>
+    <button id="previous-page">&lt;</button>
+    <span id="page-label"></span>
+    <button id="next-page">&gt;</button>
+</p>
+<div id="documents"></div>
+<script type="text/javascript">
+    var documents = {index};
+    var pageSize = {page_size};
+    var page = 0;
+    // element ids of the documents of the current page, by document number
+    var pending = {};
+
+    // called by the docData files of the documents
+    function loadDocData(i, docData) {
+        var id = pending[i];
+        delete pending[i];
+        if (id === undefined) {
+            return;
+        }
+        head.ready(function() {
+            Util.embed(id, $.extend({}, collData), docData, webFontURLs);
+        });
+    }
+
+    function showPage(p) {
+        var pages = Math.max(1, Math.ceil(documents.length / pageSize));
+        page = Math.min(Math.max(p, 0), pages - 1);
+        document.getElementById('page-label').textContent = 'page ' + (page + 1) + ' of ' + pages;
+        var container = document.getElementById('documents');
+        container.innerHTML = '';
+        pending = {};
+        var end = Math.min(documents.length, (page + 1) * pageSize);
+        for (var i = page * pageSize; i < end; i++) {
+            var title = document.createElement('h3');
+            title.textContent = documents[i].name + ' (' + documents[i].annotations + ' annotations)';
+            container.appendChild(title);
+            var div = document.createElement('div');
+            div.id = 'document-' + i;
+            container.appendChild(div);
+            pending[i] = div.id;
+            var script = document.createElement('script');
+            script.src = '{site_dir}' + documents[i].file;
+            container.appendChild(script);
+        }
+    }
+
+    document.getElementById('previous-page').onclick = function() { showPage(page - 1); };
+    document.getElementById('next-page').onclick = function() { showPage(page + 1); };
+    showPage(0);
+</script>
+</body>
+</html>
+'''
+
+# heights in pixels of the page controls and of a document title in SITE_TEMPLATE
+SITE_PAGER_HEIGHT = 50
+SITE_TITLE_HEIGHT = 40
+
+
+class Vis():
+    def __init__(self, context_file='KB/pneumonia_modifiers.tsv', lib_dir='',
+                 file_name="x.html", tmp_dir='tmp/'):
+        """
+        context_file is read when the relation types are first needed, not when
+        the Vis is created (Vis instances are default arguments of this module)
+        """
+        self.context_file = context_file
+        self.lib_dir = lib_dir
+        self.file_name = file_name
+        self.tmp_dir = tmp_dir
+        self.__relation_def = None
+        self.__template = None
+
+    @property
+    def relation_def(self):
+        """the definition of collData['relation_types'], generated from context_file on first use"""
+        if self.__relation_def is None:
+            self.__relation_def = self.read_context_types(self.context_file)
+        return self.__relation_def
+
+    @property
+    def template(self):
+        if self.__template is None:
+            template = BRAT_TEMPLATE.replace('{collData}', BRAT_ENTITY_TYPES)
+            template = template.replace('{lib_dir}', self.lib_dir)
+            self.__template = template.replace('{relationship}', self.relation_def)
+        return self.__template
 
     # read modifier types from context file, generate relation definition variable collData['relation_types'] for Brat
     def read_context_types(self, context_file):
@@ -251,9 +587,16 @@ class Vis():
         pass
 
     def gen_html_from_context_doc(self, doc, filter_no_markup_txt=True):
-        annotations, relations, doc_txt = convertMarkups2DF(get_document_markups(doc))
-        html = self.gen_html_from_dfs(doc_txt[1:], annotations, relations)
-        return html, doc_txt, len(annotations)
+        doc_data, doc_txt, total_annotations = self.gen_doc_data(doc, filter_no_markup_txt)
+        html = self.template.replace('{docData}', 'var docData=' + json.dumps(doc_data))
+        return html, doc_txt, total_annotations
+
+    def gen_doc_data(self, doc, filter_no_markup_txt=True):
+        """return the brat docData of a ConTextDocument, its text and its number of annotations"""
+        # with the raw text, show the original document: the markups carry their offsets into it
+        doc_data, doc_txt = convertMarkups2Brat(get_document_markups(doc), filter_no_markup_txt,
+                                                doc.getRawText())
+        return doc_data, doc_txt, len(doc_data['entities'])
 
     def gen_html_from_context_markup(self, markup):
         txt = markup.graph['__txt']
@@ -267,6 +610,9 @@ class Vis():
         return html
 
     def serialize_to_js(self, txt, annotations_df, relations_df):
+        return json.dumps(self.gen_doc_data_from_dfs(txt, annotations_df, relations_df))
+
+    def gen_doc_data_from_dfs(self, txt, annotations_df, relations_df):
         entities = []
         for key, e in annotations_df.iterrows():
             entities.append([e['markup_id'], e['vis_category'], [[e['start'], e['end']]]])
@@ -280,9 +626,51 @@ class Vis():
                 [r['arg1_cate'], r['arg1_id']],
                 [r['arg2_cate'], r['arg2_id']]
             ]])
-        doc_data = {'text': txt, 'entities': entities, 'relations': relations}
-        json_data = json.dumps(doc_data)
-        return json_data
+        return {'text': txt, 'entities': entities, 'relations': relations}
+
+    def write_site(self, processed_docs, site_name='pycontext', page_size=10):
+        """
+        write the brat visualizations of processed_docs (a mapping of document
+        names to ConTextDocuments, e.g. a markup store) as a single static site
+        in tmp_dir: the page site_name.html and, in the directory site_name,
+        the collData shared by all documents and the docData of each document.
+        The page shows page_size documents at a time and only loads the docData
+        of the documents shown. Documents are converted one at a time. The
+        docData files of a site previously written to the same directory are
+        removed first.
+        return the path of the page and the estimated height in pixels of its
+        longest page of documents (see estimate_page_height)
+        """
+        page_size = max(1, page_size)
+        site_dir = os.path.join(self.tmp_dir, site_name)
+        os.makedirs(site_dir, exist_ok=True)
+        for file_name in os.listdir(site_dir):
+            if file_name.endswith('.js') and file_name[:-3].isdigit():
+                os.remove(os.path.join(site_dir, file_name))
+        with open(os.path.join(site_dir, 'collData.js'), 'w') as f:
+            f.write(BRAT_ENTITY_TYPES + '\n' + self.relation_def + '\n')
+        index = []
+        height = 0
+        page_height = 0
+        for i, (doc_name, doc) in enumerate(processed_docs.items()):
+            doc_data, doc_txt, total_annotations = self.gen_doc_data(doc)
+            file_name = '{0:d}.js'.format(i)
+            with open(os.path.join(site_dir, file_name), 'w') as f:
+                f.write('loadDocData({0:d}, {1});\n'.format(i, json.dumps(doc_data)))
+            index.append({'name': doc_name, 'file': file_name, 'annotations': total_annotations})
+            if i % page_size == 0:
+                page_height = SITE_PAGER_HEIGHT
+            page_height += SITE_TITLE_HEIGHT + estimate_page_height(doc_txt, total_annotations)
+            height = max(height, page_height)
+        html = SITE_TEMPLATE.replace('{lib_dir}', self.lib_dir) \
+            .replace('{site_dir}', site_name + '/') \
+            .replace('{title}', site_name) \
+            .replace('{page_size}', str(page_size)) \
+            .replace('{index}', json.dumps(index).replace('</', '<\\/'))
+        page = os.path.join(self.tmp_dir, site_name + '.html')
+        with open(page, 'w') as f:
+            f.write(html)
+        return page, height
 
 
 # viz = Vis('KB/fam_modifiers.tsv')
@@ -339,39 +727,29 @@ def view_pycontext_output(input, vis=Vis()):
     if input is None:
         print('No markups to display.')
         return
-    if isinstance(input, dict):
+    if isinstance(input, Mapping):
+        # a dict or a markup store of doc_name -> ConTextDocument
         view_pycontext_outputs(input, vis)
     else:
         view_pycontext_single_output(input, vis)
 
 
-def view_pycontext_outputs(processed_docs, vis=Vis()):
-    doc_names = []
-    docs_text = {}
-    annotation_counts = {}
+def view_pycontext_outputs(processed_docs, vis=Vis(), page_size=10, height=None):
+    """
+    height: of the frame showing the documents, in pixels. By default it is
+    estimated from the longest page of page_size documents
+    """
     if len(processed_docs) == 0:
         print('No documents to view.')
         return
 
-    for doc_name, doc in processed_docs.items():
-        html, doc_text, total_annotations = vis.gen_html_from_context_doc(doc)
-        docs_text[doc_name] = doc_text
-        annotation_counts[doc_name] = total_annotations
-        vis.write_html(html, doc_name + '.html')
-        doc_names.append(doc_name)
-
-    @ipywidgets.interact(i=ipywidgets.IntSlider(min=0, max=len(doc_names) - 1))
-    def _view_markup(i):
-        doc_name = doc_names[i]
-        text = docs_text[doc_name]
-        total_annotations = annotation_counts[doc_name]
-        html = '''
-		      <iframe src = "tmp/{}.html" frameborder="0" width = "850" height = "{}">
+    # one page for all the documents, see Vis.write_site
+    page, estimated_height = vis.write_site(processed_docs, page_size=page_size)
+    html = '''
+		      <iframe src = "{}" frameborder="0" width = "850" height = "{}">
 		         Sorry your browser does not support inline frames.
-		      </iframe>'''.format(doc_name, estimate_page_height(text, total_annotations))
-        display(HTML(html))
-
-    pass
+		      </iframe>'''.format(page, estimated_height if height is None else height)
+    display(HTML(html))
 
 
 def view_pycontext_single_output(processed_doc, vis=Vis()):